@@ -0,0 +1,42 @@
+"""user-040: bookmark hosts and per-domain aggregates
+
+Revision ID: 0344731be6b6
+Revises: 13f8c9cc65e5
+Create Date: 2026-10-18 12:00:12
+
+Existing bookmarks get their hosts, and domain_stats its rows, from
+`flask bookmarks backfill-domains`, which works in short chunks and can run while the app serves.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0344731be6b6'
+down_revision = '13f8c9cc65e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bookmark', sa.Column('host', sa.String(length=255), nullable=True))
+    op.create_index('ix_bookmark_user_host', 'bookmark', ['user_id', 'host'])
+    # Plain ALTER TABLE: a batch rebuild of `bookmark` would drop the search triggers.
+
+    op.create_table(
+        'domain_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('domain', sa.String(length=255), nullable=False),
+        sa.Column('bookmarks', sa.Integer(), nullable=False),
+        sa.Column('visits', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'domain'),
+    )
+    op.create_index('ix_domain_stats_user_visits', 'domain_stats', ['user_id', 'visits'])
+
+
+def downgrade():
+    op.drop_index('ix_domain_stats_user_visits', table_name='domain_stats')
+    op.drop_table('domain_stats')
+    op.drop_index('ix_bookmark_user_host', table_name='bookmark')
+    op.drop_column('bookmark', 'host')
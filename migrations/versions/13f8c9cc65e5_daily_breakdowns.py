@@ -0,0 +1,33 @@
+"""user-039: daily referrer and user agent sketches
+
+Revision ID: 13f8c9cc65e5
+Revises: d8b9fa2d8977
+Create Date: 2026-10-18 12:00:11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '13f8c9cc65e5'
+down_revision = 'd8b9fa2d8977'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_breakdown',
+        sa.Column('bookmark_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('counts', sa.LargeBinary(), nullable=False),
+        sa.Column('candidates', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['bookmark_id'], ['bookmark.id']),
+        sa.PrimaryKeyConstraint('bookmark_id', 'bucket', 'kind'),
+    )
+
+
+def downgrade():
+    op.drop_table('daily_breakdown')
@@ -0,0 +1,57 @@
+"""user-031: per-user full-text search index
+
+Revision ID: 29d632e5754f
+Revises: 42238c1600c2
+Create Date: 2026-10-18 12:00:04
+
+A contentless FTS5 table over bookmark bodies and URLs, with an `owner` column holding one token
+per user so a search can be scoped inside its MATCH, plus the triggers that keep it in sync. Any
+index created by an earlier build is dropped first. SQLite only; other databases have no FTS5.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '29d632e5754f'
+down_revision = '42238c1600c2'
+branch_labels = None
+depends_on = None
+
+DROP = (
+    'DROP TRIGGER IF EXISTS bookmark_fts_insert',
+    'DROP TRIGGER IF EXISTS bookmark_fts_delete',
+    'DROP TRIGGER IF EXISTS bookmark_fts_update',
+    'DROP TABLE IF EXISTS bookmark_fts',
+)
+
+CREATE = (
+    """CREATE VIRTUAL TABLE bookmark_fts USING fts5(
+        body, url, owner, content='', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER bookmark_fts_insert AFTER INSERT ON bookmark BEGIN
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER bookmark_fts_delete AFTER DELETE ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER bookmark_fts_update AFTER UPDATE OF body, url, user_id ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+    "INSERT INTO bookmark_fts(rowid, body, url, owner) SELECT id, body, url, 'u' || user_id FROM bookmark",
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in DROP + CREATE:
+        op.execute(sa.text(statement))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in DROP:
+        op.execute(sa.text(statement))
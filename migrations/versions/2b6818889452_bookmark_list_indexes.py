@@ -0,0 +1,32 @@
+"""user-026: indexes backing the bookmark list's orders and filters
+
+Revision ID: 2b6818889452
+Revises: cad7bc9edf9c
+Create Date: 2026-10-18 12:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b6818889452'
+down_revision = 'cad7bc9edf9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookmark') as batch_op:
+        batch_op.create_index('ix_bookmark_user_id', ['user_id', 'id'])
+        batch_op.create_index('ix_bookmark_user_visits', ['user_id', 'visits'])
+        batch_op.create_index('ix_bookmark_user_created_at', ['user_id', 'created_at'])
+        batch_op.create_index('ix_bookmark_user_url', ['user_id', 'url'])
+
+
+def downgrade():
+    with op.batch_alter_table('bookmark') as batch_op:
+        batch_op.drop_index('ix_bookmark_user_url')
+        batch_op.drop_index('ix_bookmark_user_created_at')
+        batch_op.drop_index('ix_bookmark_user_visits')
+        batch_op.drop_index('ix_bookmark_user_id')
@@ -0,0 +1,47 @@
+"""user-029: unique, longer short URLs
+
+Revision ID: 42238c1600c2
+Revises: 2b6818889452
+Create Date: 2026-10-18 12:00:03
+
+Short codes were allocated with a check-then-insert, so concurrent creates could share one. Any
+duplicates left over are given fresh codes (the oldest bookmark keeps its code) before the unique
+index goes in.
+"""
+import random
+import string
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '42238c1600c2'
+down_revision = '2b6818889452'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    taken = set(connection.execute(sa.text('SELECT short_url FROM bookmark WHERE short_url IS NOT NULL')).scalars())
+    duplicates = connection.execute(sa.text(
+        'SELECT id FROM bookmark b WHERE EXISTS ('
+        'SELECT 1 FROM bookmark o WHERE o.short_url = b.short_url AND o.id < b.id)'
+    )).scalars().all()
+    for bookmark_id in duplicates:
+        code = None
+        while code is None or code in taken:
+            code = ''.join(random.choices(string.digits + string.ascii_letters, k=6))
+        taken.add(code)
+        connection.execute(sa.text('UPDATE bookmark SET short_url = :code WHERE id = :id'), {'code': code, 'id': bookmark_id})
+
+    with op.batch_alter_table('bookmark') as batch_op:
+        batch_op.alter_column('short_url', existing_type=sa.String(length=3), type_=sa.String(length=8), existing_nullable=True)
+        batch_op.create_index('ix_bookmark_short_url', ['short_url'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('bookmark') as batch_op:
+        batch_op.drop_index('ix_bookmark_short_url')
+        batch_op.alter_column('short_url', existing_type=sa.String(length=8), type_=sa.String(length=3), existing_nullable=True)
@@ -0,0 +1,39 @@
+"""user-036: public bookmarks and the leaderboard checkpoint
+
+Revision ID: 427798845db1
+Revises: 553ff1ee1147
+Create Date: 2026-10-18 12:00:08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '427798845db1'
+down_revision = '553ff1ee1147'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bookmark', sa.Column('is_public', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.create_index('ix_bookmark_public_visits', 'bookmark', ['is_public', 'visits'])
+    # Plain ALTER TABLE: a batch rebuild of `bookmark` would drop the search triggers.
+
+    op.create_table(
+        'leaderboard_entry',
+        sa.Column('bookmark_id', sa.Integer(), nullable=False),
+        sa.Column('visits', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['bookmark_id'], ['bookmark.id']),
+        sa.PrimaryKeyConstraint('bookmark_id'),
+    )
+    op.create_index('ix_leaderboard_entry_visits', 'leaderboard_entry', ['visits'])
+
+
+def downgrade():
+    op.drop_index('ix_leaderboard_entry_visits', table_name='leaderboard_entry')
+    op.drop_table('leaderboard_entry')
+    op.drop_index('ix_bookmark_public_visits', table_name='bookmark')
+    op.drop_column('bookmark', 'is_public')
@@ -0,0 +1,35 @@
+"""user-048: refresh token records for rotation
+
+Revision ID: 4f49424422fc
+Revises: f87ae45b4a39
+Create Date: 2026-10-18 12:00:15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f49424422fc'
+down_revision = 'f87ae45b4a39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'refresh_token',
+        sa.Column('token_hash', sa.LargeBinary(length=16), nullable=False),
+        sa.Column('family', sa.LargeBinary(length=16), nullable=False),
+        sa.Column('used', sa.Boolean(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('token_hash'),
+    )
+    op.create_index('ix_refresh_token_family', 'refresh_token', ['family'])
+    op.create_index('ix_refresh_token_expires_at', 'refresh_token', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_refresh_token_expires_at', table_name='refresh_token')
+    op.drop_index('ix_refresh_token_family', table_name='refresh_token')
+    op.drop_table('refresh_token')
@@ -0,0 +1,70 @@
+"""user-034: folders with materialized paths
+
+Revision ID: 553ff1ee1147
+Revises: 7348f2b5383f
+Create Date: 2026-10-18 12:00:07
+
+The bookmark columns are added with plain ALTER TABLE rather than batch mode: recreating the
+`bookmark` table would drop the full-text search triggers along with it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '553ff1ee1147'
+down_revision = '7348f2b5383f'
+branch_labels = None
+depends_on = None
+
+SEARCH_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_insert AFTER INSERT ON bookmark BEGIN
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_delete AFTER DELETE ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_update AFTER UPDATE OF body, url, user_id ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+)
+# The triggers of revision 29d632e5754f, restored after the downgrade rebuilds the table.
+
+
+def upgrade():
+    op.create_table(
+        'folder',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(['parent_id'], ['folder.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_folder_user_path', 'folder', ['user_id', 'path'])
+
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ALTER TABLE bookmark ADD COLUMN folder_id INTEGER REFERENCES folder (id)')
+        # SQLite can add a column with a foreign key in place; alembic only offers it through a table rebuild.
+    else:
+        op.add_column('bookmark', sa.Column('folder_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(None, 'bookmark', 'folder', ['folder_id'], ['id'])
+    op.add_column('bookmark', sa.Column('folder_path', sa.String(length=255), nullable=True))
+    op.create_index('ix_bookmark_user_folder_path', 'bookmark', ['user_id', 'folder_path', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_bookmark_user_folder_path', table_name='bookmark')
+    with op.batch_alter_table('bookmark') as batch_op:
+        batch_op.drop_column('folder_path')
+        batch_op.drop_column('folder_id')
+    # SQLite can't drop a foreign key column in place, so the table is rebuilt here.
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SEARCH_TRIGGERS:
+            op.execute(sa.text(statement))
+
+    op.drop_index('ix_folder_user_path', table_name='folder')
+    op.drop_table('folder')
@@ -0,0 +1,33 @@
+"""user-044: case-insensitive unique emails
+
+Revision ID: 55f945695226
+Revises: 0344731be6b6
+Create Date: 2026-10-18 12:00:13
+
+Registration relies on this index to reject an email that differs from a taken one only in case.
+An existing database holding such duplicates has to have them resolved by hand first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '55f945695226'
+down_revision = '0344731be6b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT lower(email) FROM "user" GROUP BY lower(email) HAVING count(*) > 1'
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(f'Emails registered more than once in different case: {", ".join(duplicates)}')
+        # Failing with the addresses beats the index creation's bare integrity error.
+
+    op.create_index('uq_user_email_lower', 'user', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_user_email_lower', table_name='user')
@@ -0,0 +1,44 @@
+"""user-033: tags and the bookmark_tag inverted index
+
+Revision ID: 7348f2b5383f
+Revises: ed0c2e3e967b
+Create Date: 2026-10-18 12:00:06
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7348f2b5383f'
+down_revision = 'ed0c2e3e967b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tag',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('bookmark_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'name', name='uq_tag_user_name'),
+    )
+    op.create_table(
+        'bookmark_tag',
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.Column('bookmark_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['bookmark_id'], ['bookmark.id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['tag.id']),
+        sa.PrimaryKeyConstraint('tag_id', 'bookmark_id'),
+    )
+    op.create_index('ix_bookmark_tag_bookmark', 'bookmark_tag', ['bookmark_id', 'tag_id'])
+
+
+def downgrade():
+    op.drop_index('ix_bookmark_tag_bookmark', table_name='bookmark_tag')
+    op.drop_table('bookmark_tag')
+    op.drop_table('tag')
@@ -0,0 +1,33 @@
+"""user-037: hourly and daily click rollups
+
+Revision ID: 762d698a272e
+Revises: 427798845db1
+Create Date: 2026-10-18 12:00:09
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '762d698a272e'
+down_revision = '427798845db1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('hourly_clicks', 'daily_clicks'):
+        op.create_table(
+            table,
+            sa.Column('bookmark_id', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.DateTime(), nullable=False),
+            sa.Column('clicks', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['bookmark_id'], ['bookmark.id']),
+            sa.PrimaryKeyConstraint('bookmark_id', 'bucket'),
+        )
+
+
+def downgrade():
+    op.drop_table('daily_clicks')
+    op.drop_table('hourly_clicks')
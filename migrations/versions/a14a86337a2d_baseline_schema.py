@@ -0,0 +1,57 @@
+"""baseline schema: users and bookmarks
+
+Revision ID: a14a86337a2d
+Revises: 
+Create Date: 2026-10-18 12:00:00
+
+The tables as the app created them before migrations existed. Databases made back then already
+have them, so each table is only created if it is missing, and `flask db upgrade` works on both
+old and new databases.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a14a86337a2d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username'),
+            sa.UniqueConstraint('email'),
+        )
+
+    if not inspector.has_table('bookmark'):
+        op.create_table(
+            'bookmark',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('body', sa.Text(), nullable=True),
+            sa.Column('url', sa.Text(), nullable=False),
+            sa.Column('short_url', sa.String(length=3), nullable=True),
+            sa.Column('visits', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade():
+    op.drop_table('bookmark')
+    op.drop_table('user')
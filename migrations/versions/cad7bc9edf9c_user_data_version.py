@@ -0,0 +1,26 @@
+"""user-027: per-user change version for conditional GETs
+
+Revision ID: cad7bc9edf9c
+Revises: a14a86337a2d
+Create Date: 2026-10-18 12:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cad7bc9edf9c'
+down_revision = 'a14a86337a2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,35 @@
+"""user-038: unique-visitor sketches
+
+Revision ID: d8b9fa2d8977
+Revises: 762d698a272e
+Create Date: 2026-10-18 12:00:10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b9fa2d8977'
+down_revision = '762d698a272e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bookmark', sa.Column('visitor_registers', sa.LargeBinary(), nullable=True))
+    # Plain ALTER TABLE: a batch rebuild of `bookmark` would drop the search triggers.
+
+    op.create_table(
+        'daily_visitors',
+        sa.Column('bookmark_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('registers', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['bookmark_id'], ['bookmark.id']),
+        sa.PrimaryKeyConstraint('bookmark_id', 'bucket'),
+    )
+
+
+def downgrade():
+    op.drop_table('daily_visitors')
+    op.drop_column('bookmark', 'visitor_registers')
@@ -0,0 +1,26 @@
+"""user-032: per-user content version for caches that ignore visits
+
+Revision ID: ed0c2e3e967b
+Revises: 29d632e5754f
+Create Date: 2026-10-18 12:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ed0c2e3e967b'
+down_revision = '29d632e5754f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('content_version')
@@ -1,13 +1,23 @@
-from flask import Flask, redirect, jsonify
+from flask import Flask, redirect, jsonify, request
 import os
 from src.auth import auth  # Importing the authentication blueprint from the src.auth module
 from src.bookmarks import bookmarks  # Importing the bookmarks blueprint from the src.bookmarks module
-from src.database import db, Bookmark  # Importing the database object and the Bookmark model from the src.database module
-from flask_jwt_extended import JWTManager  # Importing JWTManager for handling JWT authentication
+from src.folders import folders  # Importing the folders blueprint from the src.folders module
+from src.leaderboard import leaderboard, record_visit  # Importing the leaderboard blueprint and its visit hook from the src.leaderboard module
+from src.analytics import record_click, buffer_visit  # Importing the click rollup and visit buffer hooks from the src.analytics module
+from src.domains import adjust_domains  # Importing the per-domain aggregate helper from the src.domains module
+from src.database import db, Bookmark, bump_user_version  # Importing the database object, the Bookmark model and the change version helper from the src.database module
+from src.tokens import CachingJWTManager  # Importing the JWT manager that caches verified tokens
+from src.users import users_cli  # Importing the `flask users` command group from the src.users module
+from src.bench import bench_cli  # Importing the `flask bench` command group from the src.bench module
 from http import HTTPStatus  # Importing HTTP status codes for better readability and maintainability
+from flask_migrate import Migrate  # Importing Migrate to apply schema changes to existing databases with Alembic
 from flasgger import Swagger, swag_from  # Importing Swagger for API documentation and swag_from for linking documentation files
 from src.config.swagger import template, swagger_config  # Importing Swagger configuration from the src.config.swagger module
 
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+# The Alembic migrations live next to the package, wherever the `flask` command is run from.
+
 def create_app(test_config=None):
     """Factory function to create and configure the Flask application."""
     app = Flask(__name__, instance_relative_config=True)  # Create a Flask app instance, allowing relative configuration
@@ -26,11 +36,45 @@ def create_app(test_config=None):
     else:
         app.config.from_mapping(test_config)  # Load the test configuration if provided
 
+    app.config.setdefault('BOOKMARK_BATCH_MAX_OPERATIONS', 500)  # Most operations accepted by POST /api/v1/bookmarks/batch
+    app.config.setdefault('BOOKMARK_BATCH_MAX_BYTES', 1024 * 1024)  # Largest batch request body accepted, in bytes
+    app.config.setdefault('AUTOCOMPLETE_MAX_USERS', 1000)  # Users whose autocomplete indexes are kept in memory (LRU)
+    app.config.setdefault('STATS_CACHE_MAX_ENTRIES', 1000)  # Cached stats responses kept in memory (LRU)
+    app.config.setdefault('SEARCH_CACHE_MAX_ENTRIES', 1000)  # Ranked search results kept in memory (LRU) so cursors page through a stable snapshot
+    app.config.setdefault('SEARCH_MAX_RESULTS', 1000)  # Most results one search ranks and pages through
+    app.config.setdefault('LEADERBOARD_SIZE', 100)  # Number of most-visited public links kept on the leaderboard
+    app.config.setdefault('LEADERBOARD_CHECKPOINT_INTERVAL', 60)  # Seconds between leaderboard checkpoints to the database
+    app.config.setdefault('LEADERBOARD_MAX_AGE', 30)  # Seconds clients and shared caches may reuse the leaderboard
+    app.config.setdefault('VISIT_FLUSH_INTERVAL', 10)  # Seconds between background merges of buffered visitor and referrer sketches into the database
+    app.config.setdefault('VISIT_BUFFER_MAX_KEYS', 1000)  # Buffered per-bookmark-per-day sketches and counters that force an early flush
+    app.config.setdefault('PASSWORD_HASH_WORKERS', min(os.cpu_count() or 1, 4))  # Processes that hash passwords (0 hashes inline)
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 32)  # Hashes queued or running at once before new ones get a 503
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5)  # Seconds a request waits for its hash before giving up with a 503
+    app.config.setdefault('PASSWORD_HASH_PRESET', 'default')  # Named hashing policy from src.passwords.PRESETS ('strong', 'default', 'pbkdf2', 'test')
+    app.config.setdefault('PASSWORD_HASH_METHOD', None)  # Explicit werkzeug method, e.g. 'scrypt:65536:8:2' or 'pbkdf2:sha256:900000'; overrides the preset
+    app.config.setdefault('LOGIN_LIMIT_IP_BURST', 30)  # Login attempts a client IP may make at once
+    app.config.setdefault('LOGIN_LIMIT_IP_PER_MINUTE', 30)  # Login attempts a client IP regains per minute
+    app.config.setdefault('LOGIN_LIMIT_EMAIL_BURST', 5)  # Login attempts against one email at once
+    app.config.setdefault('LOGIN_LIMIT_EMAIL_PER_MINUTE', 1)  # Login attempts against one email regained per minute
+    app.config.setdefault('RATE_LIMIT_BACKEND', 'memory')  # 'memory' (per process) or 'shared' (shared memory, for every worker on the host)
+    app.config.setdefault('RATE_LIMIT_SHARED_NAME', 'bookmarks-rate-limit')  # Name of the shared memory block used by the 'shared' backend
+    app.config.setdefault('RATE_LIMIT_MAX_KEYS', 65536)  # Buckets kept in memory, or slots in the shared memory block
+    app.config.setdefault('VALIDATION_CACHE_MAX_ENTRIES', 10000)  # Recently validated emails and URLs whose results are kept in memory (LRU)
+    app.config.setdefault('JWT_DECODE_CACHE_MAX_ENTRIES', 10000)  # Verified access tokens whose claims are kept in memory (LRU)
+    app.config.setdefault('REFRESH_TOKEN_SWEEP_INTERVAL', 60)  # Seconds between batches of the background expired refresh token and blocklist sweeper in each process
+    app.config.setdefault('REFRESH_TOKEN_SWEEP_BATCH', 1000)  # Expired refresh token records (and blocklist entries) deleted per sweeper batch
+    app.config.setdefault('REVOCATION_FILTER_REFRESH', 10)  # Seconds between rebuilds of the revoked-token Bloom filter; bounds how long other workers accept a revoked token
+
     db.init_app(app)  # Initialize the SQLAlchemy database with the Flask app
-    JWTManager(app)  # Initialize JWT handling for the app
+    Migrate(app, db, directory=MIGRATIONS_DIRECTORY, render_as_batch=True)  # Enable `flask db upgrade`; batch mode lets SQLite alter tables by copying them
+    CachingJWTManager(app)  # Initialize JWT handling for the app, skipping re-verification of tokens seen before
 
     app.register_blueprint(auth)  # Register the authentication blueprint with the Flask app
     app.register_blueprint(bookmarks)  # Register the bookmarks blueprint with the Flask app
+    app.register_blueprint(folders)  # Register the folders blueprint with the Flask app
+    app.register_blueprint(leaderboard)  # Register the leaderboard blueprint with the Flask app
+    app.cli.add_command(users_cli)  # Register the `flask users` commands (bulk import)
+    app.cli.add_command(bench_cli)  # Register the `flask bench` commands (benchmarks)
 
     Swagger(app, config=swagger_config, template=template)  # Initialize Swagger with custom configuration and template
 
@@ -40,7 +84,12 @@ def create_app(test_config=None):
         """Redirect the user to the real URL based on the provided short URL."""
         bookmark = Bookmark.query.filter_by(short_url=short_url).first_or_404()  # Query the Bookmark model for the short URL or return 404 if not found
         bookmark.visits += 1  # Increment the visit count for the bookmark
+        record_click(bookmark.id)  # Count the visit in the bookmark's hourly and daily click rollups
+        adjust_domains(bookmark.user_id, [(bookmark.host, 0, 1)])  # Add the visit to the owner's total for the bookmark's domain
+        bump_user_version(bookmark.user_id, visits_only=True)  # Invalidate the owner's ETags, since their stats changed
         db.session.commit()  # Commit the visit count increment to the database
+        record_visit(bookmark)  # Update the public leaderboard with the new visit count
+        buffer_visit(bookmark, f'{request.remote_addr}|{request.user_agent.string}', request.referrer, request.user_agent.string)  # Buffer the visitor, referrer and user agent for the analytics sketches
         return redirect(bookmark.url)  # Redirect the user to the original URL associated with the short URL
 
     @app.errorhandler(HTTPStatus.NOT_FOUND)  # Define a custom error handler for 404 Not Found errors
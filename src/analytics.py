@@ -0,0 +1,361 @@
+from datetime import datetime, timedelta
+# Importing datetime and timedelta to align clicks and query ranges to bucket boundaries.
+
+from collections import Counter
+# Importing Counter to count referrers and user agents between flushes.
+
+from urllib.parse import urlsplit
+# Importing urlsplit to reduce referrers to their host.
+
+import json
+# Importing json to store the heavy-hitter candidates next to their sketch.
+
+import atexit
+# Importing atexit to flush the visits still buffered when the process exits.
+
+from threading import Event, Lock, Thread
+# Importing Lock so concurrent redirects can share the in-memory visit buffer, and Thread and Event
+# to flush it in the background, waking early when it fills up.
+
+from flask import current_app
+# Importing current_app to keep one visit buffer per application.
+
+from sqlalchemy import select, update, delete, tuple_, bindparam
+# Importing SQLAlchemy Core constructs to read, merge and clean up the rollup tables.
+
+from src.database import Bookmark, HourlyClicks, DailyClicks, DailyVisitors, DailyBreakdown, db, bump_user_version, upsert
+# Importing the rollup models, the database instance and the change version helper.
+
+from src.sketches import HyperLogLog, CountMinSketch, HeavyHitters
+# Importing the unique-visitor estimator and the frequency sketches for referrers and user agents.
+
+from src.leaderboard import checkpoint_if_due
+# Importing the leaderboard checkpoint, which the flusher thread writes between flushes.
+
+BUCKETS = ('hour', 'day', 'week')
+# Bucket sizes accepted by the clicks endpoint.
+
+MAX_BUCKETS = 1000
+# Most buckets a single clicks query may return.
+
+BREAKDOWN_KINDS = ('referrer', 'user_agent')
+# Request details counted per bookmark and day.
+
+MAX_BREAKDOWN_VALUE_LENGTH = 200
+# Longest referrer host or user agent kept; longer values are truncated.
+
+DEFAULT_SPANS = {
+    'hour': timedelta(hours=24),
+    'day': timedelta(days=30),
+    'week': timedelta(weeks=12),
+}
+# Range covered when the request gives no `from`.
+
+STEPS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+def bucket_start(moment, bucket):
+    """Return the start of the hour, day or (Monday-based) week containing `moment`."""
+    start = moment.replace(minute=0, second=0, microsecond=0)
+    if bucket == 'hour':
+        return start
+    start = start.replace(hour=0)
+    if bucket == 'day':
+        return start
+    return start - timedelta(days=start.weekday())
+
+def increment(model, bookmark_id, bucket):
+    """Add one click to a rollup row, creating it on the bucket's first click."""
+    statement = upsert(model).values(bookmark_id=bookmark_id, bucket=bucket, clicks=1)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['bookmark_id', 'bucket'],
+        set_={'clicks': model.clicks + 1},
+    ))
+    # A single statement either way, so concurrent redirects never race on the first click of a bucket.
+
+def record_click(bookmark_id, moment=None):
+    """Count one redirect in the hourly and daily rollups of a bookmark."""
+    moment = moment or datetime.now()
+    increment(HourlyClicks, bookmark_id, bucket_start(moment, 'hour'))
+    increment(DailyClicks, bookmark_id, bucket_start(moment, 'day'))
+    # Two primary-key upserts per click; no per-click row is ever stored.
+
+def click_series(bookmark_id, start, end, bucket):
+    """Return `[(bucket_start, clicks)]` for every bucket between `start` and `end`, zeros included."""
+    first = bucket_start(start, bucket)
+    model = HourlyClicks if bucket == 'hour' else DailyClicks
+    # Weeks are summed from the daily rollup (seven rows each), never from individual clicks.
+
+    totals = {}
+    for day, clicks in db.session.execute(
+        select(model.bucket, model.clicks)
+        .where(model.bookmark_id == bookmark_id, model.bucket >= first, model.bucket < end)
+    ):
+        key = bucket_start(day, bucket)
+        totals[key] = totals.get(key, 0) + clicks
+    # One range scan over the `(bookmark_id, bucket)` primary key, reading at most one row per hour or day.
+
+    series = []
+    current = first
+    while current < end:
+        series.append((current, totals.get(current, 0)))
+        current += STEPS[bucket]
+    return series
+    # Filling empty buckets with zeros so charts get an evenly spaced series.
+
+def count_buckets(start, end, bucket):
+    """Return how many buckets `click_series` would produce for the range."""
+    first = bucket_start(start, bucket)
+    return max(0, -((first - end) // STEPS[bucket]))
+    # Ceiling division of the range by the bucket size.
+
+class VisitBuffer:
+    """Visit details collected in this process since the last flush.
+
+    Redirects only touch memory: a unique-visitor sketch per bookmark and day, and exact counts of
+    referrers and user agents. A background thread merges them into the stored sketches every
+    `interval` seconds, or as soon as `max_keys` keys are buffered, and a final flush runs at exit.
+    Both kinds of sketch merge losslessly (a register-wise max, a counter-wise sum), so each worker
+    can flush on its own schedule and the stored sketches still cover the visits seen by every worker.
+    """
+
+    def __init__(self, app, interval, max_keys):
+        self.app = app
+        self.interval = interval
+        self.max_keys = max_keys
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        # Held for a whole flush, so the exit flush never runs alongside the thread's.
+        self.wakeup = Event()
+        self.thread = None
+        self.visitors = {}
+        # (bookmark_id, day) -> HyperLogLog of the visitors seen since the last flush.
+        self.breakdowns = {}
+        # (bookmark_id, day, kind) -> Counter of referrers or user agents seen since the last flush.
+        self.owners = {}
+        # bookmark_id -> user_id, whose change version the flush bumps.
+
+    def add(self, bookmark_id, user_id, day, identifier, details):
+        with self.lock:
+            sketch = self.visitors.get((bookmark_id, day))
+            if sketch is None:
+                sketch = self.visitors[(bookmark_id, day)] = HyperLogLog()
+            sketch.add(identifier)
+            for kind, value in details.items():
+                self.breakdowns.setdefault((bookmark_id, day, kind), Counter())[value] += 1
+            self.owners[bookmark_id] = user_id
+            full = len(self.visitors) + len(self.breakdowns) >= self.max_keys
+
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='visit-flusher', daemon=True)
+                self.thread.start()
+                # Started on the first visit rather than with the app, so every forked worker runs its own.
+        if full:
+            self.wakeup.set()
+
+    def run(self):
+        """Flush every `interval` seconds, or sooner when a redirect finds the buffer full.
+
+        The leaderboard checkpoint rides on the same thread, so redirects only ever touch memory.
+        """
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+            with self.app.app_context():
+                checkpoint_if_due()
+
+    def flush(self):
+        """Write the buffered visits to the database, from outside any request."""
+        if not self.owners:
+            return
+        with self.flush_lock, self.app.app_context():
+            flush_visits(self)
+
+    def take(self):
+        """Detach and return the buffered visits, leaving the buffer empty."""
+        with self.lock:
+            taken = self.visitors, self.breakdowns, self.owners
+            self.visitors, self.breakdowns, self.owners = {}, {}, {}
+            return taken
+
+    def restore(self, visitors, breakdowns, owners):
+        """Put visits taken by a failed flush back, merged with whatever was buffered since."""
+        with self.lock:
+            for key, sketch in visitors.items():
+                if key in self.visitors:
+                    sketch.merge(self.visitors[key])
+                self.visitors[key] = sketch
+            for key, counts in breakdowns.items():
+                if key in self.breakdowns:
+                    counts.update(self.breakdowns[key])
+                self.breakdowns[key] = counts
+            for bookmark_id, user_id in owners.items():
+                self.owners.setdefault(bookmark_id, user_id)
+
+def get_visit_buffer():
+    """Return the application's visit buffer, creating it and registering its exit flush on first use."""
+    buffer = current_app.extensions.get('visits')
+    if buffer is None:
+        buffer = current_app.extensions['visits'] = VisitBuffer(
+            current_app._get_current_object(),
+            current_app.config['VISIT_FLUSH_INTERVAL'],
+            current_app.config['VISIT_BUFFER_MAX_KEYS'],
+        )
+        atexit.register(buffer.flush)
+        # Visits buffered since the last interval would otherwise be lost on a clean shutdown or restart.
+    return buffer
+
+def flush_visitors(visitors, owners):
+    """Merge buffered visitor sketches into the daily and all-time sketches; return the bookmarks still present."""
+    totals = dict(db.session.execute(
+        select(Bookmark.id, Bookmark.visitor_registers).where(Bookmark.id.in_(list(owners))).with_for_update()
+    ).all())
+    stored = {
+        (bookmark_id, bucket): registers
+        for bookmark_id, bucket, registers in db.session.execute(
+            select(DailyVisitors.bookmark_id, DailyVisitors.bucket, DailyVisitors.registers)
+            .where(tuple_(DailyVisitors.bookmark_id, DailyVisitors.bucket).in_(list(visitors)))
+            .with_for_update()
+        )
+    }
+    # Two reads for the whole flush. Locking the rows keeps two workers that flush the same
+    # bookmark at once from overwriting each other's merge, where the database supports it.
+
+    days = []
+    merged = {}
+    for (bookmark_id, day), sketch in visitors.items():
+        if bookmark_id not in totals:
+            continue
+            # Deleted since the visit was buffered.
+        days.append({
+            'bookmark_id': bookmark_id,
+            'bucket': day,
+            'registers': HyperLogLog.from_bytes(stored.get((bookmark_id, day))).merge(sketch).to_bytes(),
+        })
+        if bookmark_id not in merged:
+            merged[bookmark_id] = HyperLogLog.from_bytes(totals[bookmark_id])
+        merged[bookmark_id].merge(sketch)
+
+    if days:
+        statement = upsert(DailyVisitors)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['bookmark_id', 'bucket'],
+                set_={'registers': statement.excluded.registers},
+            ),
+            days,
+        )
+        db.session.execute(
+            update(Bookmark.__table__)
+            .where(Bookmark.__table__.c.id == bindparam('b'))
+            .values(visitor_registers=bindparam('r'), updated_at=Bookmark.__table__.c.updated_at),
+            [{'b': bookmark_id, 'r': sketch.to_bytes()} for bookmark_id, sketch in merged.items()],
+        )
+        # One executemany each; keeping `updated_at` as is, since a visit doesn't edit the bookmark.
+
+    return set(totals)
+
+def flush_breakdowns(breakdowns, present):
+    """Fold buffered referrer and user agent counts into the stored daily sketches."""
+    keys = [key for key in breakdowns if key[0] in present]
+    if not keys:
+        return
+
+    stored = {
+        (bookmark_id, bucket, kind): HeavyHitters(CountMinSketch.from_bytes(counts), json.loads(candidates))
+        for bookmark_id, bucket, kind, counts, candidates in db.session.execute(
+            select(DailyBreakdown.bookmark_id, DailyBreakdown.bucket, DailyBreakdown.kind, DailyBreakdown.counts, DailyBreakdown.candidates)
+            .where(tuple_(DailyBreakdown.bookmark_id, DailyBreakdown.bucket, DailyBreakdown.kind).in_(keys))
+            .with_for_update()
+        )
+    }
+
+    rows = []
+    for key in keys:
+        hitters = stored.get(key) or HeavyHitters()
+        for value, count in breakdowns[key].items():
+            hitters.add(value, count)
+            # The buffer counted exactly; the sketch only sees one addition per distinct value.
+        rows.append({
+            'bookmark_id': key[0],
+            'bucket': key[1],
+            'kind': key[2],
+            'counts': hitters.sketch.to_bytes(),
+            'candidates': json.dumps(sorted(hitters.candidates)),
+        })
+
+    statement = upsert(DailyBreakdown)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=['bookmark_id', 'bucket', 'kind'],
+            set_={'counts': statement.excluded.counts, 'candidates': statement.excluded.candidates},
+        ),
+        rows,
+    )
+
+def flush_visits(buffer):
+    """Write everything buffered since the last flush in one transaction, re-queueing it if that fails."""
+    visitors, breakdowns, owners = buffer.take()
+    if not owners:
+        return
+
+    try:
+        present = flush_visitors(visitors, owners)
+        flush_breakdowns(breakdowns, present)
+
+        for user_id in {owners[bookmark_id] for bookmark_id in present}:
+            bump_user_version(user_id, visits_only=True)
+            # Their stats now report new visitor counts.
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        buffer.restore(visitors, breakdowns, owners)
+        current_app.logger.exception('Flushing visits of %d bookmarks failed; retrying at the next flush', len(owners))
+        # Nothing was written, since it is one transaction, so merging the visits back loses and double-counts none.
+
+def referrer_host(referrer):
+    """Reduce a Referer header to its host, or '(direct)' when there is none."""
+    host = urlsplit(referrer or '').hostname
+    return host[:MAX_BREAKDOWN_VALUE_LENGTH] if host else '(direct)'
+    # Full referring URLs would be near-unique and may carry private query strings.
+
+def buffer_visit(bookmark, identifier, referrer, user_agent):
+    """Buffer a visit's visitor and request details for the next background flush."""
+    get_visit_buffer().add(bookmark.id, bookmark.user_id, bucket_start(datetime.now(), 'day'), identifier, {
+        'referrer': referrer_host(referrer),
+        'user_agent': (user_agent or '(unknown)')[:MAX_BREAKDOWN_VALUE_LENGTH],
+    })
+    # The redirect never waits for a flush.
+
+def unique_visitors(bookmark_id, start, end):
+    """Estimate the distinct visitors of a bookmark over the days between `start` and `end`."""
+    sketch = HyperLogLog()
+    for registers in db.session.execute(
+        select(DailyVisitors.registers)
+        .where(DailyVisitors.bookmark_id == bookmark_id, DailyVisitors.bucket >= bucket_start(start, 'day'), DailyVisitors.bucket < end)
+    ).scalars():
+        sketch.merge(HyperLogLog.from_bytes(registers))
+    return sketch.estimate()
+    # Visitors who came back on several days are counted once, which summing daily counts couldn't do.
+
+def top_breakdowns(bookmark_id, start, end, limit):
+    """Return `{kind: [(value, estimated count)]}` over the days between `start` and `end`."""
+    merged = {kind: HeavyHitters() for kind in BREAKDOWN_KINDS}
+    for kind, counts, candidates in db.session.execute(
+        select(DailyBreakdown.kind, DailyBreakdown.counts, DailyBreakdown.candidates)
+        .where(DailyBreakdown.bookmark_id == bookmark_id, DailyBreakdown.bucket >= bucket_start(start, 'day'), DailyBreakdown.bucket < end)
+    ):
+        merged[kind].merge(HeavyHitters(CountMinSketch.from_bytes(counts), json.loads(candidates)))
+    # One range scan over the primary key; merging daily sketches answers any range of days.
+
+    return {kind: hitters.top(limit) for kind, hitters in merged.items()}
+
+def forget_clicks(bookmark_ids):
+    """Delete the rollups and sketches of bookmarks that are about to be deleted."""
+    if bookmark_ids:
+        for model in (HourlyClicks, DailyClicks, DailyVisitors, DailyBreakdown):
+            db.session.execute(delete(model).where(model.bookmark_id.in_(bookmark_ids)))
@@ -1,69 +1,108 @@
 from flask import Blueprint, request, jsonify  # Import Flask components for Blueprint, handling requests, and returning JSON responses
-from werkzeug.security import check_password_hash, generate_password_hash  # Import functions for password hashing and verification
+import click  # Import click to define the sweeper command's options and print its results
+from src.ratelimit import check_login_allowed  # Import the per-IP and per-email login rate limiter
+from src.tokens import revoke_token, issue_refresh_token, rotate_refresh_token, sweep_refresh_tokens, sweep_revoked_tokens  # Import token revocation, refresh token rotation and the expired token sweepers
+from jwt.exceptions import PyJWTError  # Import the base error raised for malformed or invalid tokens
+from src.passwords import hash_password, verify_password, needs_rehash, HashingUnavailable  # Import password hashing and verification, which run in a bounded process pool
 from src.constants.http_status_codes import (  # Import HTTP status codes with custom aliases for readability
     BAD_REQUEST as HTTP_400_BAD_REQUEST,  # HTTP 400: Bad Request, used for invalid requests
     CONFLICT as HTTP_409_CONFLICT,  # HTTP 409: Conflict, used when resources conflict, e.g., duplicate username/email
     CREATED as HTTP_201_CREATED,  # HTTP 201: Created, used when a resource is successfully created
     UNAUTHORIZED as HTTP_401_UNAUTHORIZED,  # HTTP 401: Unauthorized, used for failed authentication
     OK as HTTP_200_OK,  # HTTP 200: OK, used for successful requests
-    NOT_FOUND as HTTP_404_NOT_FOUND  # HTTP 404: Not Found, used when a resource is not found
+    NOT_FOUND as HTTP_404_NOT_FOUND,  # HTTP 404: Not Found, used when a resource is not found
+    FORBIDDEN as HTTP_403_FORBIDDEN,  # HTTP 403: Forbidden, used when revoking another user's token
+    TOO_MANY_REQUESTS as HTTP_429_TOO_MANY_REQUESTS,  # HTTP 429: Too Many Requests, used when login attempts are rate limited
+    SERVICE_UNAVAILABLE as HTTP_503_SERVICE_UNAVAILABLE  # HTTP 503: Service Unavailable, used when password hashing is overloaded
 )
-import validators  # Import the validators module for input validation (e.g., email validation)
-from src.database import User, db  # Import User model and database instance from the database module
-from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token, get_jwt_identity  # Import JWT handling functions for authentication
+from src.validation import is_valid_email  # Import the memoized email validator
+from src.database import User, db, violated_constraint  # Import User model, database instance and the helper naming the constraint an insert violated
+from sqlalchemy import func  # Import func to compare emails case-insensitively
+from sqlalchemy.exc import IntegrityError  # Import IntegrityError to detect duplicate usernames and emails from the insert itself
+from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity, get_jwt, decode_token  # Import JWT handling functions for authentication
 from flasgger import swag_from  # Import swag_from to link Swagger documentation to API routes
 
 # Create a Blueprint for authentication routes, with a URL prefix for all routes in this Blueprint
 auth = Blueprint("auth", __name__, url_prefix="/api/v1/auth")
 
-@auth.post('/register')
-@swag_from('./docs/auth/register.yaml')  # Link Swagger documentation to the register endpoint
-def register():
-    """Register a new user."""
-    
-    # Ensure that the request content type is JSON
-    if not request.is_json:
-        return jsonify({'error': 'Request must be JSON'}), HTTP_400_BAD_REQUEST
+def profile_claims(user):
+    """Return the profile fields embedded in the user's tokens, so /me can answer without a query."""
+    return {'username': user.username, 'email': user.email}
 
-    data = request.get_json()  # Parse JSON data from the request body
-    username = data.get('username')  # Extract username from the request data
-    email = data.get('email')  # Extract email from the request data
-    password = data.get('password')  # Extract password from the request data
+@auth.errorhandler(HashingUnavailable)
+def handle_hashing_unavailable(e):
+    """Return a 503 when the password hashing pool is saturated, so clients back off and retry."""
+    return jsonify({'error': 'Server is busy, please try again shortly'}), HTTP_503_SERVICE_UNAVAILABLE, {'Retry-After': '1'}
+
+REGISTRATION_CONFLICTS = {
+    'uq_user_email_lower': 'Email is already taken',  # The case-insensitive email index, on every database
+    'user.email': 'Email is already taken',  # SQLite's name for the email column's own unique constraint
+    'user_email_key': 'Email is already taken',  # PostgreSQL's name for it
+    'user.username': 'Username is already taken',  # SQLite's name for the username unique constraint
+    'user_username_key': 'Username is already taken',  # PostgreSQL's name for it
+}
+# The unique constraints a registration can violate, and the 409 message for each.
+
+def registration_error(username, email, password, password_hashed=False):
+    """Return why a new user's fields are invalid, or None if they are valid."""
 
     # Validate input fields for completeness
     if not username or not email or not password:
-        return jsonify({'error': 'Missing required fields'}), HTTP_400_BAD_REQUEST
+        return 'Missing required fields'
 
-    # Validate password length (minimum 6 characters)
-    if len(password) < 6:
-        return jsonify({'error': 'Password is too short'}), HTTP_400_BAD_REQUEST
+    # Validate password length (minimum 6 characters); a stored hash hides the length
+    if not password_hashed and len(password) < 6:
+        return 'Password is too short'
 
     # Validate username length (minimum 3 characters)
     if len(username) < 3:
-        return jsonify({'error': 'Username is too short'}), HTTP_400_BAD_REQUEST
+        return 'Username is too short'
 
     # Validate username (alphanumeric and no spaces allowed)
     if not username.isalnum() or " " in username:
-        return jsonify({'error': 'Username should be alphanumeric and contain no spaces'}), HTTP_400_BAD_REQUEST
+        return 'Username should be alphanumeric and contain no spaces'
 
-    # Validate email format using the validators module
-    if not validators.email(email):
-        return jsonify({'error': 'Email is not valid'}), HTTP_400_BAD_REQUEST
+    # Validate email format; repeated addresses are answered from the validation cache
+    if not is_valid_email(email):
+        return 'Email is not valid'
 
-    # Check if the email is already taken by another user
-    if User.query.filter_by(email=email).first() is not None:
-        return jsonify({'error': 'Email is already taken'}), HTTP_409_CONFLICT
+    return None
 
-    # Check if the username is already taken by another user
-    if User.query.filter_by(username=username).first() is not None:
-        return jsonify({'error': 'Username is already taken'}), HTTP_409_CONFLICT
+@auth.post('/register')
+@swag_from('./docs/auth/register.yaml')  # Link Swagger documentation to the register endpoint
+def register():
+    """Register a new user."""
+    
+    # Ensure that the request content type is JSON
+    if not request.is_json:
+        return jsonify({'error': 'Request must be JSON'}), HTTP_400_BAD_REQUEST
+
+    data = request.get_json()  # Parse JSON data from the request body
+    username = data.get('username')  # Extract username from the request data
+    email = data.get('email')  # Extract email from the request data
+    password = data.get('password')  # Extract password from the request data
+
+    # Validate the fields with the same rules the bulk import applies
+    error = registration_error(username, email, password)
+    if error:
+        return jsonify({'error': error}), HTTP_400_BAD_REQUEST
 
     # Hash the user's password for security purposes
-    pwd_hash = generate_password_hash(password)
+    pwd_hash = hash_password(password)  # Runs in the hashing pool; raises HashingUnavailable when it is overloaded
     # Create a new User instance with the provided username, hashed password, and email
     user = User(username=username, password=pwd_hash, email=email)
     db.session.add(user)  # Add the new user to the database session
-    db.session.commit()  # Commit the transaction to save the user to the database
+
+    # Commit with a single INSERT; the unique indexes reject a taken email or username atomically,
+    # so concurrent signups can't both pass a check-then-insert race
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()  # Discard the failed insert
+        conflict = REGISTRATION_CONFLICTS.get(violated_constraint(e))  # Matched by the violated constraint's name, not the message's wording
+        if conflict is None:
+            raise  # Any other integrity error is a real failure
+        return jsonify({'error': conflict}), HTTP_409_CONFLICT
 
     # Return a success message along with the created user's username and email
     return jsonify({
@@ -82,17 +121,37 @@ def login():
         return jsonify({'error': 'Request must be JSON'}), HTTP_400_BAD_REQUEST
 
     data = request.get_json()  # Parse JSON data from the request body
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), HTTP_400_BAD_REQUEST
     email = data.get('email')  # Extract email from the request data
     password = data.get('password')  # Extract password from the request data
 
+    # Reject missing or non-string credentials up front; a number or list would otherwise fail deep in the lookup or the hash check
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({'error': "'email' and 'password' must be strings"}), HTTP_400_BAD_REQUEST
+
+    # Rate limit before any database lookup or hash check, so a credential-stuffing burst costs almost nothing to turn away
+    retry_after = check_login_allowed(request.remote_addr, email.strip().lower())
+    if retry_after:
+        return jsonify({'error': 'Too many login attempts, please try again later'}), HTTP_429_TOO_MANY_REQUESTS, {'Retry-After': str(retry_after)}
+
     # Find the user in the database by email
-    user = User.query.filter_by(email=email).first()
+    user = User.query.filter(func.lower(User.email) == email.lower()).first()  # Case-insensitive, served by the lower(email) unique index
 
     # Verify if the user exists and if the provided password matches the stored hashed password
-    if user and check_password_hash(user.password, password):
+    if user and verify_password(user.password, password):
+        # Upgrade the stored hash if it was made with an outdated method or cost; the plain password is only available now
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except HashingUnavailable:
+                db.session.rollback()  # Keep the old hash and let the login succeed; the next login retries the upgrade
+
         # Create a refresh token and an access token for the authenticated user
-        refresh = create_refresh_token(identity=user.id)
-        access = create_access_token(identity=user.id)
+        refresh = issue_refresh_token(user.id)  # Starts a new refresh token family, recorded for rotation
+        access = create_access_token(identity=user.id, additional_claims=profile_claims(user))  # Embed the profile so /me needs no DB lookup
+        db.session.commit()  # Save the refresh token record
 
         # Return the tokens and user details
         return jsonify({
@@ -112,8 +171,16 @@ def login():
 def me():
     """Return information about the currently authenticated user."""
     
+    claims = get_jwt()  # Get the verified claims of the access token
+    if 'username' in claims and 'email' in claims:
+        # Serve the profile embedded at login or refresh; no database round-trip
+        return jsonify({
+            "username": claims['username'],
+            "email": claims['email']
+        }), HTTP_200_OK  # Respond with HTTP 200: OK
+
     user_id = get_jwt_identity()  # Get the authenticated user's ID from the JWT
-    user = User.query.filter_by(id=user_id).first()  # Find the user by their ID in the database
+    user = User.query.filter_by(id=user_id).first()  # Tokens issued before profile claims existed fall back to the database
 
     # If the user is found, return their username and email
     if user:
@@ -128,12 +195,63 @@ def me():
 @auth.post('/token/refresh')
 @jwt_required(refresh=True)  # Require a valid refresh token to access this route
 def refresh_users_token():
-    """Refresh the access token for the currently authenticated user."""
+    """Exchange a refresh token for a new access token and a new refresh token."""
     
     identity = get_jwt_identity()  # Get the authenticated user's ID from the JWT
-    access = create_access_token(identity=identity)  # Create a new access token
+    user = db.session.get(User, identity)  # Reload the profile, so a changed username or email reaches the next access token
+    if user is None:
+        return jsonify({'error': 'User not found'}), HTTP_404_NOT_FOUND  # Respond with HTTP 404: Not Found
+
+    refresh = rotate_refresh_token(get_jwt())  # Spend this refresh token; each one can be exchanged only once
+    if refresh is None:
+        return jsonify({'error': 'Refresh token has been used or revoked'}), HTTP_401_UNAUTHORIZED  # Respond with HTTP 401: Unauthorized
+
+    access = create_access_token(identity=identity, additional_claims=profile_claims(user))  # Create a new access token with fresh profile claims
+    db.session.commit()  # Save the rotation
 
-    # Return the new access token
+    # Return the new tokens; the client must replace its refresh token
     return jsonify({
-        'access': access
+        'access': access,
+        'refresh': refresh
     }), HTTP_200_OK  # Respond with HTTP 200: OK
+
+@auth.post('/logout')
+@jwt_required(verify_type=False)  # Accept an access or a refresh token
+def logout():
+    """Revoke the token used for this request."""
+    revoke_token(get_jwt())  # Blocklist the token's jti until it expires
+
+    return jsonify({'message': 'Logged out'}), HTTP_200_OK  # Respond with HTTP 200: OK
+
+@auth.post('/token/revoke')
+@jwt_required()  # Protect this route with JWT authentication
+def revoke_users_token():
+    """Revoke another token of the current user, such as a refresh token, given in the request body."""
+    if not request.is_json:
+        return jsonify({'error': 'Request must be JSON'}), HTTP_400_BAD_REQUEST
+
+    data = request.get_json()
+    token = data.get('token') if isinstance(data, dict) else None
+    if not isinstance(token, str):
+        return jsonify({'error': "'token' must be a string"}), HTTP_400_BAD_REQUEST  # e.g. a number, which decode_token can't split into segments
+
+    try:
+        payload = decode_token(token)  # Verify the token's signature and expiry
+    except PyJWTError:
+        return jsonify({'error': 'Token is not valid'}), HTTP_400_BAD_REQUEST
+
+    if payload.get('sub') != get_jwt_identity():
+        return jsonify({'error': "Cannot revoke another user's token"}), HTTP_403_FORBIDDEN  # Respond with HTTP 403: Forbidden
+
+    revoke_token(payload)  # Blocklist the token's jti until it expires
+
+    return jsonify({'message': 'Token revoked'}), HTTP_200_OK  # Respond with HTTP 200: OK
+
+@auth.cli.command('sweep-refresh-tokens')
+@click.option('--batch-size', default=1000, show_default=True, help='Expired records deleted per transaction.')
+def sweep_refresh_tokens_command(batch_size):
+    """Delete every expired refresh token record and blocklist entry, in batches; suitable for a cron job."""
+    deleted = sweep_refresh_tokens(batch_size)
+    click.echo(f'Deleted {deleted} expired refresh token records.')
+    deleted = sweep_revoked_tokens(batch_size)
+    click.echo(f'Deleted {deleted} expired blocklist entries.')
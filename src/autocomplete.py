@@ -0,0 +1,98 @@
+from bisect import bisect_left
+# Importing bisect_left to binary-search the sorted prefix arrays.
+
+from flask import current_app
+# Importing current_app to keep one index cache per application.
+
+from src.cache import VersionedLRUCache
+# Importing the LRU cache that drops entries when the user's change version moves on.
+
+from src.database import Bookmark, db
+# Importing the Bookmark model and the database instance to build indexes.
+
+def normalize(text):
+    """Lowercase a URL or typed prefix and strip the scheme and a leading 'www.'."""
+    text = text.strip().lower()
+    scheme_end = text.find('://')
+    if scheme_end != -1:
+        text = text[scheme_end + 3:]
+    if text.startswith('www.'):
+        text = text[4:]
+    return text
+
+def host_suffixes(host):
+    """Return the host and each parent domain that still has two labels, e.g. docs.python.org -> [docs.python.org, python.org]."""
+    labels = host.split('.')
+    return ['.'.join(labels[i:]) for i in range(max(len(labels) - 1, 1))]
+
+class PrefixIndex:
+    """Sorted-array prefix index over one user's bookmark URLs and domains.
+
+    Each URL is stored under its normalized form and under every parent-domain form, so typing
+    'python' finds 'https://docs.python.org/3/'. Lookups are a binary search followed by a short
+    forward scan over the matching range.
+    """
+
+    def __init__(self, rows):
+        url_entries = []
+        domains = set()
+        self.bookmarks = {}
+
+        for bookmark_id, url, short_url in rows:
+            self.bookmarks[bookmark_id] = {'id': bookmark_id, 'url': url, 'short_url': short_url}
+            key = normalize(url)
+            authority = key.split('/', 1)[0]
+            path = key[len(authority):]
+            host = authority.split(':')[0]
+            # Splitting off the path and dropping any port from the host.
+
+            for suffix in host_suffixes(host):
+                url_entries.append((suffix + path, bookmark_id))
+                domains.add(suffix)
+
+        url_entries.sort()
+        self.url_keys = [key for key, _ in url_entries]
+        self.url_ids = [bookmark_id for _, bookmark_id in url_entries]
+        self.domains = sorted(domains)
+        # Parallel sorted arrays are far more compact than a trie of per-character dicts.
+
+    def complete(self, prefix, limit):
+        """Return up to `limit` bookmarks and domains starting with `prefix`."""
+        prefix = normalize(prefix)
+
+        urls = []
+        seen = set()
+        i = bisect_left(self.url_keys, prefix)
+        while i < len(self.url_keys) and self.url_keys[i].startswith(prefix) and len(urls) < limit:
+            bookmark_id = self.url_ids[i]
+            if bookmark_id not in seen:
+                seen.add(bookmark_id)
+                urls.append(self.bookmarks[bookmark_id])
+                # A bookmark can match through several domain forms; report it once.
+            i += 1
+
+        domains = []
+        i = bisect_left(self.domains, prefix)
+        while i < len(self.domains) and self.domains[i].startswith(prefix) and len(domains) < limit:
+            domains.append(self.domains[i])
+            i += 1
+
+        return {'urls': urls, 'domains': domains}
+
+def get_prefix_index(user_id, version):
+    """Return the user's prefix index, building it on first use or after their bookmarks changed."""
+    cache = current_app.extensions.get('autocomplete')
+    if cache is None:
+        cache = current_app.extensions['autocomplete'] = VersionedLRUCache(current_app.config['AUTOCOMPLETE_MAX_USERS'])
+        # One cache per application, bounded to the most recently active users.
+
+    index = cache.get(user_id, version)
+    if index is None:
+        rows = db.session.execute(
+            db.select(Bookmark.id, Bookmark.url, Bookmark.short_url).where(Bookmark.user_id == user_id)
+        ).all()
+        index = PrefixIndex(rows)
+        cache.put(user_id, version, index)
+        # Any bookmark create, edit or delete bumps the user's content version, so the next lookup rebuilds the index.
+
+    return index
@@ -0,0 +1,191 @@
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+# Importing what the benchmarks need to build throwaway corpora and databases and to time them.
+
+import click
+# Importing click to define the commands' options and print their results.
+
+from flask import current_app
+# Importing current_app to copy the app's settings into the benchmarks' throwaway apps.
+
+from flask.cli import AppGroup
+# Importing AppGroup for the `flask bench` command group.
+
+from werkzeug.security import generate_password_hash
+# Importing werkzeug's hashing function, to time each preset inline on one core.
+
+from flask_jwt_extended import create_access_token, decode_token
+# Importing the public token functions, so the JWT benchmark goes through the app's manager like a request does.
+
+from src.bookmarks import SEARCH_SQL, search_match_expression
+# Importing the search endpoint's query and MATCH expression, so the benchmark times exactly what it runs.
+
+from src.passwords import PRESETS
+# Importing the named hashing policies the hashing benchmark compares.
+
+from src.database import SEARCH_INDEX_DDL, SEARCH_INDEX_POPULATE, db
+# Importing the full-text index DDL, to index the synthetic corpus the way migrations index real data,
+# and the database instance, to create the throwaway apps' tables.
+
+bench_cli = AppGroup('bench', help='Measure the cost of hot paths.')
+# The `flask bench` command group, registered on the app in `create_app`.
+
+def percentiles(timings):
+    """Return the p50 and p99 of a list of durations in seconds, in milliseconds."""
+    timings = sorted(timings)
+    return tuple(timings[min(len(timings) - 1, int(len(timings) * fraction))] * 1000 for fraction in (0.5, 0.99))
+
+@bench_cli.command('search')
+@click.option('--rows', default=1000000, show_default=True, help='Bookmarks in the synthetic corpus.')
+@click.option('--users', default=1000, show_default=True, help='Users the bookmarks are spread over.')
+@click.option('--queries', default=500, show_default=True, help='Searches timed.')
+def search_command(rows, users, queries):
+    """Report search latency over a synthetic corpus in a temporary SQLite database.
+
+    Times the per-user MATCH used by the endpoint against the previous approach, which matched
+    every user's bookmarks and filtered by owner afterwards.
+    """
+    vocabulary = [f'word{n}' for n in range(20000)]
+    cumulative = list(itertools.accumulate(1 / (n + 1) for n in range(len(vocabulary))))
+    # Zipf-like term frequencies, so common words have long posting lists as in real text.
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection = sqlite3.connect(os.path.join(directory, 'search.db'))
+        connection.execute('CREATE TABLE bookmark (id INTEGER PRIMARY KEY, user_id INTEGER, body TEXT, url TEXT)')
+        for start in range(0, rows, 10000):
+            connection.executemany('INSERT INTO bookmark VALUES (?, ?, ?, ?)', [(
+                id, rng.randrange(users) + 1,
+                ' '.join(rng.choices(vocabulary, cum_weights=cumulative, k=8)),
+                f'https://{rng.choice(vocabulary)}.example.com/{rng.choice(vocabulary)}',
+            ) for id in range(start + 1, min(start + 10000, rows) + 1)])
+        for statement in SEARCH_INDEX_DDL + (SEARCH_INDEX_POPULATE,):
+            connection.execute(statement)
+        connection.commit()
+        click.echo(f'Indexed {rows} bookmarks for {users} users.')
+
+        unscoped = (
+            'SELECT bookmark.id FROM bookmark_fts JOIN bookmark ON bookmark.id = bookmark_fts.rowid '
+            'WHERE bookmark_fts MATCH :terms AND bookmark.user_id = :user_id ORDER BY bookmark_fts.rank, bookmark.id LIMIT :limit'
+        )
+        searches = [(rng.randrange(users) + 1, rng.choice(vocabulary[:200])) for _ in range(queries)]
+        # Frequent words are the slow case: their posting lists span every user.
+
+        for name, sql, params in (
+            ('per-user match', SEARCH_SQL, lambda user_id, term: {'match': search_match_expression(term, user_id), 'limit': 1000}),
+            ('match then filter', unscoped, lambda user_id, term: {'terms': f'"{term}"', 'user_id': user_id, 'limit': 1000}),
+        ):
+            timings = []
+            for user_id, term in searches:
+                started = time.perf_counter()
+                connection.execute(sql, params(user_id, term)).fetchall()
+                timings.append(time.perf_counter() - started)
+            p50, p99 = percentiles(timings)
+            click.echo(f'{name:<18} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms')
+        connection.close()
+
+@bench_cli.command('hashing')
+@click.option('--seconds', default=2.0, show_default=True, help='Time spent hashing with each preset.')
+def hashing_command(seconds):
+    """Report password hashes per second on one core for each hashing preset."""
+    for name, method in PRESETS.items():
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            generate_password_hash('benchmark-password', method)
+            # Hashed inline, in this process, to measure a single core.
+            count += 1
+        elapsed = time.perf_counter() - started
+        click.echo(f'{name:<8} {method:<24} {count / elapsed:10.1f} hashes/s per core')
+
+@bench_cli.command('jwt')
+@click.option('--count', default=20000, show_default=True, help='Token verifications to time.')
+def jwt_command(count):
+    """Report the per-request cost of verifying an access token, with and without the verification cache."""
+    claims = {'username': 'benchmark', 'email': 'benchmark@example.com'}
+    tokens = [create_access_token(identity=1, additional_claims=claims) for _ in range(count)]
+    # Every token is distinct, so each decode below misses the cache and checks the signature.
+
+    started = time.perf_counter()
+    for token in tokens:
+        decode_token(token)
+    uncached = (time.perf_counter() - started) / count
+
+    started = time.perf_counter()
+    for _ in range(count):
+        decode_token(tokens[-1])
+        # The last token was just verified, so every call is answered from the cache.
+    cached = (time.perf_counter() - started) / count
+
+    click.echo(f'uncached {uncached * 1e6:8.1f} us/request')
+    click.echo(f'cached   {cached * 1e6:8.1f} us/request')
+
+@bench_cli.command('login-storm')
+@click.option('--logins', default=8, show_default=True, help='Threads logging in continuously during the storm.')
+@click.option('--redirects', default=500, show_default=True, help='Short URL redirects timed with and without the storm.')
+def login_storm_command(logins, redirects):
+    """Report short URL redirect latency alone and during a storm of logins, with hashing inline and in the pool.
+
+    Runs against a throwaway SQLite database with the app's hashing settings. A redirect never hashes,
+    so its p99 should hardly move while the pool absorbs the logins; hashing inline shows the cost of
+    logins competing with redirects for the web worker.
+    """
+    from src import create_app
+    # Imported here, since the app factory itself imports this module.
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, workers in (('inline', 0), ('pool', current_app.config['PASSWORD_HASH_WORKERS'] or 4)):
+            app = create_app({
+                **current_app.config,
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, f'{label}.db')}",
+                'PASSWORD_HASH_WORKERS': workers,
+                'PASSWORD_HASH_MAX_PENDING': max(logins, 1) * 2,
+                'LOGIN_LIMIT_IP_BURST': 10 ** 9,
+                'LOGIN_LIMIT_EMAIL_BURST': 10 ** 9,
+                # The benchmark measures hashing pressure, so the login rate limits are lifted.
+            })
+            with app.app_context():
+                db.create_all()
+            client = app.test_client()
+            credentials = {'username': 'benchmark', 'email': 'benchmark@example.com', 'password': 'benchmark-password'}
+            client.post('/api/v1/auth/register', json=credentials)
+            access = client.post('/api/v1/auth/login', json=credentials).json['user']['access']
+            short_url = client.post('/api/v1/bookmarks/', headers={'Authorization': f'Bearer {access}'}, json={'url': 'https://example.com/'}).json['short_url']
+
+            def time_redirects():
+                timings = []
+                for _ in range(redirects):
+                    started = time.perf_counter()
+                    client.get(f'/{short_url}')
+                    timings.append(time.perf_counter() - started)
+                return timings
+
+            quiet = time_redirects()
+
+            stop = threading.Event()
+            def storm():
+                storm_client = app.test_client()
+                while not stop.is_set():
+                    storm_client.post('/api/v1/auth/login', json=credentials)
+            threads = [threading.Thread(target=storm, daemon=True) for _ in range(logins)]
+            for thread in threads:
+                thread.start()
+            try:
+                stormy = time_redirects()
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+            app.extensions['visits'].flush()
+            # Written now, while the temporary database still exists, rather than by the exit flush.
+
+            (quiet_p50, quiet_p99), (stormy_p50, stormy_p99) = percentiles(quiet), percentiles(stormy)
+            click.echo(
+                f'{label:<7} alone p50 {quiet_p50:7.2f} ms  p99 {quiet_p99:7.2f} ms   '
+                f'during {logins} logins p50 {stormy_p50:7.2f} ms  p99 {stormy_p99:7.2f} ms'
+            )
@@ -1,14 +1,45 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, g
 # Importing necessary components from Flask:
 # - Blueprint: for modularizing the app.
 # - request: to handle incoming request data.
 # - jsonify: to return JSON responses.
+# - Response and stream_with_context: to stream large exports while keeping the request context alive.
+# - current_app: to read configurable limits.
+# - g: to reuse the user version read by the conditional GET decorator.
 
-import validators
-# Importing the validators library to validate URLs.
+from src.validation import is_valid_url, valid_urls
+# Importing the memoized URL validators (single and batch).
 
-from src.database import Bookmark, db
-# Importing the Bookmark model and the database instance from the app's database module.
+from src.database import Bookmark, DomainStats, User, db, bump_user_version, rebuild_search_index, search_owner_token, subtree_range
+# Importing the Bookmark and User models, the database instance, the per-user change version helper, the
+# full-text index rebuild and owner token, and the folder subtree range helper from the app's database module.
+
+from src.etags import conditional_on_user_version, get_user_version
+# Importing the decorator that answers If-None-Match from the user's change version, and the version lookup itself.
+
+from src.autocomplete import get_prefix_index
+# Importing the per-user prefix index used for as-you-type suggestions.
+
+from src.leaderboard import sync_bookmark, forget_bookmarks
+# Importing the hooks that keep the public leaderboard in step with edits and deletes.
+
+from src.analytics import BUCKETS, DEFAULT_SPANS, MAX_BUCKETS, bucket_start, click_series, count_buckets, unique_visitors, top_breakdowns, forget_clicks
+# Importing the click rollup and sketch queries, the bucket alignment they share, and the hook that removes a deleted bookmark's rollups.
+
+from src.sketches import HyperLogLog
+# Importing the unique-visitor estimator to read the sketches stored on bookmarks.
+
+from src.domains import url_host, adjust_domains, current_domains, backfill_domains
+# Importing the host extraction and the helpers that maintain the per-domain aggregates.
+
+from src.tags import parse_tags, set_tags, release_tags, tags_for_bookmarks, all_tags_filter, any_tags_filter, tag_counts
+# Importing the tag inverted index helpers.
+
+from src.folders import get_folder_path, folder_paths
+# Importing the folder lookups that resolve a folder id to its materialized path.
+
+from src.cache import VersionedLRUCache
+# Importing the LRU cache that drops entries when the user's change version moves on.
 
 from flask_jwt_extended import get_jwt_identity
 # Importing a function to get the identity (usually user ID) from the JWT.
@@ -16,18 +47,230 @@ from flask_jwt_extended import get_jwt_identity
 from flask_jwt_extended.view_decorators import jwt_required
 # Importing a decorator to protect routes with JWT authentication.
 
-from src.constants.http_status_codes import OK as HTTP_200_OK, BAD_REQUEST as HTTP_400_BAD_REQUEST, CONFLICT as HTTP_409_CONFLICT, CREATED as HTTP_201_CREATED,  NOT_FOUND as HTTP_404_NOT_FOUND, NO_CONTENT as HTTP_204_NO_CONTENT
+from src.constants.http_status_codes import OK as HTTP_200_OK, BAD_REQUEST as HTTP_400_BAD_REQUEST, CONFLICT as HTTP_409_CONFLICT, CREATED as HTTP_201_CREATED,  NOT_FOUND as HTTP_404_NOT_FOUND, NO_CONTENT as HTTP_204_NO_CONTENT, UNSUPPORTED_MEDIA_TYPE as HTTP_415_UNSUPPORTED_MEDIA_TYPE, PAYLOAD_TOO_LARGE as HTTP_413_PAYLOAD_TOO_LARGE
 # Importing HTTP status codes with custom names for clarity and readability.
 
 from flasgger import swag_from
 # Importing swag_from for API documentation generation with Swagger.
 
+from datetime import datetime
+# Importing datetime to parse the date range filters of the bookmark list.
+
+from sqlalchemy import or_, select, update, delete, tuple_, func
+# Importing or_ to combine alternative filter conditions, select to build column-only queries
+# and update/delete for set-based bulk writes; tuple_ compares keyset cursors, and func
+# builds the aggregates of the stats endpoint.
+
+import csv
+import io
+import json
+# Importing csv, io and json to serialize bookmark exports row by row.
+
+import base64
+import re
+# Importing base64 and re to encode search cursors and split search queries into terms.
+
+import click
+# Importing click to report progress from command-line maintenance commands.
+
 # Creating a Blueprint for bookmark-related routes with a URL prefix of '/api/v1/bookmarks'.
 bookmarks = Blueprint("bookmarks", __name__, url_prefix="/api/v1/bookmarks")
 
+SORT_COLUMNS = {
+    'visits': Bookmark.visits,
+    'created_at': Bookmark.created_at,
+    'url': Bookmark.url,
+}
+# Columns the bookmark list can be sorted by. Each one is backed by a `(user_id, column)` index,
+# so any other sort would need a full scan of the user's rows and is rejected.
+
+def parse_sort(value):
+    """Turn a `?sort=` value such as `-visits` into ORDER BY clauses, or None if it is not supported."""
+    if not value:
+        return [Bookmark.id.asc()]
+        # Without an explicit sort, keep the insertion order the list has always used; the
+        # `(user_id, id)` index returns it without sorting.
+
+    descending = value.startswith('-')
+    column = SORT_COLUMNS.get(value[1:] if descending else value)
+    # A single leading '-' requests descending order; the rest must name a sortable column, so
+    # `--visits` is rejected rather than read as `-visits`.
+
+    if column is None:
+        return None
+
+    if descending:
+        return [column.desc(), Bookmark.id.desc()]
+    return [column.asc(), Bookmark.id.asc()]
+    # The id tiebreaker follows the sort direction so it matches the rowid stored at the end of
+    # every index entry; ties then come straight out of the index without a temporary sort.
+
+RANGE_FILTERS = {
+    'min_visits': 'visits',
+    'max_visits': 'visits',
+    'created_after': 'created_at',
+    'created_before': 'created_at',
+}
+# Range filters and the sort column whose `(user_id, column)` index serves them. A range on one column
+# with an order on another can't use one index for both, so the database would sort every match.
+
+def list_order():
+    """Return `(ORDER BY clauses, None)` for the list's `?sort=` and range filters, or `(None, error)`.
+
+    A range filter without a sort is ordered by its own column, so the range and the order share an
+    index; a range filter with a sort on another column, or ranges on two columns, are rejected.
+    """
+    sort = request.args.get('sort')
+    try:
+        ranged = sorted({column for name, column in RANGE_FILTERS.items() if parse_range_arg(name) is not None})
+    except ValueError as e:
+        return None, str(e)
+    # Deciding on the parsed values, so a filter that doesn't parse can't quietly switch the sort.
+
+    if len(ranged) > 1:
+        return None, 'Range filters on visits and created_at can\'t be combined'
+    if ranged and not sort:
+        sort = ranged[0]
+        # Rewriting the default order to the filtered column.
+
+    order_by = parse_sort(sort)
+    if order_by is None:
+        return None, f"Unsupported sort, use one of: {', '.join(sorted(SORT_COLUMNS))} (prefix with '-' for descending)"
+    if ranged and sort.removeprefix('-') != ranged[0]:
+        return None, f"Filtering by {ranged[0]} requires sort={ranged[0]} or sort=-{ranged[0]}"
+    return order_by, None
+
+def parse_int_arg(name):
+    """Parse an integer query argument, raising ValueError with a readable message."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+
+def parse_range_arg(name):
+    """Parse one of the `RANGE_FILTERS` arguments by the type of the column it filters."""
+    if RANGE_FILTERS[name] == 'visits':
+        return parse_int_arg(name)
+    return parse_datetime_arg(name)
+
+def parse_datetime_arg(name):
+    """Parse an ISO 8601 query argument, raising ValueError with a readable message."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime")
+
+def apply_list_filters(query, user_id):
+    """Apply the `?domain`, `?min_visits`/`?max_visits`, `?created_after`/`?created_before`, `?q`,
+    `?tags` (all of) and `?any_tags` (any of) filters."""
+    domain = request.args.get('domain')
+    if domain:
+        query = query.filter(Bookmark.host == domain.strip().lower())
+        # An equality match on the host extracted at write time, served by the `(user_id, host)` index.
+
+    min_visits = parse_int_arg('min_visits')
+    if min_visits is not None:
+        query = query.filter(Bookmark.visits >= min_visits)
+
+    max_visits = parse_int_arg('max_visits')
+    if max_visits is not None:
+        query = query.filter(Bookmark.visits <= max_visits)
+
+    created_after = parse_datetime_arg('created_after')
+    if created_after is not None:
+        query = query.filter(Bookmark.created_at >= created_after)
+
+    created_before = parse_datetime_arg('created_before')
+    if created_before is not None:
+        query = query.filter(Bookmark.created_at < created_before)
+
+    text = request.args.get('q')
+    if text:
+        query = query.filter(or_(
+            Bookmark.url.contains(text, autoescape=True),
+            Bookmark.body.contains(text, autoescape=True),
+        ))
+        # A substring match can't use an index, but the `user_id` prefix of the sort index still
+        # limits it to the current user's rows.
+
+    for name, tags_filter in (('tags', all_tags_filter), ('any_tags', any_tags_filter)):
+        value = request.args.get(name)
+        if not value:
+            continue
+        names = parse_tags(value)
+        if not names:
+            raise ValueError(f"'{name}' must name at least one tag")
+            # `?tags=,` or `?tags=%20` is more likely a client bug than a request for every bookmark.
+        query = query.filter(tags_filter(user_id, names))
+
+    return query
+
+def serialize_list_items(items):
+    """Return the JSON representation of a page of bookmarks, loading their tags with one query."""
+    tags = tags_for_bookmarks([bookmark.id for bookmark in items])
+    return [{
+        'id': bookmark.id,
+        'url': bookmark.url,
+        'short_url': bookmark.short_url,
+        'visit': bookmark.visits,
+        'body': bookmark.body,
+        'tags': tags[bookmark.id],
+        'folder_id': bookmark.folder_id,
+        'public': bookmark.is_public,
+        'created_at': bookmark.created_at,
+        'updated_at': bookmark.updated_at,
+    } for bookmark in items]
+
+def list_folder(query, user_id, folder_id):
+    """List the bookmarks of a folder (and, unless `?recursive=false`, its subfolders) with cursor pagination."""
+    path = get_folder_path(user_id, folder_id)
+    if path is None:
+        return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
+
+    if request.args.get('sort'):
+        return jsonify({'error': "'sort' can't be combined with 'folder'; folder listings are ordered by folder"}), HTTP_400_BAD_REQUEST
+        # Re-sorting a whole subtree would defeat the index; folder order comes straight from it.
+
+    if request.args.get('recursive', 'true').lower() == 'false':
+        query = query.filter(Bookmark.folder_path == path)
+    else:
+        low, high = subtree_range(path)
+        query = query.filter(Bookmark.folder_path >= low, Bookmark.folder_path < high)
+    # Both are ranges on `(user_id, folder_path, id)`: one folder, or every path sharing its prefix.
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after_path, after_id = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), HTTP_400_BAD_REQUEST
+        query = query.filter(tuple_(Bookmark.folder_path, Bookmark.id) > tuple_(after_path, after_id))
+        # A row-value comparison lets SQLite seek straight to the cursor instead of skipping an OFFSET.
+
+    limit = min(max(request.args.get('per_page', 5, type=int), 1), 100)
+    items = query.order_by(Bookmark.folder_path, Bookmark.id).limit(limit + 1).all()
+    # Fetching one extra row tells us whether another page exists.
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([items[-1].folder_path, items[-1].id])
+
+    return jsonify({
+        'data': serialize_list_items(items),
+        'meta': {'next_cursor': next_cursor, 'has_next': next_cursor is not None},
+    }), HTTP_200_OK
+
 # Defining a route that handles both POST and GET requests at the root of the bookmarks Blueprint.
 @bookmarks.route('/', methods=['POST', 'GET'])
 @jwt_required()
+@conditional_on_user_version
 def handle_bookmarks():
     # This route requires JWT authentication.
     
@@ -40,30 +283,56 @@ def handle_bookmarks():
         data = request.get_json()
         # Getting the JSON data sent in the request body.
         
+        error = bookmark_field_error(data)
+        if error:
+            return jsonify({'error': error}), HTTP_400_BAD_REQUEST
+            # A dict body or a list folder_id would otherwise fail inside the INSERT or the folder lookup.
+
         url = data.get('url', '')
         body = data.get('body', '')
         # Extracting the 'url' and 'body' fields from the request data, defaulting to empty strings if not provided.
 
-        if not validators.url(url):
+        if not is_valid_url(url):
             # Validating the URL. If it's not valid, return an error.
             return jsonify({'error': 'Enter a valid URL'}), HTTP_400_BAD_REQUEST
+
+        try:
+            tags = parse_tags(data.get('tags', []))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+        # Normalizing the optional list of tags.
+
+        folder_id = data.get('folder_id')
+        folder_path = None
+        if folder_id is not None:
+            folder_path = get_folder_path(current_user, folder_id)
+            if folder_path is None:
+                return jsonify({'error': 'Folder not found'}), HTTP_404_NOT_FOUND
+        # Resolving the optional folder, whose path is copied onto the bookmark.
         
         if Bookmark.query.filter_by(url=url).first():
             # Checking if a bookmark with the same URL already exists for the user.
             return jsonify({'error': 'URL already exists'}), HTTP_409_CONFLICT
 
-        bookmark = Bookmark(url=url, body=body, user_id=current_user)
-        # Creating a new Bookmark instance with the provided data and the current user's ID.
-        
-        db.session.add(bookmark)
+        row, = new_bookmark_rows(current_user, [(url, body)])
+        row.update(folder_id=folder_id, folder_path=folder_path, is_public=bool(data.get('public', False)))
+        bookmark = db.session.get(Bookmark, Bookmark.insert_with_short_codes([row])[0])
+        # Inserting the new bookmark with a short URL the unique index has accepted, then loading it.
+
+        set_tags(current_user, {bookmark.id: tags})
+        adjust_domains(current_user, [(bookmark.host, 1, 0)])
+        bump_user_version(current_user)
         db.session.commit()
-        # Adding the new bookmark to the database session and committing the transaction.
+        # Linking its tags, counting it in its domain's aggregate, bumping the user's version and committing the transaction.
 
         return jsonify({
             'id': bookmark.id,
             'url': bookmark.url,
             'short_url': bookmark.short_url,
             'visit': bookmark.visits,
+            'tags': tags,
+            'folder_id': bookmark.folder_id,
+            'public': bookmark.is_public,
             'created_at': bookmark.created_at,
             'updated_at': bookmark.updated_at,
         }), HTTP_201_CREATED
@@ -76,24 +345,27 @@ def handle_bookmarks():
         per_page = request.args.get('per_page', 5, type=int)
         # Getting pagination parameters from the query string, with defaults of page 1 and 5 items per page.
 
-        bookmarks = Bookmark.query.filter_by(user_id=current_user).paginate(page=page, per_page=per_page)
-        # Querying the database for bookmarks belonging to the current user and paginating the results.
-
-        data = []
-        # Initializing an empty list to store the bookmark data.
-
-        for bookmark in bookmarks.items:
-            # Looping through the paginated bookmarks.
-            data.append({
-                'id': bookmark.id,
-                'url': bookmark.url,
-                'short_url': bookmark.short_url,
-                'visit': bookmark.visits,
-                'body': bookmark.body,
-                'created_at': bookmark.created_at,
-                'updated_at': bookmark.updated_at,
-            })
-            # Adding each bookmark's details to the data list.
+        try:
+            query = apply_list_filters(Bookmark.query.filter_by(user_id=current_user), current_user)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+        # Narrowing the current user's bookmarks with the filters from the query string.
+
+        folder_id = request.args.get('folder', type=int)
+        if folder_id is not None:
+            return list_folder(query, current_user, folder_id)
+            # Folder listings page with a cursor over the folder path index instead of page numbers.
+
+        order_by, error = list_order()
+        if error:
+            # Rejecting sorts, and filter and sort pairs, that no single index can serve.
+            return jsonify({'error': error}), HTTP_400_BAD_REQUEST
+
+        bookmarks = query.order_by(*order_by).paginate(page=page, per_page=per_page)
+        # Sorting and paginating the filtered bookmarks.
+
+        data = serialize_list_items(bookmarks.items)
+        # Collecting each bookmark's details, with the tags of the whole page loaded in one query.
 
         meta = {
             "page": bookmarks.page,
@@ -109,9 +381,596 @@ def handle_bookmarks():
         return jsonify({'data': data, 'meta': meta}), HTTP_200_OK
         # Returning the bookmark data and pagination metadata as a JSON response with a 200 OK status.
 
+EXPORT_COLUMNS = ('id', 'url', 'short_url', 'visits', 'body', 'created_at', 'updated_at')
+# Fields written for every exported bookmark, in CSV column order.
+
+EXPORT_CHUNK_SIZE = 1000
+# Number of rows fetched from the database cursor at a time while exporting.
+
+def export_rows(user_id):
+    """Yield the user's bookmarks as dicts, one database chunk at a time."""
+    result = db.session.execute(
+        select(*[getattr(Bookmark, column) for column in EXPORT_COLUMNS])
+        .where(Bookmark.user_id == user_id)
+        .order_by(Bookmark.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    # Selecting plain columns instead of ORM objects keeps the identity map empty, and `yield_per`
+    # makes the cursor fetch a chunk at a time, so memory stays flat however many bookmarks there are.
+
+    for partition in result.partitions():
+        yield [
+            {
+                column: value.isoformat() if isinstance(value, datetime) else value
+                for column, value in zip(EXPORT_COLUMNS, row)
+            }
+            for row in partition
+        ]
+
+def ndjson_export(user_id):
+    """Generate the export as newline-delimited JSON, one chunk per yield."""
+    for chunk in export_rows(user_id):
+        yield ''.join(json.dumps(row) + '\n' for row in chunk)
+
+def csv_export(user_id):
+    """Generate the export as CSV with a header row, one chunk per yield."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for chunk in export_rows(user_id):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        # Reusing one small buffer so only the current chunk is ever held in memory.
+
+    if buffer.tell():
+        yield buffer.getvalue()
+        # A user with no bookmarks still gets the header row.
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_export, 'application/x-ndjson'),
+    'csv': (csv_export, 'text/csv'),
+}
+# Supported export formats mapped to their generator and content type.
+
+# Defining a route to export all of the user's bookmarks in one streamed download.
+@bookmarks.get('/export')
+@jwt_required()
+def export_bookmarks():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"}), HTTP_400_BAD_REQUEST
+
+    generate, mimetype = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(generate(current_user)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=bookmarks.{export_format}'},
+    ), HTTP_200_OK
+    # Streaming the generator keeps the request context (and its database session) open until the last chunk is sent.
+
+IMPORT_BATCH_SIZE = 1000
+# Number of parsed lines validated, deduplicated and inserted together during a bulk import.
+
+IMPORT_MIMETYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonlines': 'ndjson',
+    'text/csv': 'csv',
+}
+# Request content types accepted by the bulk import, mapped to their format.
+
+def parse_import(lines, import_format):
+    """Yield `(line number, url, body, error)` for each record, consuming `lines` lazily."""
+    if import_format == 'ndjson':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+                # Blank lines (including a trailing newline) are not records.
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, None, 'Invalid JSON'
+                continue
+
+            if not isinstance(record, dict):
+                yield line_number, None, None, 'Expected a JSON object'
+                continue
+
+            field = next((field for field in ('url', 'body')
+                          if record.get(field) is not None and not isinstance(record[field], str)), None)
+            if field:
+                yield line_number, None, None, f"'{field}' must be a string"
+                continue
+                # e.g. `{"body": {"a": 1}}`; reported as an invalid line before it can reach the INSERT.
+
+            yield line_number, record.get('url') or '', record.get('body') or '', None
+    else:
+        reader = csv.DictReader(lines)
+        # The header row names the columns; `url` is required and `body` is optional.
+
+        for record in reader:
+            yield reader.line_num, record.get('url') or '', record.get('body') or '', None
+
+def existing_urls(user_id, urls):
+    """Return which of `urls` the user has already bookmarked, using one IN query."""
+    if not urls:
+        return set()
+    return set(db.session.execute(
+        select(Bookmark.url).where(Bookmark.user_id == user_id, Bookmark.url.in_(urls))
+    ).scalars())
+    # Served by the `(user_id, url)` index.
+
+def new_bookmark_rows(user_id, entries):
+    """Build insert parameters for `(url, body)` pairs; `Bookmark.insert_with_short_codes` adds their short URLs."""
+    now = datetime.now()
+    return [
+        {'url': url, 'body': body, 'user_id': user_id, 'visits': 0, 'created_at': now, 'host': url_host(url)}
+        for url, body in entries
+    ]
+
+def import_batch(user_id, batch):
+    """Validate, deduplicate and insert one batch of parsed records.
+
+    Returns the number of bookmarks inserted and a list of per-line error events.
+    """
+    errors = []
+    candidates = {}
+    # Valid, not-yet-seen URLs of this batch, keyed by URL to drop duplicates within the batch.
+
+    valid = valid_urls([url for _, url, _, _ in batch])
+    # Checking the batch's URLs together, so a URL repeated in the file is validated once.
+
+    for (line_number, url, body, error), url_valid in zip(batch, valid):
+        if error is None and not url_valid:
+            error = 'Enter a valid URL'
+        elif error is None and url in candidates:
+            error = 'URL already exists'
+
+        if error:
+            errors.append({'line': line_number, 'error': error})
+        else:
+            candidates[url] = (line_number, body)
+
+    for url in existing_urls(user_id, list(candidates)):
+        errors.append({'line': candidates.pop(url)[0], 'error': 'URL already exists'})
+        # Dropping URLs the user already has; earlier batches of this import are visible here too.
+
+    if candidates:
+        rows = new_bookmark_rows(user_id, [(url, body) for url, (_, body) in candidates.items()])
+        try:
+            Bookmark.insert_with_short_codes(rows)
+            # A list of parameter sets makes this a single executemany instead of one INSERT per row.
+        except RuntimeError as e:
+            db.session.rollback()
+            errors.extend({'line': line_number, 'error': str(e)} for line_number, _ in candidates.values())
+            errors.sort(key=lambda event: event['line'])
+            return 0, errors
+            # Reported as per-line errors, so the stream still ends with its summary.
+        adjust_domains(user_id, [(row['host'], 1, 0) for row in rows])
+        bump_user_version(user_id)
+
+    db.session.commit()
+    # Committing per batch keeps transactions short and makes every reported batch durable.
+
+    errors.sort(key=lambda event: event['line'])
+    return len(candidates), errors
+
+def run_import(user_id, records):
+    """Import parsed records batch by batch, yielding NDJSON progress and error events."""
+    processed = imported = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, failed
+        inserted, errors = import_batch(user_id, batch)
+        imported += inserted
+        failed += len(errors)
+        batch.clear()
+        events = errors + [{'progress': {'processed': processed, 'imported': imported, 'failed': failed}}]
+        return ''.join(json.dumps(event) + '\n' for event in events)
+
+    for record in records:
+        batch.append(record)
+        processed += 1
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            yield flush()
+
+    if batch:
+        yield flush()
+
+    yield json.dumps({'done': True, 'processed': processed, 'imported': imported, 'failed': failed}) + '\n'
+
+# Defining a route to bulk import bookmarks from an NDJSON or CSV request body.
+@bookmarks.post('/import')
+@jwt_required()
+def import_bookmarks():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    import_format = request.args.get('format') or IMPORT_MIMETYPES.get(request.mimetype)
+    if import_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Send NDJSON (application/x-ndjson) or CSV (text/csv)'}), HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    lines = (line.decode('utf-8', errors='replace') for line in request.stream)
+    # Reading the body line by line from the input stream, so it is never held in memory at once.
+
+    return Response(
+        stream_with_context(run_import(current_user, parse_import(lines, import_format))),
+        mimetype='application/x-ndjson',
+    ), HTTP_200_OK
+    # Progress and per-line errors are streamed back as each batch is committed.
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+# Operation types accepted by the batch endpoint.
+
+def bookmark_field_error(operation):
+    """Return why a bookmark payload's `url`, `body` or `folder_id` has the wrong type, or None."""
+    for field in ('url', 'body'):
+        if operation.get(field) is not None and not isinstance(operation[field], str):
+            return f"'{field}' must be a string"
+
+    folder_id = operation.get('folder_id')
+    if folder_id is not None and (not isinstance(folder_id, int) or isinstance(folder_id, bool)):
+        return "'folder_id' must be an integer or null"
+    return None
+
+def plan_batch(user_id, operations):
+    """Validate batch operations and split the valid ones by type.
+
+    Returns the per-item results list (errors already filled in) and the valid
+    creates, updates and deletes as `(index, payload)` pairs.
+    """
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    claimed_ids = set()
+    # Ids already targeted by an earlier operation; touching one twice would make the
+    # outcome depend on execution order, which set-based statements don't preserve.
+
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+
+        if op not in BATCH_OPERATIONS:
+            results[index] = {'index': index, 'op': op, 'status': HTTP_400_BAD_REQUEST,
+                              'error': f"'op' must be one of: {', '.join(BATCH_OPERATIONS)}"}
+            continue
+
+        if 'tags' in operation:
+            try:
+                operation['tags'] = parse_tags(operation['tags'])
+            except ValueError as e:
+                results[index] = {'index': index, 'op': op, 'status': HTTP_400_BAD_REQUEST, 'error': str(e)}
+                continue
+            # Normalizing tags up front so invalid ones fail only their own operation.
+
+        error = bookmark_field_error(operation)
+        if error:
+            results[index] = {'index': index, 'op': op, 'status': HTTP_400_BAD_REQUEST, 'error': error}
+            continue
+            # A wrongly typed field fails its own operation instead of the batch's statements.
+
+        if op == 'create':
+            creates.append((index, operation))
+            continue
+
+        bookmark_id = operation.get('id')
+        if not isinstance(bookmark_id, int) or isinstance(bookmark_id, bool):
+            results[index] = {'index': index, 'op': op, 'status': HTTP_400_BAD_REQUEST, 'error': "'id' must be an integer"}
+        elif bookmark_id in claimed_ids:
+            results[index] = {'index': index, 'op': op, 'status': HTTP_409_CONFLICT,
+                              'error': 'Bookmark is already targeted by another operation in this batch'}
+        elif op == 'update' and not is_valid_url(operation.get('url', '')):
+            results[index] = {'index': index, 'op': op, 'status': HTTP_400_BAD_REQUEST, 'error': 'Enter a valid URL'}
+        else:
+            claimed_ids.add(bookmark_id)
+            (updates if op == 'update' else deletes).append((index, operation))
+
+    paths = folder_paths(user_id, {
+        operation['folder_id'] for _, operation in creates + updates
+        if operation.get('folder_id') is not None
+    })
+    # Resolving every folder the batch files bookmarks into with one query.
+
+    for index, operation in creates + updates:
+        folder_id = operation.get('folder_id')
+        if folder_id is not None and folder_id not in paths:
+            results[index] = {'index': index, 'op': operation['op'], 'status': HTTP_404_NOT_FOUND, 'error': 'Folder not found'}
+        elif 'folder_id' in operation:
+            operation['folder_path'] = paths.get(folder_id)
+    creates = [(index, operation) for index, operation in creates if results[index] is None]
+    updates = [(index, operation) for index, operation in updates if results[index] is None]
+
+    owned = set()
+    if claimed_ids:
+        owned = set(db.session.execute(
+            select(Bookmark.id).where(Bookmark.user_id == user_id, Bookmark.id.in_(claimed_ids))
+        ).scalars())
+        # One query checks ownership of every id the batch updates or deletes.
+
+    for index, operation in updates + deletes:
+        if operation['id'] not in owned:
+            results[index] = {'index': index, 'op': operation['op'], 'status': HTTP_404_NOT_FOUND, 'error': 'Item not found'}
+    updates = [(index, operation) for index, operation in updates if operation['id'] in owned]
+    deletes = [(index, operation) for index, operation in deletes if operation['id'] in owned]
+
+    pending = {}
+    # Valid creates keyed by URL, dropping duplicates within the batch.
+    for (index, operation), valid in zip(creates, valid_urls([operation.get('url', '') for _, operation in creates])):
+        url = operation.get('url', '')
+        if not valid:
+            results[index] = {'index': index, 'op': 'create', 'status': HTTP_400_BAD_REQUEST, 'error': 'Enter a valid URL'}
+        elif url in pending:
+            results[index] = {'index': index, 'op': 'create', 'status': HTTP_409_CONFLICT, 'error': 'URL already exists'}
+        else:
+            pending[url] = (index, operation)
+
+    for url in existing_urls(user_id, list(pending)):
+        index, _ = pending.pop(url)
+        results[index] = {'index': index, 'op': 'create', 'status': HTTP_409_CONFLICT, 'error': 'URL already exists'}
+
+    return results, list(pending.values()), updates, deletes
+
+# Defining a route to apply many create/update/delete operations in a single transaction.
+@bookmarks.post('/batch')
+@jwt_required()
+def batch_bookmarks():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    max_bytes = current_app.config['BOOKMARK_BATCH_MAX_BYTES']
+    payload = request.stream.read(max_bytes + 1)
+    if len(payload) > max_bytes:
+        return jsonify({'error': f'Batch payload must not exceed {max_bytes} bytes'}), HTTP_413_PAYLOAD_TOO_LARGE
+    # Reading at most one byte past the limit, so oversized bodies are rejected without buffering them.
+
+    try:
+        operations = json.loads(payload)
+    except ValueError:
+        return jsonify({'error': 'Request body must be JSON'}), HTTP_400_BAD_REQUEST
+
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Request body must be an array of operations'}), HTTP_400_BAD_REQUEST
+
+    max_operations = current_app.config['BOOKMARK_BATCH_MAX_OPERATIONS']
+    if len(operations) > max_operations:
+        return jsonify({'error': f'A batch may contain at most {max_operations} operations'}), HTTP_413_PAYLOAD_TOO_LARGE
+
+    results, creates, updates, deletes = plan_batch(current_user, operations)
+    # Validating everything up front; only valid operations reach the database.
+
+    if creates:
+        rows = new_bookmark_rows(current_user, [(operation['url'], operation.get('body', '')) for _, operation in creates])
+        for row, (_, operation) in zip(rows, creates):
+            row['folder_id'] = operation.get('folder_id')
+            row['folder_path'] = operation.get('folder_path')
+            row['is_public'] = bool(operation.get('public', False))
+        created = Bookmark.insert_with_short_codes(rows)
+        # One executemany, with the returned ids lined up with `rows`.
+
+        adjust_domains(current_user, [(row['host'], 1, 0) for row in rows])
+
+        for (index, _), row, bookmark_id in zip(creates, rows, created):
+            results[index] = {'index': index, 'op': 'create', 'status': HTTP_201_CREATED,
+                              'id': bookmark_id, 'short_url': row['short_url']}
+
+        set_tags(current_user, {
+            bookmark_id: operation['tags']
+            for (_, operation), bookmark_id in zip(creates, created)
+            if operation.get('tags')
+        })
+
+    if updates:
+        previous = current_domains([operation['id'] for _, operation in updates])
+        hosts = {operation['id']: url_host(operation['url']) for _, operation in updates}
+        db.session.execute(update(Bookmark), [
+            {
+                'id': operation['id'],
+                'url': operation['url'],
+                'host': hosts[operation['id']],
+                'body': operation.get('body', ''),
+                **({'folder_id': operation['folder_id'], 'folder_path': operation['folder_path']} if 'folder_id' in operation else {}),
+                **({'is_public': bool(operation['public'])} if 'public' in operation else {}),
+            }
+            for _, operation in updates
+        ])
+        # A bulk UPDATE by primary key; ownership was already checked in `plan_batch`.
+        # Updates that move the bookmark or change its visibility carry those columns too, and SQLAlchemy
+        # groups them separately. Like the single-bookmark edit, visibility only changes when it is given.
+
+        adjust_domains(current_user, [
+            change
+            for bookmark_id, host, visits in previous
+            for change in ((host, -1, -visits), (hosts[bookmark_id], 1, visits))
+        ])
+        # Moving each bookmark's count and visits from its old domain to its new one.
+
+        for index, operation in updates:
+            results[index] = {'index': index, 'op': 'update', 'status': HTTP_200_OK, 'id': operation['id']}
+
+        set_tags(current_user, {operation['id']: operation['tags'] for _, operation in updates if 'tags' in operation})
+        # Like the single-bookmark edit, an update only replaces tags when it includes them.
+
+    if deletes:
+        release_tags([operation['id'] for _, operation in deletes])
+        forget_bookmarks([operation['id'] for _, operation in deletes])
+        forget_clicks([operation['id'] for _, operation in deletes])
+        adjust_domains(current_user, [(host, -1, -visits) for _, host, visits in current_domains([operation['id'] for _, operation in deletes])])
+        db.session.execute(
+            delete(Bookmark)
+            .where(Bookmark.user_id == current_user, Bookmark.id.in_([operation['id'] for _, operation in deletes]))
+            .execution_options(synchronize_session=False)
+        )
+        # A single DELETE ... WHERE id IN (...) for every deleted bookmark.
+
+        for index, operation in deletes:
+            results[index] = {'index': index, 'op': 'delete', 'status': HTTP_204_NO_CONTENT, 'id': operation['id']}
+
+    if creates or updates or deletes:
+        bump_user_version(current_user)
+    db.session.commit()
+    # Everything above is one transaction: either every valid operation is applied or none is.
+
+    if updates:
+        for bookmark in db.session.execute(
+            select(Bookmark.id, Bookmark.is_public, Bookmark.visits, Bookmark.url, Bookmark.short_url)
+            .where(Bookmark.id.in_([operation['id'] for _, operation in updates]))
+        ):
+            sync_bookmark(bookmark)
+        # Refreshing the leaderboard entries of the updated bookmarks (new URLs, changed visibility),
+        # as the single-bookmark edit does.
+
+    return jsonify({'results': results}), HTTP_200_OK
+
+SEARCH_SQL = """
+    SELECT rowid FROM bookmark_fts
+    WHERE bookmark_fts MATCH :match
+    ORDER BY bm25(bookmark_fts, 1.0, 1.0, 0.0), rowid
+    LIMIT :limit
+"""
+# Full-text search ranked by bm25 (lower is better) with the id as a tiebreaker. The `owner` column
+# gets zero weight, so the user filter inside the MATCH never changes the ranking.
+
+def search_match_expression(text, user_id):
+    """Turn free text into an FTS5 query matching every term within the user's bookmarks, or None if it has no searchable terms."""
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    quoted = ' '.join('"' + term + '"' for term in terms)
+    # Quoting each term keeps user input from being read as FTS5 operators (AND, NEAR, column filters...).
+    return f'owner:"{search_owner_token(user_id)}" AND {{body url}}:({quoted})'
+    # The terms are limited to `body` and `url`, so a word like 'u42' can't match another user's owner token.
+
+def get_search_results(user_id, match):
+    """Return the ranked ids of the user's bookmarks matching `match`, at most `SEARCH_MAX_RESULTS` of them.
+
+    The ranking is computed once and cached at the user's `content_version`. bm25 weighs terms by
+    statistics over the whole index, so other users' writes shift scores between requests; paging
+    through a fixed snapshot keeps every page of one search consistent, with no duplicates or gaps.
+    """
+    cache = current_app.extensions.get('search_results')
+    if cache is None:
+        cache = current_app.extensions['search_results'] = VersionedLRUCache(current_app.config['SEARCH_CACHE_MAX_ENTRIES'])
+
+    version = get_user_version(user_id, User.content_version)
+    ids = cache.get((user_id, match), version)
+    if ids is None:
+        params = {'match': match, 'limit': current_app.config['SEARCH_MAX_RESULTS']}
+        ids = tuple(db.session.execute(db.text(SEARCH_SQL), params).scalars())
+        cache.put((user_id, match), version, ids)
+        # Edits, imports and deletes bump `content_version`, so the user's own changes show up on the next search.
+    return ids
+
+def encode_cursor(values):
+    """Encode cursor values as an opaque URL-safe string."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by `encode_cursor`, raising ValueError if it is malformed."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+# Defining a route to search the user's bookmarks by body and URL text.
+@bookmarks.get('/search')
+@jwt_required()
+def search_bookmarks():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    match = search_match_expression(request.args.get('q', ''), current_user)
+    if match is None:
+        return jsonify({'error': "'q' must contain at least one word"}), HTTP_400_BAD_REQUEST
+
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    offset = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            offset, = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), HTTP_400_BAD_REQUEST
+        if not isinstance(offset, int) or offset < 0:
+            return jsonify({'error': 'Invalid cursor'}), HTTP_400_BAD_REQUEST
+
+    ids = get_search_results(current_user, match)
+    page_ids = ids[offset:offset + limit]
+
+    bookmarks_by_id = {
+        bookmark.id: bookmark
+        for bookmark in Bookmark.query.filter(Bookmark.id.in_(page_ids), Bookmark.user_id == current_user)
+    } if page_ids else {}
+    # One primary-key lookup per result; the user filter is a second guard on top of the owner token.
+
+    data = [{
+        'id': bookmark.id,
+        'url': bookmark.url,
+        'short_url': bookmark.short_url,
+        'visit': bookmark.visits,
+        'body': bookmark.body,
+        'created_at': bookmark.created_at,
+        'updated_at': bookmark.updated_at,
+    } for bookmark in (bookmarks_by_id.get(id) for id in page_ids) if bookmark is not None]
+    # Kept in ranked order; a bookmark deleted since the snapshot was taken is simply skipped.
+
+    next_cursor = None
+    if offset + limit < len(ids):
+        next_cursor = encode_cursor([offset + limit])
+
+    return jsonify({'data': data, 'meta': {'next_cursor': next_cursor, 'has_next': next_cursor is not None}}), HTTP_200_OK
+
+@bookmarks.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Rebuild the bookmark full-text search index from existing data."""
+    rebuild_search_index()
+    click.echo('Search index rebuilt.')
+
+@bookmarks.cli.command('backfill-domains')
+@click.option('--chunk-size', default=1000, show_default=True, help='Bookmarks updated per transaction.')
+def backfill_domains_command(chunk_size):
+    """Extract the host of existing bookmarks and rebuild the per-domain aggregates."""
+    backfill_domains(chunk_size, lambda processed: click.echo(f'{processed} bookmarks processed...'))
+    click.echo('Domain aggregates rebuilt.')
+
+# Defining a route to suggest bookmarks and domains as the user types.
+@bookmarks.get('/autocomplete')
+@jwt_required()
+def autocomplete_bookmarks():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    prefix = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+
+    if not prefix.strip():
+        return jsonify({'urls': [], 'domains': []}), HTTP_200_OK
+
+    index = get_prefix_index(current_user, get_user_version(current_user, User.content_version))
+    # For a warm user this is one primary-key lookup plus a binary search; no LIKE scan per keystroke.
+
+    return jsonify(index.complete(prefix, limit)), HTTP_200_OK
+
+# Defining a route to list the user's tags with their bookmark counts.
+@bookmarks.get('/tags')
+@jwt_required()
+@conditional_on_user_version
+def get_tags():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    return jsonify({'data': tag_counts(current_user)}), HTTP_200_OK
+    # Counts come from the maintained `Tag.bookmark_count` counters, not from counting postings.
+
 # Defining a route to get a single bookmark by its ID.
 @bookmarks.get("/<int:id>")
 @jwt_required()
+@conditional_on_user_version
 def get_bookmark(id):
     current_user = get_jwt_identity()
     # Getting the current user's identity from the JWT.
@@ -129,6 +988,9 @@ def get_bookmark(id):
         'short_url': bookmark.short_url,
         'visit': bookmark.visits,
         'body': bookmark.body,
+        'tags': tags_for_bookmarks([bookmark.id])[bookmark.id],
+        'folder_id': bookmark.folder_id,
+        'public': bookmark.is_public,
         'created_at': bookmark.created_at,
         'updated_at': bookmark.updated_at,
     }), HTTP_200_OK
@@ -148,13 +1010,100 @@ def delete_bookmark(id):
         # If the bookmark doesn't exist, return a 404 Not Found response.
         return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
 
+    release_tags([bookmark.id])
+    forget_bookmarks([bookmark.id])
+    forget_clicks([bookmark.id])
+    adjust_domains(current_user, [(bookmark.host, -1, -bookmark.visits)])
     db.session.delete(bookmark)
+    bump_user_version(current_user)
     db.session.commit()
-    # Deleting the bookmark from the database and committing the transaction.
+    # Unlinking its tags, dropping it from the leaderboard, its click rollups and its domain's aggregate, deleting the bookmark from the database, bumping the user's version and committing the transaction.
 
     return jsonify({}), HTTP_204_NO_CONTENT
     # Returning an empty JSON response with a 204 No Content status.
 
+# Defining a route to chart a bookmark's clicks over time.
+@bookmarks.get("/<int:id>/clicks")
+@jwt_required()
+@conditional_on_user_version(requires=('from', 'to'))
+def get_bookmark_clicks(id):
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    if not db.session.query(Bookmark.id).filter_by(user_id=current_user, id=id).scalar():
+        return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
+        # Only the owner may see a bookmark's clicks.
+
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return jsonify({'error': f"'bucket' must be one of: {', '.join(BUCKETS)}"}), HTTP_400_BAD_REQUEST
+
+    try:
+        end = parse_datetime_arg('to') or datetime.now()
+        start = parse_datetime_arg('from') or end - DEFAULT_SPANS[bucket]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+    # The range is half-open and defaults to a recent window for the bucket size; `from` is rounded
+    # down to the start of its bucket so every bucket in the series is whole.
+
+    if start >= end:
+        return jsonify({'error': "'from' must be before 'to'"}), HTTP_400_BAD_REQUEST
+    if count_buckets(start, end, bucket) > MAX_BUCKETS:
+        return jsonify({'error': f'Ask for at most {MAX_BUCKETS} buckets; narrow the range or use a larger bucket'}), HTTP_400_BAD_REQUEST
+    start = bucket_start(start, bucket)
+    # `meta.from` then reports where the first bucket, and so the totals, actually begin.
+
+    series = click_series(id, start, end, bucket)
+    # Read from the hourly or daily rollup, so the cost follows the number of buckets, not the number of clicks.
+
+    return jsonify({
+        'data': [{'start': moment.isoformat(), 'clicks': clicks} for moment, clicks in series],
+        'meta': {
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'total': sum(clicks for _, clicks in series),
+            'unique_visitors': unique_visitors(id, start, end),
+            # Estimated from the daily sketches, so it covers whole days.
+        },
+    }), HTTP_200_OK
+
+# Defining a route to list a bookmark's top referrers and user agents.
+@bookmarks.get("/<int:id>/breakdown")
+@jwt_required()
+@conditional_on_user_version(requires=('from', 'to'))
+def get_bookmark_breakdown(id):
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    if not db.session.query(Bookmark.id).filter_by(user_id=current_user, id=id).scalar():
+        return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
+        # Only the owner may see where a bookmark's visitors come from.
+
+    try:
+        end = parse_datetime_arg('to') or datetime.now()
+        start = parse_datetime_arg('from') or end - DEFAULT_SPANS['day']
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+    # Sketches are kept per day, so `from` is rounded down to the start of its day.
+
+    if start >= end:
+        return jsonify({'error': "'from' must be before 'to'"}), HTTP_400_BAD_REQUEST
+    start = bucket_start(start, 'day')
+    # Reported as the day the counts actually start from.
+
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 10)
+    # The sketches track ten candidates per day, so more couldn't be reported reliably.
+
+    breakdowns = top_breakdowns(id, start, end, limit)
+    # Counts are count-min estimates: never below the true count, and above it by at most about 1% of the range's visits.
+
+    return jsonify({
+        'referrers': [{'value': value, 'count': count} for value, count in breakdowns['referrer']],
+        'user_agents': [{'value': value, 'count': count} for value, count in breakdowns['user_agent']],
+        'meta': {'from': start.isoformat(), 'to': end.isoformat()},
+    }), HTTP_200_OK
+
 # Defining routes to edit (put/patch) a bookmark by its ID.
 @bookmarks.put('/<int:id>')
 @bookmarks.patch('/<int:id>')
@@ -170,34 +1119,117 @@ def edit_bookmark(id):
         # If the bookmark doesn't exist, return a 404 Not Found response.
         return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
 
+    error = bookmark_field_error(request.get_json())
+    if error:
+        return jsonify({'error': error}), HTTP_400_BAD_REQUEST
+
     body = request.get_json().get('body', '')
     url = request.get_json().get('url', '')
     # Getting the 'body' and 'url' fields from the request JSON, defaulting to empty strings if not provided.
 
-    if not validators.url(url):
+    if not is_valid_url(url):
         # Validating the URL. If it's not valid, return an error.
         return jsonify({'error': 'Enter a valid URL'}), HTTP_400_BAD_REQUEST
 
+    if 'folder_id' in request.get_json():
+        # Moving the bookmark only when the request includes a folder; null unfiles it.
+        folder_id = request.get_json()['folder_id']
+        folder_path = None
+        if folder_id is not None:
+            folder_path = get_folder_path(current_user, folder_id)
+            if folder_path is None:
+                return jsonify({'error': 'Folder not found'}), HTTP_404_NOT_FOUND
+        bookmark.folder_id = folder_id
+        bookmark.folder_path = folder_path
+
+    if 'tags' in request.get_json():
+        # Replacing the bookmark's tags only when the request includes them.
+        try:
+            set_tags(current_user, {bookmark.id: parse_tags(request.get_json()['tags'])})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    if 'public' in request.get_json():
+        # Changing the bookmark's visibility only when the request includes it.
+        bookmark.is_public = bool(request.get_json()['public'])
+
+    adjust_domains(current_user, [(bookmark.host, -1, -bookmark.visits), (url_host(url), 1, bookmark.visits)])
+    # Moving the bookmark's count and visits to its new domain; a no-op when the host is unchanged.
+
     bookmark.url = url 
     bookmark.body = body 
-    # Updating the bookmark's URL and body with the new data.
+    bookmark.host = url_host(url)
+    # Updating the bookmark's URL, body and host with the new data.
 
+    bump_user_version(current_user)
     db.session.commit()
-    # Committing the changes to the database.
+    sync_bookmark(bookmark)
+    # Bumping the user's version, committing the changes to the database and refreshing its leaderboard entry.
 
     return jsonify({
         'id': bookmark.id,
         'url': bookmark.url,
         'short_url': bookmark.short_url,
         'visit': bookmark.visits,
+        'tags': tags_for_bookmarks([bookmark.id])[bookmark.id],
+        'folder_id': bookmark.folder_id,
+        'public': bookmark.is_public,
         'created_at': bookmark.created_at,
         'updated_at': bookmark.updated_at,
     }), HTTP_200_OK
     # Returning the updated bookmark's details as a JSON response with a 200 OK status.
 
+DOMAIN_STATS_LIMIT = 10
+# Number of domains reported in the per-domain breakdown.
+
+def compute_stats(user_id, page, per_page):
+    """Aggregate the user's bookmark statistics in SQL."""
+    bookmark_count, visit_count = db.session.execute(
+        select(func.count(Bookmark.id), func.coalesce(func.sum(Bookmark.visits), 0))
+        .where(Bookmark.user_id == user_id)
+    ).one()
+    # Totals come from one aggregate over the `(user_id, visits)` index, which covers both columns.
+
+    rows = db.session.execute(
+        select(Bookmark.id, Bookmark.url, Bookmark.short_url, Bookmark.visits, Bookmark.visitor_registers)
+        .where(Bookmark.user_id == user_id)
+        .order_by(Bookmark.visits.desc(), Bookmark.id.desc())
+        .limit(per_page + 1)
+        .offset((page - 1) * per_page)
+    ).all()
+    # The most visited bookmarks, read in order from the `(user_id, visits)` index; page 1 is the top N.
+
+    domains = db.session.execute(
+        select(DomainStats.domain, DomainStats.bookmarks, DomainStats.visits)
+        .where(DomainStats.user_id == user_id)
+        .order_by(DomainStats.visits.desc(), DomainStats.domain)
+        .limit(DOMAIN_STATS_LIMIT)
+    ).all()
+    # Read from the maintained per-domain aggregates through the `(user_id, visits)` index; no URL is parsed.
+
+    return {
+        'data': [
+            {
+                'visits': visits,
+                'unique_visitors': HyperLogLog.from_bytes(registers).estimate(),
+                'url': url,
+                'id': bookmark_id,
+                'short_url': short_url,
+            }
+            for bookmark_id, url, short_url, visits, registers in rows[:per_page]
+        ],
+        'totals': {'bookmarks': bookmark_count, 'visits': visit_count},
+        'domains': [
+            {'domain': domain, 'bookmarks': count, 'visits': visits}
+            for domain, count, visits in domains
+        ],
+        'meta': {'page': page, 'per_page': per_page, 'has_next': len(rows) > per_page},
+    }
+
 # Defining a route to get statistics on all bookmarks.
 @bookmarks.get("/stats")
 @jwt_required()
+@conditional_on_user_version
 @swag_from("./docs/bookmarks/stats.yaml")
 # This route is protected with JWT and documented with Swagger using a YAML file.
 
@@ -205,23 +1237,21 @@ def get_stats():
     current_user = get_jwt_identity()
     # Getting the current user's identity from the JWT.
 
-    data = []
-    # Initializing an empty list to store the statistics data.
-
-    items = Bookmark.query.filter_by(user_id=current_user).all()
-    # Querying the database for all bookmarks belonging to the current user.
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    # Getting pagination parameters for the most-visited list; the first page is the top 10 by default.
 
-    for item in items:
-        new_link = {
-            'visits': item.visits,
-            'url': item.url,
-            'id': item.id,
-            'short_url': item.short_url,
-        }
-        # Collecting the visit count, URL, ID, and short URL of each bookmark.
+    cache = current_app.extensions.get('stats')
+    if cache is None:
+        cache = current_app.extensions['stats'] = VersionedLRUCache(current_app.config['STATS_CACHE_MAX_ENTRIES'])
 
-        data.append(new_link)
-    # Adding each bookmark's statistics to the data list.
+    key = (current_user, page, per_page)
+    stats = cache.get(key, g.user_version)
+    if stats is None:
+        stats = compute_stats(current_user, page, per_page)
+        cache.put(key, g.user_version, stats)
+    # The cache is keyed on the user's `data_version`, which every write and visit bumps,
+    # so a stale entry is simply never matched again.
 
-    return jsonify({'data': data}), HTTP_200_OK
+    return jsonify(stats), HTTP_200_OK
     # Returning the statistics data as a JSON response with a 200 OK status.
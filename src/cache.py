@@ -0,0 +1,46 @@
+from collections import OrderedDict
+# Importing OrderedDict to keep cache entries in least-recently-used order.
+
+from threading import Lock
+# Importing Lock so worker threads can share one cache safely.
+
+class VersionedLRUCache:
+    """A bounded LRU cache whose entries are tagged with the version they were computed at.
+
+    Looking an entry up with a different version drops it, so callers invalidate by
+    bumping a version (such as `User.data_version`) instead of tracking every write.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, version):
+        """Return the value cached for `key` at `version`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+                # The underlying data changed since this entry was built.
+
+            self._entries.move_to_end(key)
+            # Marking the entry as most recently used.
+            return entry[1]
+
+    def put(self, key, version, value):
+        """Cache `value` for `key` at `version`, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop the entry for `key`, if any."""
+        with self._lock:
+            self._entries.pop(key, None)
@@ -13,9 +13,22 @@ import string
 import random
 # Importing the `random` module to generate random values.
 
+import re
+# Importing `re` to read the violated index out of SQLite's integrity error messages.
+
+from sqlalchemy import DDL, event
+# Importing DDL and event to create the SQLite full-text index alongside the `bookmark` table.
+
+from sqlalchemy.dialects import postgresql, sqlite
+# Importing the dialect-specific INSERT constructs that support ON CONFLICT.
+
 db = SQLAlchemy()
 # Creating an instance of SQLAlchemy to handle database operations.
 
+SHORT_CODE_LENGTH = 6
+# Characters in newly allocated short URLs. 62**6 (about 57 billion) codes keep random draws from
+# colliding however many bookmarks are imported; codes allocated when they had 3 characters keep working.
+
 class User(db.Model):
     # Defining the `User` model, which represents the `users` table in the database.
 
@@ -31,14 +44,27 @@ class User(db.Model):
     password = db.Column(db.Text(), nullable=False)
     # Defining the `password` column to store text (hashed password), which must not be null.
 
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
     # Defining the `created_at` column to store the timestamp of when the record is created. 
-    # It defaults to the current time.
+    # It defaults to the current time, evaluated on every insert.
 
-    updated_at = db.Column(db.DateTime, onupdate=datetime.now())
+    updated_at = db.Column(db.DateTime, onupdate=datetime.now)
     # Defining the `updated_at` column to store the timestamp of when the record is updated.
     # It updates automatically whenever the record is modified.
 
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Monotonic counter bumped on every change to the user's bookmarks (create, edit, delete, visits).
+    # ETags are derived from it, so clients can revalidate without the server re-running list queries.
+
+    content_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Like `data_version`, but only bumped when bookmarks are created, edited or deleted, not on visits.
+    # Caches that don't depend on visit counts (such as autocomplete) key on it so clicks don't evict them.
+
+    __table_args__ = (
+        db.Index('uq_user_email_lower', db.func.lower(email), unique=True),
+        # Emails are unique regardless of case, and login looks them up through this index.
+    )
+
     bookmarks = db.relationship('Bookmark', backref="user")
     # Creating a relationship with the `Bookmark` model.
     # `backref="user"` adds a `user` attribute to the `Bookmark` model to easily access the associated `User`.
@@ -48,6 +74,37 @@ class User(db.Model):
         return f'User>>> {self.username}'
         # When an instance of `User` is printed, it will display as `User>>> username`.
 
+def upsert(model):
+    """Return an INSERT for `model` that supports `on_conflict_do_update`/`on_conflict_do_nothing` on the current database."""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+SQLITE_UNIQUE_VIOLATION = re.compile(r"UNIQUE constraint failed: (?:index '(?P<index>[^']+)'|(?P<columns>.+))")
+
+def violated_constraint(error):
+    """Return the name of the unique constraint or index an IntegrityError violated, or None if unknown.
+
+    PostgreSQL reports the constraint name. SQLite names unique indexes (`uq_user_email_lower`) but
+    reports column constraints as `table.column`, so those are returned in that form.
+    """
+    diag = getattr(error.orig, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name
+    match = SQLITE_UNIQUE_VIOLATION.match(str(error.orig))
+    if match is None:
+        return None
+    return match.group('index') or match.group('columns')
+
+def bump_user_version(user_id, visits_only=False):
+    """Increment the user's `data_version` (and `content_version` unless only visits changed) in the current transaction."""
+    values = {'data_version': User.data_version + 1, 'updated_at': User.updated_at}
+    if not visits_only:
+        values['content_version'] = User.content_version + 1
+
+    db.session.execute(db.update(User).where(User.id == user_id).values(**values))
+    # Done as a single UPDATE so concurrent writers never lose an increment.
+    # `updated_at` is set to itself so this bookkeeping doesn't count as a profile change.
+
 class Bookmark(db.Model):
     # Defining the `Bookmark` model, which represents the `bookmarks` table in the database.
 
@@ -60,32 +117,63 @@ class Bookmark(db.Model):
     url = db.Column(db.Text, nullable=False)
     # Defining the `url` column to store the URL of the bookmark. It must not be null.
 
-    short_url = db.Column(db.String(3), nullable=True)
-    # Defining the `short_url` column to store a short URL (3 characters). It's optional.
+    short_url = db.Column(db.String(8), nullable=True, unique=True, index=True)
+    # Defining the `short_url` column to store a short URL (`SHORT_CODE_LENGTH` characters). It's optional.
+    # The unique index serves redirects and short code allocation, and guarantees that two concurrent
+    # inserts can never hand out the same code.
 
     visits = db.Column(db.Integer, default=0)
     # Defining the `visits` column to store the number of times the bookmark has been visited. 
     # It defaults to 0.
 
+    is_public = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Defining the `is_public` column to mark bookmarks that may appear on the public leaderboard.
+
+    visitor_registers = db.Column(db.LargeBinary, nullable=True)
+    # Defining the `visitor_registers` column to store the all-time unique-visitor HyperLogLog sketch.
+
+    host = db.Column(db.String(255), nullable=True)
+    # Defining the `host` column to store the URL's lowercased host, extracted once when the URL is written.
+
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     # Defining the `user_id` column to store the foreign key that references the `id` in the `User` table.
 
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    folder_id = db.Column(db.Integer, db.ForeignKey('folder.id'), nullable=True)
+    # Defining the `folder_id` column to store the folder the bookmark is filed in. Unfiled bookmarks have none.
+
+    folder_path = db.Column(db.String(255), nullable=True)
+    # A copy of the folder's materialized path, so a whole subtree of bookmarks is one range scan
+    # on `ix_bookmark_user_folder_path` with no join or recursive walk.
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
     # Defining the `created_at` column to store the timestamp of when the record is created.
-    # It defaults to the current time.
+    # It defaults to the current time, evaluated on every insert.
 
-    updated_at = db.Column(db.DateTime, onupdate=datetime.now())
+    updated_at = db.Column(db.DateTime, onupdate=datetime.now)
     # Defining the `updated_at` column to store the timestamp of when the record is updated.
     # It updates automatically whenever the record is modified.
 
+    __table_args__ = (
+        db.Index('ix_bookmark_user_id', 'user_id', 'id'),
+        db.Index('ix_bookmark_user_visits', 'user_id', 'visits'),
+        db.Index('ix_bookmark_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_bookmark_user_url', 'user_id', 'url'),
+        db.Index('ix_bookmark_user_folder_path', 'user_id', 'folder_path', 'id'),
+        db.Index('ix_bookmark_public_visits', 'is_public', 'visits'),
+        db.Index('ix_bookmark_user_host', 'user_id', 'host'),
+    )
+    # Composite indexes backing the default (id) order and the sortable columns of the bookmark list.
+    # Each one starts with `user_id`, so listing one user's bookmarks in any supported order
+    # is a range scan over that user's slice of the index (walked backwards for descending sorts).
+
     def generate_short_characters(self):
-        # A method to generate a short random string (3 characters) for the short URL.
+        # A method to generate a short random string (`SHORT_CODE_LENGTH` characters) for the short URL.
         
         characters = string.digits + string.ascii_letters
         # Defining a set of characters that includes digits and letters (uppercase and lowercase).
 
-        picked_chars = ''.join(random.choices(characters, k=3))
-        # Randomly selecting 3 characters from the defined set to create the short URL.
+        picked_chars = ''.join(random.choices(characters, k=SHORT_CODE_LENGTH))
+        # Randomly selecting `SHORT_CODE_LENGTH` characters from the defined set to create the short URL.
 
         link = self.query.filter_by(short_url=picked_chars).first()
         # Checking the database to see if the generated short URL already exists.
@@ -97,6 +185,63 @@ class Bookmark(db.Model):
             # If the short URL is unique, return it.
             return picked_chars
 
+    @classmethod
+    def generate_short_codes(cls, count, max_rounds=10):
+        # Allocating `count` unused short URLs at once for bulk inserts.
+        # Each round draws random candidates and checks them all with a single IN query,
+        # instead of one query per candidate as in `generate_short_characters`.
+
+        characters = string.digits + string.ascii_letters
+        codes = set()
+
+        for _ in range(max_rounds):
+            missing = count - len(codes)
+            if missing <= 0:
+                break
+
+            candidates = {''.join(random.choices(characters, k=SHORT_CODE_LENGTH)) for _ in range(missing)} - codes
+            # Drawing one candidate per missing code; duplicates within the draw collapse in the set.
+
+            taken = {
+                row[0] for row in db.session.execute(
+                    db.select(cls.short_url).where(cls.short_url.in_(candidates))
+                )
+            }
+            codes |= candidates - taken
+            # Keeping only the candidates no existing bookmark already uses.
+
+        if len(codes) < count:
+            raise RuntimeError('Could not allocate enough unused short URLs')
+            # Only happens when the code space is nearly exhausted.
+
+        return list(codes)[:count]
+
+    @classmethod
+    def insert_with_short_codes(cls, rows, max_rounds=10):
+        """Insert bookmark rows, each with a newly allocated short URL; return their ids in the order of `rows`.
+
+        A code can be taken by a concurrent insert between its allocation and this INSERT. The unique
+        index settles it: such rows are skipped by ON CONFLICT DO NOTHING and retried with new codes,
+        while every other row is inserted once.
+        """
+        ids = {}
+        pending = rows
+        for _ in range(max_rounds):
+            for row, code in zip(pending, cls.generate_short_codes(len(pending))):
+                row['short_url'] = code
+
+            ids.update(db.session.execute(
+                upsert(cls).on_conflict_do_nothing(index_elements=['short_url']).returning(cls.short_url, cls.id),
+                pending,
+            ).all())
+            # A single executemany; the returned codes tell which rows went in.
+
+            pending = [row for row in pending if row['short_url'] not in ids]
+            if not pending:
+                return [ids[row['short_url']] for row in rows]
+
+        raise RuntimeError('Could not allocate enough unused short URLs')
+
     def __init__(self, **kwargs):
         # The constructor method, called when a new instance of `Bookmark` is created.
         
@@ -110,3 +255,220 @@ class Bookmark(db.Model):
         # A special method that defines how the object is represented as a string.
         return f'Bookmark>>> {self.url}'
         # When an instance of `Bookmark` is printed, it will display as `Bookmark>>> url`.
+
+class Folder(db.Model):
+    # Defining the `Folder` model for nesting bookmarks into a per-user tree of folders.
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Defining the `id` column as an integer and primary key for the `Folder` table.
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Defining the `user_id` column to store the owner of the folder.
+
+    parent_id = db.Column(db.Integer, db.ForeignKey('folder.id'), nullable=True)
+    # Defining the `parent_id` column to store the enclosing folder. Top-level folders have none.
+
+    name = db.Column(db.String(255), nullable=False)
+    # Defining the `name` column to store the folder's display name.
+
+    path = db.Column(db.String(255), nullable=False, default='')
+    # Materialized path of folder ids from the root, e.g. '/3/17/'. Every folder in a subtree shares
+    # its root's path as a prefix, so subtree queries are a range scan on `ix_folder_user_path`.
+    # Paths are built from ids, so renaming a folder never rewrites them.
+
+    __table_args__ = (
+        db.Index('ix_folder_user_path', 'user_id', 'path'),
+    )
+
+    def __repr__(self) -> str:
+        # A special method that defines how the object is represented as a string.
+        return f'Folder>>> {self.path}'
+
+def subtree_range(path):
+    """Return the `[low, high)` string range holding `path` and every path below it."""
+    return path, path[:-1] + chr(ord(path[-1]) + 1)
+    # Paths end with '/', so incrementing that last character gives the first string past the prefix.
+
+class LeaderboardEntry(db.Model):
+    # Defining the `LeaderboardEntry` model: the last checkpoint of the global most-visited public links.
+
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    # Defining the `bookmark_id` column as the primary key; each bookmark appears at most once.
+
+    visits = db.Column(db.Integer, nullable=False, index=True)
+    # Visit count of the bookmark when it was last checkpointed.
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+    # Defining the `updated_at` column to store when the entry was last checkpointed.
+
+class HourlyClicks(db.Model):
+    # Defining the `HourlyClicks` model: one rollup row per bookmark per hour that saw a click.
+
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    # The start of the hour; the `(bookmark_id, bucket)` primary key makes a range of buckets one index scan.
+
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    # Number of redirects through the bookmark's short URL in that hour.
+
+class DailyClicks(db.Model):
+    # Defining the `DailyClicks` model: the hourly rollup summed per day, kept in step on every click.
+
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    # Midnight at the start of the day.
+
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    # Number of redirects through the bookmark's short URL that day.
+
+class DailyVisitors(db.Model):
+    # Defining the `DailyVisitors` model: one unique-visitor HyperLogLog sketch per bookmark per day.
+
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    # Midnight at the start of the day.
+
+    registers = db.Column(db.LargeBinary, nullable=False)
+    # The compressed sketch; sketches of consecutive days merge into the sketch of the whole range.
+
+class DailyBreakdown(db.Model):
+    # Defining the `DailyBreakdown` model: the top referrers or user agents of a bookmark on one day.
+
+    bookmark_id = db.Column(db.Integer, db.ForeignKey('bookmark.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    # Midnight at the start of the day.
+
+    kind = db.Column(db.String(16), primary_key=True)
+    # What is counted: 'referrer' or 'user_agent'.
+
+    counts = db.Column(db.LargeBinary, nullable=False)
+    # The compressed count-min sketch of every value seen that day.
+
+    candidates = db.Column(db.Text, nullable=False)
+    # JSON list of the values currently leading the sketch's estimates.
+
+class DomainStats(db.Model):
+    # Defining the `DomainStats` model: each user's bookmark count and visit total per domain.
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    domain = db.Column(db.String(255), primary_key=True)
+    # One row per user and `Bookmark.host`.
+
+    bookmarks = db.Column(db.Integer, nullable=False, default=0)
+    # Number of the user's bookmarks on the domain.
+
+    visits = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of the visits of those bookmarks.
+
+    __table_args__ = (
+        db.Index('ix_domain_stats_user_visits', 'user_id', 'visits'),
+        # Serves the per-domain breakdown, most visited first, straight from the index.
+    )
+
+class RevokedToken(db.Model):
+    # Defining the `RevokedToken` model: the blocklist of revoked JWTs, kept until they would have expired anyway.
+
+    jti = db.Column(db.String(36), primary_key=True)
+    # The token's unique identifier (`jti` claim).
+
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # When the token expires; after that the row is useless and gets pruned through this index.
+
+class RefreshToken(db.Model):
+    # Defining the `RefreshToken` model: one compact row per issued refresh token, used once and then rotated.
+
+    token_hash = db.Column(db.LargeBinary(16), primary_key=True)
+    # A truncated SHA-256 of the token's `jti`; the table never holds anything usable as a token.
+
+    family = db.Column(db.LargeBinary(16), nullable=False, index=True)
+    # The `token_hash` of the family's first token, issued at login; every rotation stays in the family.
+
+    used = db.Column(db.Boolean, nullable=False, default=False)
+    # Set when the token is exchanged; presenting it again means it leaked, and the family is revoked.
+
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # When the token expires; the sweeper prunes expired rows through this index in batches.
+
+class Tag(db.Model):
+    # Defining the `Tag` model: one row per distinct tag name of each user.
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Defining the `id` column as an integer and primary key for the `Tag` table.
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Defining the `user_id` column to store the owner of the tag.
+
+    name = db.Column(db.String(64), nullable=False)
+    # Defining the `name` column to store the normalized (lowercase) tag name.
+
+    bookmark_count = db.Column(db.Integer, nullable=False, default=0)
+    # Number of the user's bookmarks carrying this tag, maintained on every tag change
+    # so tag counts never need a COUNT(*) over the postings.
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_tag_user_name'),
+    )
+    # Resolving a user's tag names to ids is a lookup on this unique index.
+
+    def __repr__(self) -> str:
+        # A special method that defines how the object is represented as a string.
+        return f'Tag>>> {self.name}'
+
+bookmark_tag = db.Table(
+    'bookmark_tag',
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    db.Column('bookmark_id', db.Integer, db.ForeignKey('bookmark.id'), primary_key=True),
+    db.Index('ix_bookmark_tag_bookmark', 'bookmark_id', 'tag_id'),
+)
+# The inverted index linking tags to bookmarks. The `(tag_id, bookmark_id)` primary key stores each
+# tag's posting list sorted by bookmark id, so checking whether a bookmark carries a tag is one index
+# probe; the reverse index loads a page of bookmarks' tags in one query.
+
+SEARCH_INDEX_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS bookmark_fts USING fts5(
+        body, url, owner, content='', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_insert AFTER INSERT ON bookmark BEGIN
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_delete AFTER DELETE ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_fts_update AFTER UPDATE OF body, url, user_id ON bookmark BEGIN
+        INSERT INTO bookmark_fts(bookmark_fts, rowid, body, url, owner) VALUES ('delete', old.id, old.body, old.url, 'u' || old.user_id);
+        INSERT INTO bookmark_fts(rowid, body, url, owner) VALUES (new.id, new.body, new.url, 'u' || new.user_id);
+    END""",
+)
+# FTS5 index over bookmark bodies and URLs. It is contentless (`content=''`): only the inverted
+# index is stored, and the 'delete' commands replay the old values to remove a row's postings.
+# `owner` holds one token per user ('u42'), so a search ANDs `owner:"u42"` into its MATCH and
+# FTS5 intersects the user's posting list itself instead of ranking every user's hits and
+# filtering them afterwards. The `unicode61` tokenizer splits URLs on punctuation, so
+# 'https://docs.python.org/3/' indexes 'https', 'docs', 'python', 'org' and '3'. The triggers keep
+# it in sync row by row; the update trigger only fires for `body`/`url`/`user_id` changes, so visit
+# counting never touches the index.
+
+SEARCH_INDEX_DROP = (
+    'DROP TRIGGER IF EXISTS bookmark_fts_insert',
+    'DROP TRIGGER IF EXISTS bookmark_fts_delete',
+    'DROP TRIGGER IF EXISTS bookmark_fts_update',
+    'DROP TABLE IF EXISTS bookmark_fts',
+)
+
+SEARCH_INDEX_POPULATE = "INSERT INTO bookmark_fts(rowid, body, url, owner) SELECT id, body, url, 'u' || user_id FROM bookmark"
+# Indexes every existing bookmark in one statement.
+
+def search_owner_token(user_id):
+    """Return the `owner` token that marks a user's rows in the full-text index."""
+    return f'u{user_id}'
+
+for statement in SEARCH_INDEX_DDL:
+    event.listen(Bookmark.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    # Creating the index and triggers whenever `db.create_all()` creates the `bookmark` table.
+
+def rebuild_search_index():
+    """Recreate the full-text index and its triggers and repopulate it from the `bookmark` table."""
+    for statement in SEARCH_INDEX_DROP + SEARCH_INDEX_DDL + (SEARCH_INDEX_POPULATE,):
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    # Dropping first also replaces an index or triggers left in an older layout.
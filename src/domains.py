@@ -0,0 +1,112 @@
+from collections import defaultdict
+# Importing defaultdict to sum per-domain changes before writing them.
+
+from urllib.parse import urlsplit
+# Importing urlsplit to extract hosts from URLs.
+
+from sqlalchemy import select, insert, update, delete, bindparam, func
+# Importing SQLAlchemy Core constructs for set-based aggregate maintenance.
+
+from src.database import Bookmark, DomainStats, db, bump_user_version, upsert
+# Importing the models, the database instance, the per-user change version helper and the dialect-aware
+# INSERT that supports ON CONFLICT DO UPDATE.
+
+MAX_HOST_LENGTH = 255
+# Longest host stored, matching the `Bookmark.host` column.
+
+def url_host(url):
+    """Return the lowercased host of a URL (without port or credentials), or None if it has none."""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    return host[:MAX_HOST_LENGTH] if host else None
+
+def adjust_domains(user_id, changes):
+    """Apply `(host, bookmarks delta, visits delta)` changes to the user's per-domain aggregates."""
+    totals = defaultdict(lambda: [0, 0])
+    for host, bookmarks, visits in changes:
+        if host:
+            totals[host][0] += bookmarks
+            totals[host][1] += visits
+    rows = [
+        {'user_id': user_id, 'domain': host, 'bookmarks': bookmarks, 'visits': visits}
+        for host, (bookmarks, visits) in totals.items() if bookmarks or visits
+    ]
+    # Summing first, so a batch touching one domain many times writes its row once.
+    if not rows:
+        return
+
+    statement = upsert(DomainStats)
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=['user_id', 'domain'],
+            set_={
+                'bookmarks': DomainStats.bookmarks + statement.excluded.bookmarks,
+                'visits': DomainStats.visits + statement.excluded.visits,
+            },
+        ),
+        rows,
+    )
+    # One executemany upsert, adding the deltas in SQL so concurrent writers never lose an update.
+
+    if any(row['bookmarks'] < 0 for row in rows):
+        db.session.execute(
+            delete(DomainStats).where(DomainStats.user_id == user_id, DomainStats.bookmarks <= 0)
+        )
+        # Dropping domains the user no longer has any bookmark on.
+
+def current_domains(bookmark_ids):
+    """Return `(id, host, visits)` of existing bookmarks, for subtracting them before an edit or delete."""
+    if not bookmark_ids:
+        return []
+    return db.session.execute(
+        select(Bookmark.id, Bookmark.host, Bookmark.visits).where(Bookmark.id.in_(bookmark_ids))
+    ).all()
+
+def backfill_domains(chunk_size, progress):
+    """Fill in `Bookmark.host` for existing rows, chunk by chunk, then rebuild the per-domain aggregates."""
+    last_id = 0
+    processed = 0
+    while True:
+        rows = db.session.execute(
+            select(Bookmark.id, Bookmark.url)
+            .where(Bookmark.id > last_id, Bookmark.host.is_(None))
+            .order_by(Bookmark.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        params = [{'b': bookmark_id, 'h': url_host(url)} for bookmark_id, url in rows]
+        params = [param for param in params if param['h']]
+        if params:
+            db.session.execute(
+                update(Bookmark.__table__)
+                .where(Bookmark.__table__.c.id == bindparam('b'))
+                .values(host=bindparam('h'), updated_at=Bookmark.__table__.c.updated_at),
+                params,
+            )
+        db.session.commit()
+        # Keyset pagination on the primary key and one short transaction per chunk, so writers are
+        # never blocked for long and an interrupted run resumes where it stopped.
+
+        last_id = rows[-1][0]
+        processed += len(rows)
+        progress(processed)
+
+    affected = set(db.session.execute(select(DomainStats.user_id).distinct()).scalars())
+    db.session.execute(delete(DomainStats))
+    db.session.execute(insert(DomainStats).from_select(
+        ['user_id', 'domain', 'bookmarks', 'visits'],
+        select(Bookmark.user_id, Bookmark.host, func.count(Bookmark.id), func.coalesce(func.sum(Bookmark.visits), 0))
+        .where(Bookmark.host.is_not(None))
+        .group_by(Bookmark.user_id, Bookmark.host)
+    ))
+    affected.update(db.session.execute(select(DomainStats.user_id).distinct()).scalars())
+    for user_id in affected:
+        bump_user_version(user_id)
+        # Every user whose aggregates may have changed; their cached stats, ETags and domain
+        # suggestions would otherwise keep serving the old breakdown.
+    db.session.commit()
+    # Rebuilding the aggregates with one INSERT ... SELECT in one transaction, so readers never see them half-built.
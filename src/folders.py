@@ -0,0 +1,206 @@
+from flask import Blueprint, request, jsonify
+# Importing Flask components for Blueprint, handling requests, and returning JSON responses.
+
+from flask_jwt_extended import get_jwt_identity
+# Importing a function to get the identity (usually user ID) from the JWT.
+
+from flask_jwt_extended.view_decorators import jwt_required
+# Importing a decorator to protect routes with JWT authentication.
+
+from sqlalchemy import update, func
+# Importing update and func to rewrite materialized paths in bulk.
+
+from src.database import Bookmark, Folder, db, bump_user_version, subtree_range
+# Importing the models, the database instance and the path helpers.
+
+from src.etags import conditional_on_user_version
+# Importing the decorator that answers If-None-Match from the user's change version.
+
+from src.constants.http_status_codes import OK as HTTP_200_OK, BAD_REQUEST as HTTP_400_BAD_REQUEST, CREATED as HTTP_201_CREATED, NOT_FOUND as HTTP_404_NOT_FOUND, NO_CONTENT as HTTP_204_NO_CONTENT
+# Importing HTTP status codes with custom names for clarity and readability.
+
+# Creating a Blueprint for folder-related routes with a URL prefix of '/api/v1/folders'.
+folders = Blueprint("folders", __name__, url_prefix="/api/v1/folders")
+
+MAX_PATH_LENGTH = 255
+# Longest materialized path that fits in `Folder.path`, which bounds the nesting depth.
+
+def get_folder_path(user_id, folder_id):
+    """Return the path of one of the user's folders, or None if it doesn't exist."""
+    return db.session.query(Folder.path).filter_by(user_id=user_id, id=folder_id).scalar()
+
+def folder_paths(user_id, folder_ids):
+    """Return `{folder_id: path}` for the user's folders among `folder_ids` with one query."""
+    if not folder_ids:
+        return {}
+    return dict(db.session.query(Folder.id, Folder.path).filter(Folder.user_id == user_id, Folder.id.in_(folder_ids)))
+
+def field_error(data):
+    """Return why a folder request's `name` or `parent_id` has the wrong type, or None."""
+    if data.get('name') is not None and not isinstance(data['name'], str):
+        return "'name' must be a string"
+
+    parent_id = data.get('parent_id')
+    if parent_id is not None and (not isinstance(parent_id, int) or isinstance(parent_id, bool)):
+        return "'parent_id' must be an integer or null"
+        # e.g. `[1]`, which would otherwise reach the path lookup's query parameters.
+    return None
+
+def serialize_folder(folder):
+    """Return the JSON representation of a folder."""
+    return {
+        'id': folder.id,
+        'name': folder.name,
+        'parent_id': folder.parent_id,
+        'path': folder.path,
+    }
+
+def rewrite_subtree(user_id, old_path, new_path):
+    """Replace the `old_path` prefix with `new_path` for every folder and bookmark in the subtree."""
+    low, high = subtree_range(old_path)
+    suffix_start = len(old_path) + 1
+    # SQL substr() is 1-based, so this is the first character after the old prefix.
+
+    db.session.execute(
+        update(Folder)
+        .where(Folder.user_id == user_id, Folder.path >= low, Folder.path < high)
+        .values(path=new_path + func.substr(Folder.path, suffix_start))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Bookmark)
+        .where(Bookmark.user_id == user_id, Bookmark.folder_path >= low, Bookmark.folder_path < high)
+        .values(folder_path=new_path + func.substr(Bookmark.folder_path, suffix_start))
+        .execution_options(synchronize_session=False)
+    )
+    # Two set-based UPDATEs, each a range scan over the user's `(user_id, path)` index, however deep or wide the subtree is.
+
+@folders.route('/', methods=['POST', 'GET'])
+@jwt_required()
+@conditional_on_user_version
+def handle_folders():
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    if request.method == 'GET':
+        items = Folder.query.filter_by(user_id=current_user).order_by(Folder.path).all()
+        return jsonify({'data': [serialize_folder(folder) for folder in items]}), HTTP_200_OK
+        # Ordering by path lists the tree depth-first, each folder right before its children.
+
+    data = request.get_json()
+    error = field_error(data)
+    if error:
+        return jsonify({'error': error}), HTTP_400_BAD_REQUEST
+
+    name = (data.get('name') or '').strip()
+    parent_id = data.get('parent_id')
+    # Extracting the folder name and optional parent from the request data.
+
+    if not name:
+        return jsonify({'error': 'Folder name is required'}), HTTP_400_BAD_REQUEST
+
+    parent_path = '/'
+    if parent_id is not None:
+        parent_path = get_folder_path(current_user, parent_id)
+        if parent_path is None:
+            return jsonify({'error': 'Parent folder not found'}), HTTP_404_NOT_FOUND
+
+    folder = Folder(user_id=current_user, parent_id=parent_id, name=name)
+    db.session.add(folder)
+    db.session.flush()
+    folder.path = f'{parent_path}{folder.id}/'
+    # The path ends with the folder's own id, which is only known once it has been inserted.
+
+    if len(folder.path) > MAX_PATH_LENGTH:
+        db.session.rollback()
+        return jsonify({'error': 'Folders are nested too deeply'}), HTTP_400_BAD_REQUEST
+
+    bump_user_version(current_user)
+    db.session.commit()
+
+    return jsonify(serialize_folder(folder)), HTTP_201_CREATED
+
+@folders.patch('/<int:id>')
+@jwt_required()
+def edit_folder(id):
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    folder = Folder.query.filter_by(user_id=current_user, id=id).first()
+    if not folder:
+        return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
+
+    data = request.get_json()
+    error = field_error(data)
+    if error:
+        return jsonify({'error': error}), HTTP_400_BAD_REQUEST
+
+    if 'name' in data:
+        name = (data.get('name') or '').strip()
+        if not name:
+            return jsonify({'error': 'Folder name is required'}), HTTP_400_BAD_REQUEST
+        folder.name = name
+        # Renaming only touches this row; paths are made of ids.
+
+    if 'parent_id' in data and data['parent_id'] != folder.parent_id:
+        parent_id = data['parent_id']
+        parent_path = '/'
+        if parent_id is not None:
+            parent_path = get_folder_path(current_user, parent_id)
+            if parent_path is None:
+                return jsonify({'error': 'Parent folder not found'}), HTTP_404_NOT_FOUND
+            if parent_path.startswith(folder.path):
+                return jsonify({'error': 'A folder cannot be moved into itself or one of its subfolders'}), HTTP_400_BAD_REQUEST
+
+        old_path = folder.path
+        new_path = f'{parent_path}{folder.id}/'
+
+        deepest = db.session.query(func.max(func.length(Folder.path))).filter(
+            Folder.user_id == current_user, Folder.path >= old_path, Folder.path < subtree_range(old_path)[1]
+        ).scalar()
+        if deepest - len(old_path) + len(new_path) > MAX_PATH_LENGTH:
+            return jsonify({'error': 'Folders are nested too deeply'}), HTTP_400_BAD_REQUEST
+        # Checking the longest path in the subtree before rewriting it.
+
+        folder.parent_id = parent_id
+        db.session.flush()
+        rewrite_subtree(current_user, old_path, new_path)
+        db.session.refresh(folder)
+        # Moving a folder rewrites the path prefix of its whole subtree in bulk.
+
+    bump_user_version(current_user)
+    db.session.commit()
+
+    return jsonify(serialize_folder(folder)), HTTP_200_OK
+
+@folders.delete('/<int:id>')
+@jwt_required()
+def delete_folder(id):
+    current_user = get_jwt_identity()
+    # Getting the current user's identity from the JWT.
+
+    folder = Folder.query.filter_by(user_id=current_user, id=id).first()
+    if not folder:
+        return jsonify({'message': 'Item not found'}), HTTP_404_NOT_FOUND
+
+    low, high = subtree_range(folder.path)
+
+    db.session.execute(
+        update(Bookmark)
+        .where(Bookmark.user_id == current_user, Bookmark.folder_path >= low, Bookmark.folder_path < high)
+        .values(folder_id=None, folder_path=None)
+        .execution_options(synchronize_session=False)
+    )
+    # Bookmarks in the deleted subtree are kept, just unfiled.
+
+    db.session.execute(
+        db.delete(Folder)
+        .where(Folder.user_id == current_user, Folder.path >= low, Folder.path < high)
+        .execution_options(synchronize_session=False)
+    )
+    # Deleting the folder and all of its subfolders with one range delete.
+
+    bump_user_version(current_user)
+    db.session.commit()
+
+    return jsonify({}), HTTP_204_NO_CONTENT
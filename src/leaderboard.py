@@ -0,0 +1,260 @@
+import heapq
+# Importing heapq for the bounded min-heap that tracks the smallest entry of the top N.
+
+import time
+# Importing time to space out checkpoints with a monotonic clock.
+
+from threading import Lock
+# Importing Lock so concurrent redirects can update the shared ranking safely.
+
+import click
+# Importing click to report the result of the rebuild command.
+
+from flask import Blueprint, request, jsonify, current_app
+# Importing Flask components for Blueprint, handling requests, returning JSON responses and per-app state.
+
+from flasgger import swag_from
+# Importing swag_from for API documentation generation with Swagger.
+
+from sqlalchemy import select, insert, delete
+# Importing SQLAlchemy Core constructs to read and rewrite the checkpoint table.
+
+from src.database import Bookmark, LeaderboardEntry, db
+# Importing the models and the database instance.
+
+from src.constants.http_status_codes import OK as HTTP_200_OK
+# Importing HTTP status codes with custom names for clarity and readability.
+
+# Creating a Blueprint for the public leaderboard with a URL prefix of '/api/v1/leaderboard'.
+leaderboard = Blueprint("leaderboard", __name__, url_prefix="/api/v1/leaderboard")
+
+class TopN:
+    """The `size` most-visited public bookmarks, updated one visit at a time.
+
+    Scores live in a dict and a min-heap keeps the current smallest score at the top, so a visit
+    costs O(log N) and anything below the cut-off is rejected after a single comparison. Heap entries
+    are invalidated lazily: a raised score pushes a new entry and the stale one is skipped when it
+    surfaces.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.scores = {}
+        # bookmark_id -> visits for every entry currently ranked.
+        self.links = {}
+        # bookmark_id -> (url, short_url), so reads never touch the database.
+        self.heap = []
+        self.version = 0
+        # Bumped on every change to the ranking; lets readers reuse a serialized response.
+        self.lock = Lock()
+        self.last_checkpoint = time.monotonic()
+
+    def _lowest(self):
+        """Return the `(visits, bookmark_id)` entry with the fewest visits, dropping stale heap entries."""
+        while self.heap:
+            visits, bookmark_id = self.heap[0]
+            if self.scores.get(bookmark_id) == visits:
+                return visits, bookmark_id
+            heapq.heappop(self.heap)
+        return None
+
+    def _push(self, bookmark_id, visits):
+        self.scores[bookmark_id] = visits
+        heapq.heappush(self.heap, (visits, bookmark_id))
+        if len(self.heap) > 4 * self.size:
+            self.heap = [(v, b) for b, v in self.scores.items()]
+            heapq.heapify(self.heap)
+            # Compacting once stale entries outnumber live ones, so the heap stays O(N).
+
+    def offer(self, bookmark_id, visits, url, short_url):
+        """Record a bookmark's current visit count, ranking it if it makes the cut."""
+        if self.size < 1:
+            return
+            # `LEADERBOARD_SIZE = 0` turns the leaderboard off; there is no cut-off entry to compare with.
+
+        with self.lock:
+            if bookmark_id in self.scores:
+                self.links[bookmark_id] = (url, short_url)
+                if visits != self.scores[bookmark_id]:
+                    self._push(bookmark_id, visits)
+                self.version += 1
+                return
+
+            if len(self.scores) >= self.size:
+                lowest = self._lowest()
+                if (visits, bookmark_id) <= lowest:
+                    return
+                    # Below the cut-off: the common case for the long tail, and it costs one comparison.
+                heapq.heappop(self.heap)
+                del self.scores[lowest[1]]
+                del self.links[lowest[1]]
+
+            self.links[bookmark_id] = (url, short_url)
+            self._push(bookmark_id, visits)
+            self.version += 1
+
+    def discard(self, bookmark_ids):
+        """Remove bookmarks that were deleted or made private."""
+        with self.lock:
+            for bookmark_id in bookmark_ids:
+                if self.scores.pop(bookmark_id, None) is not None:
+                    del self.links[bookmark_id]
+                    self.version += 1
+            # Their heap entries are now stale and get skipped by `_lowest`.
+
+    def reset(self, rows):
+        """Replace the whole ranking with `(bookmark_id, visits, url, short_url)` rows."""
+        with self.lock:
+            self.scores = {bookmark_id: visits for bookmark_id, visits, _, _ in rows}
+            self.links = {bookmark_id: (url, short_url) for bookmark_id, _, url, short_url in rows}
+            self.heap = [(visits, bookmark_id) for bookmark_id, visits in self.scores.items()]
+            heapq.heapify(self.heap)
+            self.version += 1
+
+    def ranking(self):
+        """Return the ranked entries, most visited first."""
+        with self.lock:
+            return [{
+                'id': bookmark_id,
+                'url': self.links[bookmark_id][0],
+                'short_url': self.links[bookmark_id][1],
+                'visits': visits,
+            } for bookmark_id, visits in sorted(self.scores.items(), key=lambda item: (-item[1], item[0]))]
+            # Sorting N entries on read; N is small and reads are served from a cached response anyway.
+
+def public_rows(bookmark_ids):
+    """Return `(id, visits, url, short_url)` for the bookmarks among `bookmark_ids` that are still public."""
+    if not bookmark_ids:
+        return []
+    return db.session.execute(
+        select(Bookmark.id, Bookmark.visits, Bookmark.url, Bookmark.short_url)
+        .where(Bookmark.id.in_(bookmark_ids), Bookmark.is_public.is_(True))
+    ).all()
+
+def scan_public(size):
+    """Return the `size` most-visited public bookmarks straight from the `(is_public, visits)` index."""
+    return db.session.execute(
+        select(Bookmark.id, Bookmark.visits, Bookmark.url, Bookmark.short_url)
+        .where(Bookmark.is_public.is_(True))
+        .order_by(Bookmark.visits.desc(), Bookmark.id)
+        .limit(size)
+    ).all()
+
+def write_checkpoint(rows):
+    """Replace the checkpoint table with `rows`."""
+    db.session.execute(delete(LeaderboardEntry))
+    if rows:
+        db.session.execute(
+            insert(LeaderboardEntry),
+            [{'bookmark_id': bookmark_id, 'visits': visits} for bookmark_id, visits, _, _ in rows],
+        )
+
+def get_leaderboard():
+    """Return the application's leaderboard, loading it from the last checkpoint on first use."""
+    board = current_app.extensions.get('leaderboard')
+    if board is None:
+        board = TopN(current_app.config['LEADERBOARD_SIZE'])
+        checkpointed = db.session.execute(select(LeaderboardEntry.bookmark_id)).scalars().all()
+        rows = public_rows(checkpointed) if checkpointed else scan_public(board.size)
+        # Without a checkpoint yet, the ranking is seeded with one indexed scan; after that the
+        # table is only ever N rows.
+        board.reset(rows)
+        current_app.extensions['leaderboard'] = board
+
+    return board
+
+def checkpoint(board):
+    """Merge the in-memory ranking with the checkpoint table, keep the top N and write it back."""
+    checkpointed = db.session.execute(select(LeaderboardEntry.bookmark_id)).scalars().all()
+    with board.lock:
+        candidates = set(checkpointed) | set(board.scores)
+    # Other worker processes checkpoint their own rankings too; merging with the table lets every
+    # process converge on the same global top N.
+
+    rows = sorted(public_rows(list(candidates)), key=lambda row: (-row[1], row[0]))[:board.size]
+    # Re-reading the candidates' visits drops anything deleted or made private since, and picks up
+    # visits counted by other processes.
+
+    write_checkpoint(rows)
+    db.session.commit()
+    board.reset(rows)
+
+def record_visit(bookmark):
+    """Feed a visited bookmark into the leaderboard."""
+    board = get_leaderboard()
+    if bookmark.is_public:
+        board.offer(bookmark.id, bookmark.visits, bookmark.url, bookmark.short_url)
+    # Only memory is touched; the visit flusher thread writes the checkpoint (see `checkpoint_if_due`).
+
+def checkpoint_if_due():
+    """Checkpoint the application's leaderboard if the interval has passed since the last one.
+
+    Called by the visit flusher thread after each flush, so redirects never wait for the checkpoint.
+    """
+    board = current_app.extensions.get('leaderboard')
+    if board is None:
+        return
+        # Nothing visited in this process yet, so there is nothing new to merge.
+
+    now = time.monotonic()
+    if now - board.last_checkpoint < current_app.config['LEADERBOARD_CHECKPOINT_INTERVAL']:
+        return
+    board.last_checkpoint = now
+
+    try:
+        checkpoint(board)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Checkpointing the leaderboard failed; retrying at the next interval')
+        # The ranking in memory is untouched, so the next checkpoint writes it all the same.
+
+def sync_bookmark(bookmark):
+    """Bring the leaderboard in line with an edited bookmark (a new URL, or a change of visibility)."""
+    board = current_app.extensions.get('leaderboard')
+    if board is None:
+        return
+        # Nothing loaded yet; the first load reads the current state anyway.
+
+    if bookmark.is_public:
+        board.offer(bookmark.id, bookmark.visits, bookmark.url, bookmark.short_url)
+    else:
+        board.discard([bookmark.id])
+
+def forget_bookmarks(bookmark_ids):
+    """Remove bookmarks that are about to be deleted from the checkpoint table and the ranking."""
+    if not bookmark_ids:
+        return
+    db.session.execute(delete(LeaderboardEntry).where(LeaderboardEntry.bookmark_id.in_(bookmark_ids)))
+    board = current_app.extensions.get('leaderboard')
+    if board is not None:
+        board.discard(bookmark_ids)
+
+@leaderboard.get('/')
+@swag_from("./docs/leaderboard.yaml")
+def get_top_links():
+    """Return the most-visited public links. Public, read-only and served from memory."""
+    board = get_leaderboard()
+
+    cached = current_app.extensions.get('leaderboard_response')
+    if cached is None or cached[0] != board.version:
+        response = jsonify({'data': board.ranking()})
+        response.add_etag()
+        cached = (board.version, response.get_data(), response.get_etag()[0])
+        current_app.extensions['leaderboard_response'] = cached
+        # Serializing and hashing once per ranking change; every other request reuses the bytes.
+
+    response = current_app.response_class(cached[1], status=HTTP_200_OK, mimetype='application/json')
+    response.set_etag(cached[2])
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config['LEADERBOARD_MAX_AGE']}"
+    # The list is the same for everyone, so shared caches may keep it briefly.
+    return response.make_conditional(request)
+    # Answering a matching If-None-Match with an empty 304.
+
+@leaderboard.cli.command('rebuild')
+def rebuild_leaderboard_command():
+    """Recompute the leaderboard from all public bookmarks and checkpoint it."""
+    size = current_app.config['LEADERBOARD_SIZE']
+    rows = scan_public(size)
+    write_checkpoint(rows)
+    db.session.commit()
+    click.echo(f'Leaderboard rebuilt with {len(rows)} links.')
@@ -0,0 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+# Importing a process pool so password hashing runs outside the web worker's interpreter and GIL,
+# and the error it raises for good once one of its processes dies.
+
+from threading import BoundedSemaphore, Lock
+# Importing BoundedSemaphore to cap how many hashes may be queued or running at once, and Lock so a
+# broken pool is replaced only once.
+
+from flask import current_app
+# Importing current_app to keep one pool per application.
+
+from werkzeug.security import check_password_hash, generate_password_hash
+# Importing werkzeug's password hashing functions, which run inside the pool.
+
+PRESETS = {
+    'strong': 'scrypt:65536:8:1',
+    'default': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    'test': 'pbkdf2:sha256:1000',
+}
+# Named hashing policies in werkzeug's method syntax: `scrypt:n:r:p` or `pbkdf2:hash:iterations`.
+# 'default' matches werkzeug's own default; 'test' is deliberately weak and only for test suites.
+
+class HashingUnavailable(Exception):
+    """Raised when the hashing pool is full, broken, or a hash didn't finish in time; answered with a 503."""
+
+class HashPool:
+    """A bounded process pool for password hashing.
+
+    At most `max_pending` hashes are queued or running; one more is rejected immediately instead of
+    waiting behind the others, and a caller gives up after `timeout` seconds. Either way the request
+    fails fast with a 503 and the web worker stays free for other requests. If a hashing process
+    dies (e.g. killed for memory), the pool is replaced and only the hashes in flight get a 503.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        # With no workers, hashes run inline; handy for tests and single-threaded development servers.
+        self.lock = Lock()
+        self.slots = BoundedSemaphore(max_pending)
+        self.timeout = timeout
+
+    def replace(self, broken):
+        """Swap a broken executor for a fresh one, once however many callers saw it break."""
+        with self.lock:
+            if self.executor is broken:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                broken.shutdown(wait=False, cancel_futures=True)
+                # A broken executor rejects every submission forever, so without this each later
+                # login would fail too.
+
+    def run(self, function, *args):
+        if self.executor is None:
+            return function(*args)
+
+        if not self.slots.acquire(blocking=False):
+            raise HashingUnavailable()
+
+        executor = self.executor
+        try:
+            future = executor.submit(function, *args)
+        except BrokenProcessPool:
+            self.slots.release()
+            self.replace(executor)
+            raise HashingUnavailable()
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        # The slot is freed when the hash finishes, even if its caller has already timed out, so
+        # abandoned hashes still count against the limit while they occupy a process.
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            # Dropping it if it hasn't started yet.
+            raise HashingUnavailable()
+        except BrokenProcessPool:
+            self.replace(executor)
+            raise HashingUnavailable()
+
+def get_hash_pool():
+    """Return the application's hashing pool, starting it on first use."""
+    pool = current_app.extensions.get('password_hashing')
+    if pool is None:
+        pool = current_app.extensions['password_hashing'] = HashPool(
+            current_app.config['PASSWORD_HASH_WORKERS'],
+            current_app.config['PASSWORD_HASH_MAX_PENDING'],
+            current_app.config['PASSWORD_HASH_TIMEOUT'],
+        )
+    return pool
+
+def hash_method():
+    """Return the configured hashing method with every parameter spelled out, as it appears in stored hashes."""
+    method = current_app.extensions.get('password_hash_method')
+    if method is None:
+        configured = current_app.config['PASSWORD_HASH_METHOD'] or PRESETS[current_app.config['PASSWORD_HASH_PRESET']]
+        method = generate_password_hash('', configured).split('$', 1)[0]
+        current_app.extensions['password_hash_method'] = method
+        # Letting werkzeug fill in omitted parameters (e.g. 'scrypt' -> 'scrypt:32768:8:1') once, so a
+        # shorthand setting compares equal to the hashes it produces.
+    return method
+
+def hash_password(password):
+    """Hash a password in the pool with the configured method."""
+    return get_hash_pool().run(generate_password_hash, password, hash_method())
+
+def needs_rehash(password_hash):
+    """Tell whether a stored hash was made with a method or parameters other than the configured ones."""
+    return password_hash.split('$', 1)[0] != hash_method()
+
+def verify_password(password_hash, password):
+    """Check a password against its stored hash in the pool."""
+    return get_hash_pool().run(check_password_hash, password_hash, password)
@@ -0,0 +1,124 @@
+import hashlib
+# Importing hashlib to map limiter keys to fixed-size slots.
+
+import math
+# Importing math to round Retry-After up to whole seconds.
+
+import struct
+# Importing struct to pack bucket state into shared memory.
+
+import sys
+# Importing sys to adapt to the shared memory API of the running Python version.
+
+import time
+# Importing time for the refill clock; wall-clock time is comparable across worker processes.
+
+from collections import OrderedDict
+# Importing OrderedDict to evict the least recently used buckets from the in-memory store.
+
+from multiprocessing import shared_memory
+# Importing shared_memory for the store shared by every worker on a host.
+
+from threading import Lock
+# Importing Lock so concurrent requests in one process update buckets safely.
+
+from flask import current_app
+# Importing current_app to keep one limiter per application.
+
+class MemoryStore:
+    """Bucket state for this process only, bounded to the most recently used keys."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+    def update(self, key, change):
+        """Replace the state of `key` with `change(state)` atomically, returning its result."""
+        with self.lock:
+            state, result = change(self.buckets.get(key))
+            self.buckets[key] = state
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+                # An evicted bucket was idle the longest; it comes back full, which is what it would have refilled to anyway.
+            return result
+
+class SharedMemoryStore:
+    """Bucket state in a named shared memory block, so every worker on the host sees the same buckets.
+
+    The block is a direct-mapped table of `slots` entries holding (key hash, tokens, updated). A key
+    whose slot holds another key starts from a full bucket, so collisions can only make the limit
+    looser, never lock anyone out. Updates are not locked across processes: two workers racing on
+    one key may both spend the same token, which lets at most one extra attempt through per race.
+    """
+
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, name, slots):
+        self.slots = slots
+        size = self.SLOT.size * slots
+        options = {'track': False} if sys.version_info >= (3, 13) else {}
+        # The block must outlive whichever worker created it, so it is not tied to that process.
+        try:
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=size, **options)
+        except FileExistsError:
+            self.memory = shared_memory.SharedMemory(name=name, **options)
+        if not options:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+        self.lock = Lock()
+
+    def update(self, key, change):
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        offset = (digest % self.slots) * self.SLOT.size
+        with self.lock:
+            stored_key, tokens, updated = self.SLOT.unpack_from(self.memory.buf, offset)
+            state, result = change((tokens, updated) if stored_key == digest else None)
+            self.SLOT.pack_into(self.memory.buf, offset, digest, *state)
+            return result
+
+class TokenBucketLimiter:
+    """Allows `burst` attempts per key at once, refilled at `per_minute` attempts a minute."""
+
+    def __init__(self, store, burst, per_minute):
+        self.store = store
+        self.burst = burst
+        self.rate = per_minute / 60
+
+    def take(self, key):
+        """Spend one token of `key`'s bucket. Return 0 if allowed, else the seconds until a token is available."""
+        now = time.time()
+
+        def change(state):
+            tokens, updated = state or (self.burst, now)
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                return (tokens - 1, now), 0
+            return (tokens, now), math.ceil((1 - tokens) / self.rate)
+
+        return self.store.update(key, change)
+
+def get_login_limiters():
+    """Return the application's per-IP and per-email login limiters."""
+    limiters = current_app.extensions.get('login_limiters')
+    if limiters is None:
+        config = current_app.config
+        if config['RATE_LIMIT_BACKEND'] == 'shared':
+            store = SharedMemoryStore(config['RATE_LIMIT_SHARED_NAME'], config['RATE_LIMIT_MAX_KEYS'])
+        else:
+            store = MemoryStore(config['RATE_LIMIT_MAX_KEYS'])
+        limiters = current_app.extensions['login_limiters'] = (
+            TokenBucketLimiter(store, config['LOGIN_LIMIT_IP_BURST'], config['LOGIN_LIMIT_IP_PER_MINUTE']),
+            TokenBucketLimiter(store, config['LOGIN_LIMIT_EMAIL_BURST'], config['LOGIN_LIMIT_EMAIL_PER_MINUTE']),
+        )
+    return limiters
+
+def check_login_allowed(ip, email):
+    """Spend a login attempt for the client IP and the email; return 0 if allowed, else seconds to wait."""
+    by_ip, by_email = get_login_limiters()
+    retry_after = by_ip.take(f'ip:{ip}')
+    if retry_after:
+        return retry_after
+        # A blocked IP doesn't also drain the email's bucket, so an attacker can't lock a victim out from one address.
+    return by_email.take(f'email:{email}')
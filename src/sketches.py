@@ -0,0 +1,181 @@
+import hashlib
+# Importing hashlib to hash visitor identifiers and counted values uniformly.
+
+import math
+# Importing math for the small-range (linear counting) correction.
+
+import operator
+# Importing operator to add count-min counters element-wise when merging.
+
+from array import array
+# Importing array to hold count-min counters as compact unsigned 32-bit integers.
+
+import zlib
+# Importing zlib to store sparse sketches compactly.
+
+def hash64(value):
+    """Return a 64-bit hash of a string."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+class HyperLogLog:
+    """Fixed-size estimator of the number of distinct values added to it.
+
+    With 2**12 one-byte registers the standard error is about 1.6%, whatever the number of
+    visitors. Two sketches merge by taking the larger of each pair of registers, so sketches from
+    different workers or time buckets combine into the sketch of their union.
+    """
+
+    PRECISION = 12
+    # Number of hash bits that select a register.
+
+    SIZE = 1 << PRECISION
+    # Number of registers.
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.SIZE)
+
+    def add(self, value):
+        """Add a value (e.g. a hashed visitor identifier)."""
+        h = hash64(value)
+        index = h >> (64 - self.PRECISION)
+        rest = h & ((1 << (64 - self.PRECISION)) - 1)
+        rank = (64 - self.PRECISION) - rest.bit_length() + 1
+        # The position of the first 1-bit in the remaining bits; long runs of zeros signal many distinct values.
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        """Return the estimated number of distinct values added."""
+        m = self.SIZE
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+            # Few values: counting empty registers is more accurate than the harmonic mean.
+
+        return round(estimate)
+
+    def to_bytes(self):
+        """Serialize the registers; a link with few visitors compresses to a few dozen bytes."""
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a sketch written by `to_bytes`, or an empty one for None."""
+        return cls(zlib.decompress(data)) if data else cls()
+
+class CountMinSketch:
+    """Approximate per-value counts in fixed space.
+
+    Each value increments one counter in each of `DEPTH` rows. Its estimate is the smallest of those
+    counters, which never undercounts and, with 272 columns and 5 rows, overcounts by more than 1% of
+    the total only with probability under 1%. Sketches of the same shape merge by adding counters.
+    """
+
+    WIDTH = 272
+    # Counters per row; the error bound is e / WIDTH of the total count.
+
+    DEPTH = 5
+    # Rows; the probability of exceeding the bound is e ** -DEPTH.
+
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else array('I', bytes(4 * self.WIDTH * self.DEPTH))
+
+    def cells(self, value):
+        """Return the counter index of `value` in each row."""
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [row * self.WIDTH + (h1 + row * h2) % self.WIDTH for row in range(self.DEPTH)]
+        # Deriving every row's hash from one digest (double hashing).
+
+    def add(self, value, count=1):
+        for cell in self.cells(value):
+            self.counts[cell] += count
+
+    def estimate(self, value):
+        return min(self.counts[cell] for cell in self.cells(value))
+
+    def merge(self, other):
+        self.counts = array('I', map(operator.add, self.counts, other.counts))
+        return self
+
+    def to_bytes(self):
+        return zlib.compress(self.counts.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        counts = array('I')
+        counts.frombytes(zlib.decompress(data))
+        return cls(counts)
+
+class HeavyHitters:
+    """The most frequent values seen, tracked with a count-min sketch and a short candidate list.
+
+    Every added value joins the candidates, which are then trimmed back to the `SIZE` values with
+    the highest estimates, so memory stays bounded however many distinct values arrive.
+    """
+
+    SIZE = 10
+    # Number of values kept as candidates for the top list.
+
+    def __init__(self, sketch=None, candidates=()):
+        self.sketch = sketch or CountMinSketch()
+        self.candidates = set(candidates)
+
+    def trim(self):
+        if len(self.candidates) > self.SIZE:
+            self.candidates = set(sorted(self.candidates, key=lambda value: (-self.sketch.estimate(value), value))[:self.SIZE])
+
+    def add(self, value, count=1):
+        self.sketch.add(value, count)
+        self.candidates.add(value)
+        self.trim()
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.candidates |= other.candidates
+        self.trim()
+        # Merged estimates decide which candidates of either side survive.
+        return self
+
+    def top(self, limit=SIZE):
+        """Return up to `limit` `(value, estimated count)` pairs, most frequent first."""
+        return sorted(((value, self.sketch.estimate(value)) for value in self.candidates), key=lambda item: (-item[1], item[0]))[:limit]
+
+class BloomFilter:
+    """A set membership test with no false negatives and a bounded false positive rate.
+
+    Sized for `capacity` members at `error_rate`; it answers "definitely not a member" for most
+    non-members from a few bit probes, so the caller only consults the authoritative store on a hit.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+        # Double hashing, as in `CountMinSketch.cells`.
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
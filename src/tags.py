@@ -0,0 +1,177 @@
+from collections import Counter
+# Importing Counter to accumulate per-tag counter adjustments.
+
+from sqlalchemy import select, insert, update, delete, exists, bindparam, false
+# Importing SQLAlchemy Core constructs for set-based tag maintenance and filtering.
+
+from src.database import Bookmark, Tag, bookmark_tag, db
+# Importing the models and the association table that make up the tag inverted index.
+
+MAX_TAG_LENGTH = 64
+# Longest tag name accepted, matching the `Tag.name` column.
+
+MAX_TAGS_PER_BOOKMARK = 20
+# Most tags a single bookmark may carry.
+
+def parse_tags(value):
+    """Normalize tag names from a request (a list, or a comma-separated string), raising ValueError if malformed."""
+    if isinstance(value, str):
+        value = value.split(',')
+
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError("'tags' must be a list of strings")
+
+    names = []
+    for name in value:
+        name = name.strip().lower()
+        # Tags are case-insensitive and stored lowercase.
+
+        if not name or name in names:
+            continue
+        if len(name) > MAX_TAG_LENGTH:
+            raise ValueError(f'Tags must be at most {MAX_TAG_LENGTH} characters long')
+        names.append(name)
+
+    if len(names) > MAX_TAGS_PER_BOOKMARK:
+        raise ValueError(f'A bookmark may have at most {MAX_TAGS_PER_BOOKMARK} tags')
+
+    return names
+
+def resolve_tags(user_id, names):
+    """Return `{name: (id, bookmark_count)}` for the user's existing tags among `names`."""
+    if not names:
+        return {}
+    rows = db.session.execute(
+        select(Tag.name, Tag.id, Tag.bookmark_count).where(Tag.user_id == user_id, Tag.name.in_(names))
+    )
+    return {name: (tag_id, count) for name, tag_id, count in rows}
+
+def ensure_tags(user_id, names):
+    """Return `{name: id}` for `names`, creating the tags the user doesn't have yet in one executemany."""
+    tag_ids = {name: tag_id for name, (tag_id, _) in resolve_tags(user_id, names).items()}
+
+    missing = [name for name in names if name not in tag_ids]
+    if missing:
+        db.session.execute(
+            insert(Tag.__table__),
+            [{'user_id': user_id, 'name': name, 'bookmark_count': 0} for name in missing],
+        )
+        tag_ids.update({name: tag_id for name, (tag_id, _) in resolve_tags(user_id, missing).items()})
+
+    return tag_ids
+
+def adjust_counts(deltas):
+    """Apply per-tag `bookmark_count` changes with a single executemany UPDATE."""
+    rows = [{'tag_id': tag_id, 'delta': delta} for tag_id, delta in deltas.items() if delta]
+    if rows:
+        db.session.execute(
+            update(Tag.__table__)
+            .where(Tag.__table__.c.id == bindparam('tag_id'))
+            .values(bookmark_count=Tag.__table__.c.bookmark_count + bindparam('delta')),
+            rows,
+        )
+
+def set_tags(user_id, tags_by_bookmark):
+    """Replace the tags of several bookmarks at once, given `{bookmark_id: [names]}`, keeping counters in step."""
+    if not tags_by_bookmark:
+        return
+
+    tag_ids = ensure_tags(user_id, sorted({name for names in tags_by_bookmark.values() for name in names}))
+
+    current = set(db.session.execute(
+        select(bookmark_tag.c.tag_id, bookmark_tag.c.bookmark_id)
+        .where(bookmark_tag.c.bookmark_id.in_(list(tags_by_bookmark)))
+    ).all())
+    wanted = {
+        (tag_ids[name], bookmark_id)
+        for bookmark_id, names in tags_by_bookmark.items()
+        for name in names
+    }
+    # Diffing the postings so only links that actually change are written.
+
+    added = wanted - current
+    removed = current - wanted
+
+    if added:
+        db.session.execute(insert(bookmark_tag), [{'tag_id': t, 'bookmark_id': b} for t, b in added])
+    if removed:
+        db.session.execute(
+            delete(bookmark_tag).where(
+                bookmark_tag.c.tag_id == bindparam('t'),
+                bookmark_tag.c.bookmark_id == bindparam('b'),
+            ),
+            [{'t': t, 'b': b} for t, b in removed],
+        )
+
+    deltas = Counter(tag_id for tag_id, _ in added)
+    deltas.subtract(tag_id for tag_id, _ in removed)
+    adjust_counts(deltas)
+
+def release_tags(bookmark_ids):
+    """Remove all tag links of bookmarks that are about to be deleted and decrement their counters."""
+    if not bookmark_ids:
+        return
+
+    deltas = Counter()
+    for tag_id, count in db.session.execute(
+        select(bookmark_tag.c.tag_id, db.func.count())
+        .where(bookmark_tag.c.bookmark_id.in_(bookmark_ids))
+        .group_by(bookmark_tag.c.tag_id)
+    ):
+        deltas[tag_id] -= count
+
+    db.session.execute(delete(bookmark_tag).where(bookmark_tag.c.bookmark_id.in_(bookmark_ids)))
+    adjust_counts(deltas)
+
+def tags_for_bookmarks(bookmark_ids):
+    """Return `{bookmark_id: [names]}` for a page of bookmarks with one query over the reverse index."""
+    tags = {bookmark_id: [] for bookmark_id in bookmark_ids}
+    if bookmark_ids:
+        for bookmark_id, name in db.session.execute(
+            select(bookmark_tag.c.bookmark_id, Tag.name)
+            .join(Tag, Tag.id == bookmark_tag.c.tag_id)
+            .where(bookmark_tag.c.bookmark_id.in_(bookmark_ids))
+            .order_by(Tag.name)
+        ):
+            tags[bookmark_id].append(name)
+    return tags
+
+def has_tag(tag_id):
+    """Condition true when the bookmark being selected carries `tag_id`: one probe into that posting list."""
+    return exists().where(bookmark_tag.c.tag_id == tag_id, bookmark_tag.c.bookmark_id == Bookmark.id)
+
+def all_tags_filter(user_id, names):
+    """Condition matching bookmarks that carry every tag in `names`."""
+    tags = resolve_tags(user_id, names)
+    if not tags or len(tags) < len(names):
+        return false()
+        # A tag the user doesn't have can't be on any of their bookmarks; with no names at all
+        # there is no posting list to drive from, so nothing matches either.
+
+    by_frequency = sorted(tags.values(), key=lambda tag: tag[1])
+    rarest, others = by_frequency[0], by_frequency[1:]
+    # The maintained counters tell us which posting list is shortest. Candidates come from that
+    # list and are probed into the longer ones, so the intersection costs roughly
+    # |rarest| * log(|other|) index steps, like a galloping merge, not the sum of all list lengths.
+
+    condition = Bookmark.id.in_(select(bookmark_tag.c.bookmark_id).where(bookmark_tag.c.tag_id == rarest[0]))
+    for tag_id, _ in others:
+        condition = condition & has_tag(tag_id)
+    return condition
+
+def any_tags_filter(user_id, names):
+    """Condition matching bookmarks that carry at least one tag in `names`."""
+    tag_ids = [tag_id for tag_id, _ in resolve_tags(user_id, names).values()]
+    if not tag_ids:
+        return false()
+    return Bookmark.id.in_(select(bookmark_tag.c.bookmark_id).where(bookmark_tag.c.tag_id.in_(tag_ids)))
+    # The union of the posting lists, each read straight from the primary key index.
+
+def tag_counts(user_id):
+    """Return the user's tags with their maintained bookmark counts, most used first."""
+    rows = db.session.execute(
+        select(Tag.name, Tag.bookmark_count)
+        .where(Tag.user_id == user_id, Tag.bookmark_count > 0)
+        .order_by(Tag.bookmark_count.desc(), Tag.name)
+    )
+    return [{'name': name, 'count': count} for name, count in rows]
@@ -0,0 +1,253 @@
+import hashlib
+# Importing hashlib to key cached claims by a digest of the token instead of the token itself.
+
+import time
+# Importing time to expire cached claims no later than the token does.
+
+import uuid
+# Importing uuid to choose refresh token ids before the tokens are encoded.
+
+from datetime import datetime
+# Importing datetime to record and compare token expiry times in the blocklist.
+
+from threading import Lock, Thread
+# Importing Lock so only one request rebuilds the revocation filter at a time, and Thread to sweep
+# expired records in the background.
+
+from flask import current_app
+# Importing current_app to read the cache size from the application config.
+
+from flask_jwt_extended import JWTManager, create_refresh_token
+# Importing JWTManager, whose token decoding this module extends, and the refresh token factory.
+
+from sqlalchemy import select, delete, update
+# Importing SQLAlchemy Core constructs to read and prune the blocklist.
+
+from src.cache import VersionedLRUCache
+# Importing the bounded LRU cache used for verified claims.
+
+from src.database import RefreshToken, RevokedToken, db
+# Importing the blocklist model and the database instance.
+
+from src.sketches import BloomFilter
+# Importing the Bloom filter that lets most requests skip the blocklist lookup.
+
+class CachingJWTManager(JWTManager):
+    """A JWTManager that remembers the claims of tokens it has already verified.
+
+    Clients reuse one access token for many requests, so after the first successful decode the
+    signature check and claim validation are replaced by a digest and a dictionary lookup. Entries
+    are only ever created from a successful verification and expire at the token's `exp`, so a
+    cached token is never accepted after it would have been rejected.
+    """
+
+    def __init__(self, app=None, add_context_processor=False):
+        self.verified = None
+        super().__init__(app, add_context_processor)
+        self.token_in_blocklist_loader(is_token_revoked)
+        # Revocation is checked after decoding, so cached tokens are checked too.
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            # Cookie CSRF checks and expired-token decoding are rare; they always take the full path.
+
+        if self.verified is None:
+            self.verified = VersionedLRUCache(current_app.config['JWT_DECODE_CACHE_MAX_ENTRIES'])
+
+        key = hashlib.sha256(encoded_token.encode()).digest()
+        cached = self.verified.get(key, 0)
+        if cached is not None:
+            expires, claims = cached
+            if expires is None or time.time() < expires:
+                return dict(claims)
+                # A copy, so a caller editing the claims can't change what later requests see.
+            self.verified.invalidate(key)
+
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        self.verified.put(key, 0, (claims.get('exp'), dict(claims)))
+        return claims
+
+class RevocationFilter:
+    """A Bloom filter of the revoked, unexpired token ids, rebuilt from the blocklist table periodically."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.bloom = None
+        self.built_at = float('-inf')
+        # Never built, so the first check rebuilds it however recently the machine booted;
+        # `time.monotonic()` can start near zero, which a `built_at` of 0 would count as fresh.
+
+def get_revocation_filter():
+    """Return the application's revocation filter, rebuilding it when it is older than the refresh interval."""
+    revocations = current_app.extensions.get('revocations')
+    if revocations is None:
+        revocations = current_app.extensions.setdefault('revocations', RevocationFilter())
+
+    if time.monotonic() - revocations.built_at >= current_app.config['REVOCATION_FILTER_REFRESH']:
+        with revocations.lock:
+            if time.monotonic() - revocations.built_at >= current_app.config['REVOCATION_FILTER_REFRESH']:
+                rebuild_revocations(revocations)
+                # Checked again under the lock, so concurrent requests rebuild it once.
+    return revocations
+
+def rebuild_revocations(revocations):
+    """Rebuild the filter from the blocklist rows of tokens that haven't expired yet."""
+    jtis = db.session.execute(select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.now())).scalars().all()
+    # Expired tokens are rejected by their signature check anyway, so they needn't be in the filter.
+    # Only a read: the rows themselves are pruned by the sweeper, off the request's read path.
+
+    bloom = BloomFilter(max(2 * len(jtis), 1024))
+    for jti in jtis:
+        bloom.add(jti)
+    # Sized with headroom for the tokens revoked before the next rebuild.
+
+    revocations.bloom = bloom
+    revocations.built_at = time.monotonic()
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """Blocklist hook: a Bloom filter miss (the common case) answers without touching the database."""
+    jti = jwt_payload.get('jti')
+    if jti is None or jti not in get_revocation_filter().bloom:
+        return False
+    return db.session.execute(
+        select(RevokedToken.jti).where(RevokedToken.jti == jti, RevokedToken.expires_at > datetime.now())
+    ).first() is not None
+    # A filter hit may be a false positive (about 1%), so the table has the final word.
+
+def revoke_token(jwt_payload):
+    """Add a decoded token to the blocklist until it expires."""
+    expires_at = datetime.fromtimestamp(jwt_payload['exp']) if 'exp' in jwt_payload else datetime.max
+    db.session.merge(RevokedToken(jti=jwt_payload['jti'], expires_at=expires_at))
+    if jwt_payload.get('type') == 'refresh':
+        record = db.session.get(RefreshToken, refresh_token_hash(jwt_payload['jti']))
+        if record is not None:
+            revoke_refresh_family(record.family)
+            # The family is keyed by its first token, so a rotated token has to be looked up to find
+            # it. Its predecessors and successors go too, so logging out ends the whole session.
+    db.session.commit()
+    get_revocation_filter().bloom.add(jwt_payload['jti'])
+    # This process sees the revocation at once; other workers pick it up at their next rebuild.
+
+def refresh_token_hash(jti):
+    """Return the 16-byte key a refresh token is stored under."""
+    return hashlib.sha256(jti.encode()).digest()[:16]
+
+def issue_refresh_token(identity, family=None):
+    """Create a refresh token and record it, in `family` or as the first token of a new one.
+
+    The caller commits, so the record and whatever else the request changes are saved together.
+    """
+    jti = str(uuid.uuid4())
+    token_hash = refresh_token_hash(jti)
+    expires = current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    expires_at = datetime.now() + expires if expires else datetime.max
+    # Taken before encoding, so the record never outlives the token.
+
+    db.session.add(RefreshToken(token_hash=token_hash, family=family or token_hash, expires_at=expires_at))
+    start_token_sweeper()
+    # Records are written from here on, so this process prunes the expired ones.
+    return create_refresh_token(identity=identity, additional_claims={'jti': jti})
+    # The chosen jti replaces the generated one, so the token needn't be decoded to be recorded.
+
+def rotate_refresh_token(jwt_payload):
+    """Exchange a verified refresh token for its successor; return None if it was unknown or already used.
+
+    A used token presented again was copied by someone, and there is no telling which copy is the
+    legitimate one, so its whole family is revoked and every holder has to log in again.
+    """
+    token_hash = refresh_token_hash(jwt_payload['jti'])
+    record = db.session.get(RefreshToken, token_hash)
+    if record is None:
+        return None
+        # Revoked, pruned after expiry, or issued before tokens were recorded.
+
+    claimed = db.session.execute(
+        update(RefreshToken).where(RefreshToken.token_hash == token_hash, RefreshToken.used.is_(False)).values(used=True)
+    ).rowcount
+    # Marking it used only if it wasn't already, so of two concurrent exchanges exactly one wins.
+
+    if not claimed:
+        revoke_refresh_family(record.family)
+        db.session.commit()
+        return None
+
+    return issue_refresh_token(jwt_payload['sub'], record.family)
+
+def revoke_refresh_family(family):
+    """Delete every refresh token record of a family; the caller commits."""
+    db.session.execute(delete(RefreshToken).where(RefreshToken.family == family))
+
+def sweep_expired(model, key, batch_size, max_batches=None):
+    """Delete rows of `model` whose `expires_at` has passed in batches of `batch_size`, keyed by the `key` column; return how many were deleted.
+
+    Short batches keep each transaction, and the locks it holds, small while a large backlog drains.
+    """
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = select(key).where(model.expires_at <= datetime.now()).order_by(model.expires_at).limit(batch_size)
+        keys = db.session.execute(expired).scalars().all()
+        # Read through the expires_at index, oldest first.
+        if keys:
+            db.session.execute(delete(model).where(key.in_(keys)))
+        db.session.commit()
+        deleted += len(keys)
+        batches += 1
+        if len(keys) < batch_size:
+            break
+    return deleted
+
+def sweep_refresh_tokens(batch_size, max_batches=None):
+    """Delete expired refresh token records in batches; return how many were deleted."""
+    return sweep_expired(RefreshToken, RefreshToken.token_hash, batch_size, max_batches)
+
+def sweep_revoked_tokens(batch_size, max_batches=None):
+    """Delete blocklist rows of tokens that have expired anyway, in batches; return how many were deleted."""
+    return sweep_expired(RevokedToken, RevokedToken.jti, batch_size, max_batches)
+
+class TokenSweeper:
+    """Deletes expired refresh token records and blocklist entries in the background.
+
+    Every `interval` seconds one batch of each table is pruned, so the tables stay small without a
+    request ever waiting for the sweep; `flask auth sweep-refresh-tokens` drains a larger backlog.
+    """
+
+    def __init__(self, app, interval, batch_size):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.thread = Thread(target=self.run, name='token-sweeper', daemon=True)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sweep()
+
+    def sweep(self):
+        """Delete one batch of expired records from each token table, from outside any request."""
+        with self.app.app_context():
+            try:
+                sweep_refresh_tokens(self.batch_size, max_batches=1)
+                sweep_revoked_tokens(self.batch_size, max_batches=1)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('Sweeping expired tokens failed; retrying at the next interval')
+                # Expired records are rejected by their signature anyway, so a missed sweep only delays the pruning.
+
+SWEEPER_LOCK = Lock()
+# Held while the first refresh token issued in a process starts its sweeper.
+
+def start_token_sweeper():
+    """Start the application's token sweeper thread, once per process."""
+    if 'token_sweeper' in current_app.extensions:
+        return
+    with SWEEPER_LOCK:
+        if 'token_sweeper' not in current_app.extensions:
+            sweeper = current_app.extensions['token_sweeper'] = TokenSweeper(
+                current_app._get_current_object(),
+                current_app.config['REFRESH_TOKEN_SWEEP_INTERVAL'],
+                current_app.config['REFRESH_TOKEN_SWEEP_BATCH'],
+            )
+            sweeper.thread.start()
+            # Started with the first refresh token rather than with the app, so every forked worker runs its own.
\ No newline at end of file
@@ -0,0 +1,156 @@
+import csv
+# Importing csv to stream CSV user files row by row.
+
+import json
+# Importing json to parse NDJSON user files line by line.
+
+import os
+# Importing os to count the cores and to replace the checkpoint file atomically.
+
+import re
+# Importing re to recognise pre-hashed passwords in werkzeug's format.
+
+from concurrent.futures import ProcessPoolExecutor
+# Importing a process pool so passwords are hashed on every core at once.
+
+from itertools import islice
+# Importing islice to cut the record stream into batches.
+
+import click
+# Importing click to define the command's arguments and options.
+
+from flask.cli import AppGroup
+# Importing AppGroup for the `flask users` command group.
+
+from werkzeug.security import generate_password_hash
+# Importing werkzeug's hashing function, which runs in the pool's processes.
+
+from src.auth import registration_error
+# Importing the registration rules, so imported users are held to the same ones.
+
+from src.database import User, db, upsert
+# Importing the User model, the database instance and the dialect-aware INSERT, whose `on_conflict_do_nothing` skips existing users.
+
+from src.passwords import hash_method
+# Importing the configured hashing method, so imported hashes match those made at registration.
+
+users_cli = AppGroup('users', help='Manage user accounts.')
+# The `flask users` command group, registered on the app in `create_app`.
+
+HASHED_PASSWORD = re.compile(r'^(scrypt:\d+:\d+:\d+|pbkdf2:[a-z0-9]+:\d+)\$[^$]+\$[0-9a-f]+$')
+# Hashes werkzeug can verify: `method$salt$hex digest` with every parameter spelled out, as werkzeug writes them.
+
+def read_records(path, file_format):
+    """Yield the users in a CSV (with a header row) or NDJSON file one at a time, never loading the whole file."""
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield line
+                        # Passed on as-is, so the malformed line is reported and skipped like any invalid record.
+
+def prepare(record):
+    """Return `(username, email, password, password_hash)` for a valid record, or raise ValueError with the reason."""
+    if not isinstance(record, dict):
+        raise ValueError('Record is not a JSON object')
+        # A malformed NDJSON line, or one holding a list or a bare value.
+
+    for field in ('username', 'email', 'password', 'password_hash'):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            raise ValueError(f'{field} must be a string')
+            # e.g. a number or a list in an NDJSON record; reported like any other invalid record.
+
+    username = (record.get('username') or '').strip()
+    email = (record.get('email') or '').strip()
+    password_hash = record.get('password_hash') or None
+    password = record.get('password') or None
+
+    if password_hash is not None and not HASHED_PASSWORD.match(password_hash):
+        raise ValueError('password_hash is not in a supported format')
+
+    error = registration_error(username, email, password_hash or password, password_hashed=password_hash is not None)
+    if error:
+        raise ValueError(error)
+    return username, email, password, password_hash
+
+def read_checkpoint(path):
+    """Return how many records a previous run finished, or 0."""
+    try:
+        with open(path) as file:
+            return int(file.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+def write_checkpoint(path, done):
+    """Record that the first `done` records are finished; written to a temporary file and renamed, so it is never half-written."""
+    with open(f'{path}.tmp', 'w') as file:
+        file.write(str(done))
+    os.replace(f'{path}.tmp', path)
+
+@users_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), help='File format; by default taken from the extension (.csv, otherwise NDJSON).')
+@click.option('--batch-size', default=1000, show_default=True, help='Users inserted per transaction.')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Processes hashing passwords.')
+@click.option('--checkpoint', 'checkpoint_path', help='Progress file for resuming an interrupted import; defaults to PATH.checkpoint.')
+def import_users_command(path, file_format, batch_size, workers, checkpoint_path):
+    """Create users from a CSV or NDJSON file of username, email and password (or password_hash).
+
+    Records are streamed in batches: each batch's plain passwords are hashed in parallel, then the
+    batch is inserted in one transaction and the checkpoint advances. Rerunning after an interruption
+    resumes after the last committed batch. Users whose username or email is taken are skipped.
+    """
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    checkpoint_path = checkpoint_path or f'{path}.checkpoint'
+    method = hash_method()
+
+    done = read_checkpoint(checkpoint_path)
+    records = islice(read_records(path, file_format), done, None)
+    if done:
+        click.echo(f'Resuming after {done} records.')
+
+    imported = skipped = invalid = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            users = []
+            for number, record in enumerate(batch, start=done + 1):
+                try:
+                    users.append(prepare(record))
+                except ValueError as e:
+                    invalid += 1
+                    click.echo(f'Record {number}: {e}', err=True)
+
+            plain = [password for _, _, password, password_hash in users if password_hash is None]
+            hashes = iter(pool.map(generate_password_hash, plain, [method] * len(plain), chunksize=max(1, len(plain) // (workers * 4))))
+            # Chunks of a few hashes per task keep every core busy without a round-trip per password.
+
+            rows = [
+                {'username': username, 'email': email, 'password': password_hash or next(hashes)}
+                for username, email, _, password_hash in users
+            ]
+            if rows:
+                result = db.session.execute(upsert(User).on_conflict_do_nothing().returning(User.id), rows)
+                created = len(result.all())
+                imported += created
+                skipped += len(rows) - created
+                # Existing users are left untouched, so a batch replayed after a crash inserts nothing twice.
+            db.session.commit()
+
+            done += len(batch)
+            write_checkpoint(checkpoint_path, done)
+            # Advanced only after the commit, so a resumed run never skips uncommitted records.
+            click.echo(f'{done} records processed...')
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+        # Finished; a later run of the same file starts over (and skips the users it already created).
+    click.echo(f'Imported {imported} users; skipped {skipped} existing and {invalid} invalid records.')
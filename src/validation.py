@@ -0,0 +1,61 @@
+import validators
+# Importing the validators package, whose email and URL rules stay the single definition of validity.
+
+from flask import current_app
+# Importing current_app to keep one result cache per application.
+
+from src.cache import VersionedLRUCache
+# Importing the bounded LRU cache used to memoize results.
+
+MAX_CACHED_LENGTH = 2048
+# Longer inputs are checked every time; they are rare and would let a few requests fill the cache's memory.
+
+def get_validation_cache():
+    """Return the application's cache of recent validation results, keyed by `(kind, value)`."""
+    cache = current_app.extensions.get('validation_cache')
+    if cache is None:
+        cache = current_app.extensions['validation_cache'] = VersionedLRUCache(current_app.config['VALIDATION_CACHE_MAX_ENTRIES'])
+    return cache
+
+def check(kind, validator, value):
+    """Return whether `validator` accepts `value`, from the cache when the same value was checked recently."""
+    if not isinstance(value, str):
+        return False
+        # Never valid (e.g. a number in a JSON body). `validators.email` raises AttributeError for
+        # some of these rather than rejecting them, which would turn a bad request into a 500.
+
+    if len(value) > MAX_CACHED_LENGTH:
+        return bool(validator(value))
+
+    cache = get_validation_cache()
+    valid = cache.get((kind, value), 0)
+    if valid is None:
+        valid = bool(validator(value))
+        cache.put((kind, value), 0, valid)
+        # Validity never changes for a given string, so entries need no version and only age out.
+    return valid
+
+def is_valid_email(value):
+    """Tell whether `value` is an email address `validators.email` accepts."""
+    return check('email', validators.email, value)
+
+def is_valid_url(value):
+    """Tell whether `value` is a URL `validators.url` accepts."""
+    return check('url', validators.url, value)
+
+def valid_urls(values):
+    """Validate many URLs at once; return a list of booleans in the order of `values`.
+
+    Each distinct URL is checked once however often it repeats, which suits bulk imports where
+    the same links recur.
+    """
+    seen = {}
+    results = []
+    for value in values:
+        if not isinstance(value, str):
+            results.append(False)
+            continue
+        if value not in seen:
+            seen[value] = is_valid_url(value)
+        results.append(seen[value])
+    return results
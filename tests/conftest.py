@@ -0,0 +1,54 @@
+import pytest
+
+from src import create_app
+from src.database import db
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SECRET_KEY': 'test',
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'JWT_SECRET_KEY': 'test-jwt-secret-key-that-is-long-enough',
+    'PASSWORD_HASH_WORKERS': 0,
+    'PASSWORD_HASH_PRESET': 'test',
+    'VISIT_FLUSH_INTERVAL': 3600,
+    'REFRESH_TOKEN_SWEEP_INTERVAL': 3600,
+}
+# Hashing inline with the weak test preset keeps each registration and login to a millisecond.
+# The in-memory database is one connection shared by every thread, so the background visit flush
+# and token sweep are kept out of the way; tests that need them use a database file.
+
+@pytest.fixture
+def make_app():
+    """Build an app with the test configuration plus overrides, creating its tables unless told not to."""
+    def make(create_tables=True, **config):
+        app = create_app({**TEST_CONFIG, **config})
+        if create_tables:
+            with app.app_context():
+                db.create_all()
+        return app
+    return make
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def register(client, username='alice', email='alice@example.com', password='secret1'):
+    return client.post('/api/v1/auth/register', json={'username': username, 'email': email, 'password': password})
+
+def login(client, email='alice@example.com', password='secret1'):
+    return client.post('/api/v1/auth/login', json={'email': email, 'password': password})
+
+@pytest.fixture
+def tokens(client):
+    """Register and log in a user; return the login response's tokens."""
+    assert register(client).status_code == 201
+    return login(client).json['user']
+
+@pytest.fixture
+def headers(tokens):
+    return {'Authorization': f"Bearer {tokens['access']}"}
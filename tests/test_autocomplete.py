@@ -0,0 +1,41 @@
+from src.autocomplete import PrefixIndex
+
+ROWS = [
+    (1, 'https://docs.python.org/3/library/', 'a'),
+    (2, 'https://www.python.org/downloads/', 'b'),
+    (3, 'http://pypi.org/project/flask/', 'c'),
+    (4, 'https://example.com:8080/python', 'd'),
+]
+
+def test_prefix_matches_urls_and_parent_domains():
+    index = PrefixIndex(ROWS)
+    result = index.complete('python', 10)
+    assert [item['id'] for item in result['urls']] == [1, 2]
+    # docs.python.org matches through its parent domain, and www.python.org once 'www.' is dropped.
+    assert result['domains'] == ['python.org']
+
+    assert [item['id'] for item in index.complete('https://www.DOCS.python', 10)['urls']] == [1]
+    assert [item['id'] for item in index.complete('example.com/py', 10)['urls']] == [4]
+    # The port is dropped from the host, so the path follows the domain directly.
+    assert index.complete('nothing', 10) == {'urls': [], 'domains': []}
+
+def test_limit_caps_urls_and_domains_separately():
+    index = PrefixIndex([(i, f'https://site{i}.example.com/', str(i)) for i in range(10)])
+    result = index.complete('site', 3)
+    assert [item['id'] for item in result['urls']] == [0, 1, 2]
+    assert result['domains'] == ['site0.example.com', 'site1.example.com', 'site2.example.com']
+
+def test_index_is_rebuilt_when_content_version_changes(app, client, headers):
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://python.org/a'})
+    assert len(client.get('/api/v1/bookmarks/autocomplete?q=python', headers=headers).json['urls']) == 1
+    index = app.extensions['autocomplete'].get(1, 1)
+
+    short_url = client.get('/api/v1/bookmarks/', headers=headers).json['data'][0]['short_url']
+    client.get(f'/{short_url}')
+    client.get('/api/v1/bookmarks/autocomplete?q=python', headers=headers)
+    assert app.extensions['autocomplete'].get(1, 1) is index
+    # A visit only moves the data version, so the index built for this content is kept.
+
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://python.org/b'})
+    urls = client.get('/api/v1/bookmarks/autocomplete?q=python', headers=headers).json['urls']
+    assert [item['url'] for item in urls] == ['https://python.org/a', 'https://python.org/b']
@@ -0,0 +1,41 @@
+def batch(client, headers, operations):
+    response = client.post('/api/v1/bookmarks/batch', headers=headers, json=operations)
+    assert response.status_code == 200
+    return response.json['results']
+
+def visit(client, short_url, times):
+    for _ in range(times):
+        client.get(f'/{short_url}')
+
+def test_batch_update_refreshes_the_leaderboard(client, headers):
+    created = batch(client, headers, [{'op': 'create', 'url': 'https://example.com/old', 'public': True}])[0]
+    visit(client, created['short_url'], 2)
+    assert client.get('/api/v1/leaderboard/').json['data'][0]['url'] == 'https://example.com/old'
+
+    batch(client, headers, [{'op': 'update', 'id': created['id'], 'url': 'https://example.com/new'}])
+    assert [entry['url'] for entry in client.get('/api/v1/leaderboard/').json['data']] == ['https://example.com/new']
+
+def test_batch_update_sets_public(client, headers):
+    created = batch(client, headers, [{'op': 'create', 'url': 'https://example.com/a'}])[0]
+    visit(client, created['short_url'], 1)
+    assert client.get('/api/v1/leaderboard/').json['data'] == []
+
+    batch(client, headers, [{'op': 'update', 'id': created['id'], 'url': 'https://example.com/a', 'public': True}])
+    assert client.get(f"/api/v1/bookmarks/{created['id']}", headers=headers).json['public'] is True
+    assert [entry['id'] for entry in client.get('/api/v1/leaderboard/').json['data']] == [created['id']]
+
+    batch(client, headers, [{'op': 'update', 'id': created['id'], 'url': 'https://example.com/a', 'public': False}])
+    assert client.get('/api/v1/leaderboard/').json['data'] == []
+
+def test_wrongly_typed_fields_fail_only_their_operation(client, headers):
+    created = batch(client, headers, [{'op': 'create', 'url': 'https://example.com/a'}])[0]
+    results = batch(client, headers, [
+        {'op': 'create', 'url': 'https://example.com/b', 'body': {'a': 1}},
+        {'op': 'create', 'url': 'https://example.com/c', 'folder_id': [1]},
+        {'op': 'update', 'id': created['id'], 'url': 'https://example.com/a', 'folder_id': [1]},
+        {'op': 'update', 'id': created['id'], 'url': 'https://example.com/a', 'body': 5},
+        {'op': 'create', 'url': 'https://example.com/d'},
+    ])
+    assert [result['status'] for result in results] == [400, 400, 400, 400, 201]
+    assert results[0]['error'] == "'body' must be a string"
+    assert results[1]['error'] == "'folder_id' must be an integer or null"
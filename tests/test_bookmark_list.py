@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import event
+
+from src.database import db
+
+@pytest.fixture
+def bookmarks(client, headers):
+    for i in range(6):
+        response = client.post('/api/v1/bookmarks/', headers=headers, json={'url': f'https://example{i % 2}.com/{i}'})
+        assert response.status_code == 201
+
+@pytest.fixture
+def list_plan(app, client, headers, bookmarks):
+    """Request the bookmark list and return the response with the query plan of its page query."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT bookmark.') and 'LIMIT' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+
+    def get(query):
+        statements.clear()
+        response = client.get(f'/api/v1/bookmarks/?{query}', headers=headers)
+        with app.app_context():
+            plan = [
+                row[-1]
+                for statement, parameters in statements
+                for row in db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            ]
+        return response, plan
+    return get
+
+@pytest.mark.parametrize('query, index', [
+    ('', 'ix_bookmark_user_id'),
+    ('sort=visits', 'ix_bookmark_user_visits'),
+    ('sort=-visits', 'ix_bookmark_user_visits'),
+    ('sort=-created_at', 'ix_bookmark_user_created_at'),
+    ('sort=url', 'ix_bookmark_user_url'),
+    ('min_visits=0&sort=-visits', 'ix_bookmark_user_visits'),
+    ('min_visits=0&max_visits=10', 'ix_bookmark_user_visits'),
+    ('created_after=2000-01-01&sort=-created_at', 'ix_bookmark_user_created_at'),
+    ('created_before=2100-01-01', 'ix_bookmark_user_created_at'),
+    ('domain=example1.com', 'ix_bookmark_user_host'),
+    ('domain=example1.com&sort=-visits', 'ix_bookmark_user_visits'),
+    ('q=example&sort=url', 'ix_bookmark_user_url'),
+])
+def test_list_is_served_in_index_order(list_plan, query, index):
+    response, plan = list_plan(query)
+    assert response.status_code == 200
+    assert any(index in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+@pytest.mark.parametrize('query', [
+    'created_after=2000-01-01&sort=-visits',
+    'min_visits=1&sort=created_at',
+    'max_visits=10&sort=url',
+    'min_visits=1&created_after=2000-01-01',
+    'sort=body',
+])
+def test_unindexed_filter_and_sort_pairs_are_rejected(list_plan, query):
+    response, _ = list_plan(query)
+    assert response.status_code == 400
+
+def test_range_filter_without_sort_is_ordered_by_its_column(client, headers, bookmarks, app):
+    with app.app_context():
+        db.session.execute(db.text('UPDATE bookmark SET visits = 10 - id'))
+        db.session.commit()
+    response = client.get('/api/v1/bookmarks/?min_visits=0&per_page=10', headers=headers)
+    visits = [item['visit'] for item in response.json['data']]
+    assert visits == sorted(visits)
+
+@pytest.mark.parametrize('query', ['sort=--visits', 'min_visits=abc', 'max_visits=1.5&sort=-created_at', 'min_visits=x&sort=url'])
+def test_malformed_sort_and_range_arguments_are_rejected(client, headers, bookmarks, query):
+    response = client.get(f'/api/v1/bookmarks/?{query}', headers=headers)
+    assert response.status_code == 400
+    assert 'error' in response.json
@@ -0,0 +1,40 @@
+import pytest
+
+def create(client, headers):
+    response = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'})
+    assert response.status_code == 201
+    return response.json
+
+@pytest.mark.parametrize('bucket, start, aligned', [
+    ('hour', '2026-03-04T05:06:07', '2026-03-04T05:00:00'),
+    ('day', '2026-03-04T05:06:07', '2026-03-04T00:00:00'),
+    ('week', '2026-03-04T05:06:07', '2026-03-02T00:00:00'),
+])
+def test_clicks_report_the_bucket_aligned_start(client, headers, bucket, start, aligned):
+    bookmark = create(client, headers)
+    response = client.get(
+        f"/api/v1/bookmarks/{bookmark['id']}/clicks", headers=headers,
+        query_string={'bucket': bucket, 'from': start, 'to': '2026-03-05T00:00:00'},
+    )
+    assert response.status_code == 200
+    assert response.json['meta']['from'] == aligned
+    assert response.json['data'][0]['start'] == aligned
+
+def test_clicks_count_redirects(client, headers):
+    bookmark = create(client, headers)
+    for _ in range(3):
+        client.get(f"/{bookmark['short_url']}")
+    response = client.get(f"/api/v1/bookmarks/{bookmark['id']}/clicks", headers=headers, query_string={'bucket': 'hour'})
+    assert response.json['meta']['total'] == 3
+
+def test_implicit_window_is_never_answered_with_304(client, headers):
+    bookmark = create(client, headers)
+    url = f"/api/v1/bookmarks/{bookmark['id']}/clicks"
+    first = client.get(url, headers=headers, query_string={'bucket': 'hour'})
+    assert 'ETag' not in first.headers
+    # The window ends now, so its contents move with the clock even when the version doesn't.
+
+    fixed = {'bucket': 'hour', 'from': '2026-03-04T00:00:00', 'to': '2026-03-05T00:00:00'}
+    tagged = client.get(url, headers=headers, query_string=fixed)
+    again = client.get(url, headers={**headers, 'If-None-Match': tagged.headers['ETag']}, query_string=fixed)
+    assert again.status_code == 304
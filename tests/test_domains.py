@@ -0,0 +1,38 @@
+import shutil
+
+import sqlalchemy as sa
+
+from src.database import Bookmark, DomainStats, User, db
+from tests.test_migrations import SHIPPED_DATABASE, upgraded_app
+
+def test_backfill_domains_bumps_user_versions(app, client, headers):
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://Docs.Python.org/3/'})
+    with app.app_context():
+        db.session.execute(sa.update(Bookmark).values(host=None))
+        db.session.execute(sa.delete(DomainStats))
+        db.session.commit()
+        versions = db.session.execute(sa.select(User.data_version, User.content_version)).one()
+    # As if the bookmark predates the host column.
+
+    etag = client.get('/api/v1/bookmarks/stats', headers=headers).headers['ETag']
+    result = app.test_cli_runner().invoke(args=['bookmarks', 'backfill-domains'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        assert db.session.execute(sa.select(Bookmark.host)).scalar() == 'docs.python.org'
+        after = db.session.execute(sa.select(User.data_version, User.content_version)).one()
+        assert after[0] > versions[0] and after[1] > versions[1]
+
+    response = client.get('/api/v1/bookmarks/stats', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    # The cached stats and their ETag are invalidated, so the new per-domain breakdown is served.
+
+def test_backfill_domains_on_an_upgraded_database(make_app, tmp_path):
+    path = tmp_path / 'bookmarks.db'
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = upgraded_app(make_app, path)
+
+    result = app.test_cli_runner().invoke(args=['bookmarks', 'backfill-domains'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.execute(sa.select(sa.func.count()).where(Bookmark.host.is_(None), Bookmark.url.like('http%'))).scalar() == 0
@@ -0,0 +1,33 @@
+from sqlalchemy import event
+
+from src.database import db
+
+def test_matching_etag_returns_304_without_running_the_view(app, client, headers):
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'})
+    first = client.get('/api/v1/bookmarks/', headers=headers)
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = client.get('/api/v1/bookmarks/', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == first.headers['ETag']
+    assert not any('FROM bookmark' in statement for statement in statements), statements
+    # Only the user's version was read; the listing query never ran.
+
+def test_write_bumps_the_version_and_changes_the_etag(client, headers):
+    first = client.get('/api/v1/bookmarks/', headers=headers)
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'})
+
+    response = client.get('/api/v1/bookmarks/', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+    assert len(response.json['data']) == 1
+
+def test_etag_depends_on_the_query_parameters(client, headers):
+    first = client.get('/api/v1/bookmarks/?per_page=5', headers=headers)
+    second = client.get('/api/v1/bookmarks/?per_page=10', headers=headers)
+    assert first.headers['ETag'] != second.headers['ETag']
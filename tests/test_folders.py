@@ -0,0 +1,104 @@
+import importlib
+
+import pytest
+
+folders_module = importlib.import_module('src.folders')
+# `src.folders` names the blueprint once the package is imported, so the module is fetched by name.
+
+def create(client, headers, name, parent_id=None):
+    response = client.post('/api/v1/folders/', headers=headers, json={'name': name, 'parent_id': parent_id})
+    assert response.status_code == 201
+    return response.json
+
+def bookmark(client, headers, url, folder_id):
+    response = client.post('/api/v1/bookmarks/', headers=headers, json={'url': url, 'folder_id': folder_id})
+    assert response.status_code == 201
+    return response.json['id']
+
+def paths(client, headers):
+    return {folder['name']: folder['path'] for folder in client.get('/api/v1/folders/', headers=headers).json['data']}
+
+def listed(client, headers, query):
+    response = client.get(f'/api/v1/bookmarks/?{query}', headers=headers)
+    assert response.status_code == 200
+    return [item['id'] for item in response.json['data']]
+
+def test_create_nests_paths_under_the_parent(client, headers):
+    root = create(client, headers, 'root')
+    child = create(client, headers, 'child', root['id'])
+    assert root['path'] == f"/{root['id']}/"
+    assert child['path'] == f"/{root['id']}/{child['id']}/"
+    assert list(paths(client, headers)) == ['root', 'child']
+    # Listed depth-first, each folder before its children.
+
+    assert client.post('/api/v1/folders/', headers=headers, json={'name': 'x', 'parent_id': 999}).status_code == 404
+
+@pytest.mark.parametrize('payload', [{'name': 'x', 'parent_id': [1]}, {'name': 'x', 'parent_id': '1'}, {'name': 5}])
+def test_wrongly_typed_fields_are_rejected(client, headers, payload):
+    folder = create(client, headers, 'folder')
+    assert client.post('/api/v1/folders/', headers=headers, json=payload).status_code == 400
+    assert client.patch(f"/api/v1/folders/{folder['id']}", headers=headers, json=payload).status_code == 400
+    assert client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/', 'folder_id': [1]}).status_code == 400
+
+def test_move_rewrites_the_subtree(client, headers):
+    a = create(client, headers, 'a')
+    b = create(client, headers, 'b', a['id'])
+    c = create(client, headers, 'c', b['id'])
+    target = create(client, headers, 'target')
+    inner = bookmark(client, headers, 'https://example.com/inner', c['id'])
+
+    response = client.patch(f"/api/v1/folders/{b['id']}", headers=headers, json={'parent_id': target['id']})
+    assert response.status_code == 200
+    assert response.json['path'] == f"/{target['id']}/{b['id']}/"
+    assert paths(client, headers)['c'] == f"/{target['id']}/{b['id']}/{c['id']}/"
+    assert listed(client, headers, f"folder={target['id']}") == [inner]
+    assert listed(client, headers, f"folder={a['id']}") == []
+
+def test_move_into_own_subtree_is_rejected(client, headers):
+    a = create(client, headers, 'a')
+    b = create(client, headers, 'b', a['id'])
+    for parent_id in (a['id'], b['id']):
+        response = client.patch(f"/api/v1/folders/{a['id']}", headers=headers, json={'parent_id': parent_id})
+        assert response.status_code == 400
+    assert paths(client, headers)['b'] == f"/{a['id']}/{b['id']}/"
+
+def test_move_that_nests_too_deeply_is_rejected(client, headers, monkeypatch):
+    a = create(client, headers, 'a')
+    b = create(client, headers, 'b', a['id'])
+    other = create(client, headers, 'other')
+    monkeypatch.setattr(folders_module, 'MAX_PATH_LENGTH', len(f"/{other['id']}/{a['id']}/{b['id']}/") - 1)
+
+    response = client.patch(f"/api/v1/folders/{a['id']}", headers=headers, json={'parent_id': other['id']})
+    assert response.status_code == 400
+    assert paths(client, headers)['b'] == f"/{a['id']}/{b['id']}/"
+    # The deepest descendant would have outgrown the path column, so nothing was rewritten.
+
+    client.post('/api/v1/folders/', headers=headers, json={'name': 'c', 'parent_id': b['id']})
+    assert 'c' not in paths(client, headers)
+    # Creating a folder below the limit's depth is rejected the same way.
+
+def test_delete_removes_the_subtree_and_unfiles_its_bookmarks(client, headers):
+    a = create(client, headers, 'a')
+    b = create(client, headers, 'b', a['id'])
+    kept = create(client, headers, 'kept')
+    inner = bookmark(client, headers, 'https://example.com/inner', b['id'])
+
+    assert client.delete(f"/api/v1/folders/{a['id']}", headers=headers).status_code == 204
+    assert list(paths(client, headers)) == ['kept']
+    assert client.get(f'/api/v1/bookmarks/{inner}', headers=headers).json['folder_id'] is None
+    assert client.get(f"/api/v1/bookmarks/?folder={kept['id']}", headers=headers).json['data'] == []
+
+def test_folder_listing_covers_the_subtree_unless_not_recursive(client, headers):
+    a = create(client, headers, 'a')
+    b = create(client, headers, 'b', a['id'])
+    top = bookmark(client, headers, 'https://example.com/top', a['id'])
+    nested = [bookmark(client, headers, f'https://example.com/nested/{i}', b['id']) for i in range(3)]
+    bookmark(client, headers, 'https://example.com/unfiled', None)
+
+    assert listed(client, headers, f"folder={a['id']}&per_page=10") == [top] + nested
+    assert listed(client, headers, f"folder={a['id']}&recursive=false") == [top]
+
+    first = client.get(f"/api/v1/bookmarks/?folder={a['id']}&per_page=2", headers=headers).json
+    second = client.get(f"/api/v1/bookmarks/?folder={a['id']}&per_page=2&cursor={first['meta']['next_cursor']}", headers=headers).json
+    assert [item['id'] for item in first['data'] + second['data']] == [top] + nested
+    assert second['meta']['has_next'] is False
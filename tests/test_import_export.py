@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from tests.conftest import login, register
+
+def export(client, headers, export_format='ndjson'):
+    response = client.get(f'/api/v1/bookmarks/export?format={export_format}', headers=headers)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+def saved(client, headers):
+    """Return the user's bookmarks as `(url, body)` pairs in export order."""
+    return [(row['url'], row['body']) for row in map(json.loads, export(client, headers).splitlines())]
+
+@pytest.mark.parametrize('export_format, mimetype', [('ndjson', 'application/x-ndjson'), ('csv', 'text/csv')])
+def test_export_round_trips_through_import(client, headers, export_format, mimetype):
+    for i, body in enumerate(['plain', 'with, a comma', 'with "quotes"\nand a newline', '']):
+        client.post('/api/v1/bookmarks/', headers=headers, json={'url': f'https://example.com/{i}', 'body': body})
+    exported = export(client, headers, export_format)
+
+    register(client, username='bob', email='bob@example.com')
+    other = {'Authorization': f"Bearer {login(client, email='bob@example.com').json['user']['access']}"}
+    response = client.post('/api/v1/bookmarks/import', headers=other, data=exported, content_type=mimetype)
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[-1] == {'done': True, 'processed': 4, 'imported': 4, 'failed': 0}
+
+    assert saved(client, other) == saved(client, headers)
+
+def test_import_reports_non_string_fields_per_line(client, headers):
+    body = '\n'.join([
+        '{"url": "https://example.com/1", "body": {"a": 1}}',
+        '{"url": ["https://example.com/2"]}',
+        '{"url": "https://example.com/3", "body": null}',
+    ])
+    response = client.post('/api/v1/bookmarks/import', headers=headers, data=body, content_type='application/x-ndjson')
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {'line': 1, 'error': "'body' must be a string"} in events
+    assert {'line': 2, 'error': "'url' must be a string"} in events
+    assert events[-1] == {'done': True, 'processed': 3, 'imported': 1, 'failed': 2}
+    assert saved(client, headers) == [('https://example.com/3', '')]
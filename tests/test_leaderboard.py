@@ -0,0 +1,79 @@
+from sqlalchemy import select
+
+from src.database import LeaderboardEntry, db
+from src.leaderboard import TopN, get_leaderboard
+from tests.conftest import register, login
+from tests.test_visits import wait_for
+
+def ranked(board):
+    return [(entry['id'], entry['visits']) for entry in board.ranking()]
+
+def offer(board, bookmark_id, visits):
+    board.offer(bookmark_id, visits, f'https://example.com/{bookmark_id}', f's{bookmark_id}')
+
+def test_ranking_orders_by_visits_then_id():
+    board = TopN(5)
+    for bookmark_id, visits in ((1, 3), (2, 7), (3, 3), (4, 1)):
+        offer(board, bookmark_id, visits)
+    assert ranked(board) == [(2, 7), (1, 3), (3, 3), (4, 1)]
+
+    offer(board, 4, 8)
+    assert ranked(board) == [(4, 8), (2, 7), (1, 3), (3, 3)]
+    # A raised score moves the entry up; its stale heap entry is skipped later.
+
+def test_full_board_evicts_the_lowest_entry():
+    board = TopN(2)
+    offer(board, 1, 5)
+    offer(board, 2, 3)
+
+    version = board.version
+    offer(board, 3, 2)
+    assert ranked(board) == [(1, 5), (2, 3)]
+    assert board.version == version
+    # Below the cut-off: rejected without changing the ranking.
+
+    offer(board, 3, 4)
+    assert ranked(board) == [(1, 5), (3, 4)]
+
+    offer(board, 1, 6)
+    offer(board, 4, 5)
+    assert ranked(board) == [(1, 6), (4, 5)]
+    # The stale (5, 1) heap entry doesn't shield bookmark 3 from eviction.
+
+def test_size_zero_ranks_nothing():
+    board = TopN(0)
+    offer(board, 1, 5)
+    assert board.ranking() == []
+
+def test_leaderboard_is_restored_from_the_checkpoint(app, client, headers):
+    created = [client.post('/api/v1/bookmarks/', headers=headers, json={'url': f'https://example.com/{i}', 'public': True}).json for i in range(3)]
+    with app.app_context():
+        db.session.execute(db.text('UPDATE bookmark SET visits = id * 10'))
+        db.session.add_all([
+            LeaderboardEntry(bookmark_id=created[0]['id'], visits=1),
+            LeaderboardEntry(bookmark_id=created[2]['id'], visits=1),
+        ])
+        db.session.commit()
+        app.extensions.pop('leaderboard', None)
+        # As a freshly started worker would find it.
+
+        board = get_leaderboard()
+        assert ranked(board) == [(created[2]['id'], 30), (created[0]['id'], 10)]
+        # Only the checkpointed bookmarks are loaded, with their current visit counts.
+
+def test_visit_flusher_thread_writes_the_checkpoint(make_app, tmp_path):
+    app = make_app(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'leaderboard.db'}",
+        VISIT_FLUSH_INTERVAL=0.05,
+        LEADERBOARD_CHECKPOINT_INTERVAL=0,
+    )
+    client = app.test_client()
+    register(client)
+    access = login(client).json['user']['access']
+    bookmark = client.post('/api/v1/bookmarks/', headers={'Authorization': f'Bearer {access}'}, json={'url': 'https://example.com/', 'public': True}).json
+    client.get(f"/{bookmark['short_url']}")
+
+    def checkpointed():
+        with app.app_context():
+            return db.session.execute(select(LeaderboardEntry.bookmark_id, LeaderboardEntry.visits)).all() == [(bookmark['id'], 1)]
+    wait_for(checkpointed)
@@ -0,0 +1,73 @@
+import pytest
+
+from src import ratelimit
+from tests.conftest import register, login
+
+@pytest.mark.parametrize('body', [
+    {'email': 42, 'password': 'secret1'},
+    {'email': ['alice@example.com'], 'password': 'secret1'},
+    {'email': 'alice@example.com', 'password': {'x': 1}},
+    {'email': 'alice@example.com'},
+    ['alice@example.com', 'secret1'],
+])
+def test_login_rejects_malformed_credentials(client, body):
+    assert register(client).status_code == 201
+    response = client.post('/api/v1/auth/login', json=body)
+    assert response.status_code == 400
+
+def test_login_is_case_insensitive(client):
+    assert register(client).status_code == 201
+    assert login(client, 'ALICE@example.com').status_code == 200
+    assert login(client, 'alice@example.com', 'wrong-password').status_code == 401
+
+class Clock:
+    """Stands in for the `time` module in src.ratelimit, so tests can move the clock."""
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, 'time', clock)
+    return clock
+
+def test_exceeding_the_email_bucket_returns_429_with_retry_after(client, clock):
+    assert register(client).status_code == 201
+    for _ in range(5):
+        assert login(client, password='wrong-password').status_code == 401
+    response = login(client)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '60'
+    # One attempt a minute comes back, so the next is a full minute away.
+
+def test_exceeding_the_ip_bucket_returns_429_for_any_email(make_app, clock):
+    client = make_app(LOGIN_LIMIT_IP_BURST=3, LOGIN_LIMIT_IP_PER_MINUTE=6).test_client()
+    for i in range(3):
+        assert login(client, email=f'user{i}@example.com').status_code == 401
+    response = login(client, email='someone-else@example.com')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+
+def test_bucket_refills_over_time(client, clock):
+    assert register(client).status_code == 201
+    for _ in range(5):
+        login(client, password='wrong-password')
+    assert login(client).status_code == 429
+
+    clock.now += 59
+    assert login(client).status_code == 429
+    # A rejected attempt spends nothing, so the partial token keeps accruing.
+    clock.now += 1
+    assert login(client).status_code == 200
+    assert login(client).status_code == 429
+    # One minute refilled exactly one attempt.
+
+    clock.now += 3600
+    for _ in range(5):
+        assert login(client).status_code == 200
+    assert login(client).status_code == 429
+    # A long pause refills the bucket only up to its burst.
@@ -0,0 +1,30 @@
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from src.database import User, db
+
+def test_me_is_answered_from_the_token_claims(app, client, headers):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = client.get('/api/v1/auth/me', headers=headers)
+    assert response.status_code == 200
+    assert response.json == {'username': 'alice', 'email': 'alice@example.com'}
+    assert not any('FROM user' in statement for statement in statements), statements
+
+def test_me_falls_back_to_the_database_without_profile_claims(app, client, tokens):
+    with app.app_context():
+        access = create_access_token(identity=1)
+        # Like a token issued before profile claims were embedded.
+    response = client.get('/api/v1/auth/me', headers={'Authorization': f'Bearer {access}'})
+    assert response.status_code == 200
+    assert response.json == {'username': 'alice', 'email': 'alice@example.com'}
+
+def test_me_without_profile_claims_for_a_deleted_user_is_404(app, client, tokens):
+    with app.app_context():
+        access = create_access_token(identity=1)
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+    response = client.get('/api/v1/auth/me', headers={'Authorization': f'Bearer {access}'})
+    assert response.status_code == 404
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import pytest
+import sqlalchemy as sa
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+
+from src import MIGRATIONS_DIRECTORY
+from src.database import db
+from tests.conftest import register, login
+
+SHIPPED_DATABASE = os.path.join(os.path.dirname(MIGRATIONS_DIRECTORY), 'instance', 'bookmarks.db')
+# A database created before migrations existed, with the original two tables.
+
+def upgraded_app(make_app, path):
+    """Return an app on the SQLite file at `path`, upgraded to the latest migration."""
+    app = make_app(create_tables=False, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIRECTORY)
+    return app
+
+def test_upgrade_existing_database(make_app, tmp_path):
+    path = tmp_path / 'bookmarks.db'
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = upgraded_app(make_app, path)
+
+    with app.app_context():
+        columns = {column['name'] for column in sa.inspect(db.engine).get_columns('user')}
+        assert 'data_version' in columns
+        assert db.session.execute(sa.text('SELECT count(*) FROM user')).scalar() == 1
+        # The existing user survives the upgrade.
+        indexed = db.session.execute(sa.text("SELECT count(*) FROM bookmark_fts WHERE bookmark_fts MATCH 'owner:u1'")).scalar()
+        assert indexed == db.session.execute(sa.text('SELECT count(*) FROM bookmark WHERE user_id = 1')).scalar()
+        # Existing bookmarks are indexed for search.
+        indexes = {index['name'] for index in sa.inspect(db.engine).get_indexes('bookmark')}
+        assert 'ix_bookmark_user_visits' in indexes
+        # The stats aggregates and most-visited page read this index; it ships with the list indexes.
+
+def test_upgrade_empty_database(make_app, tmp_path):
+    app = upgraded_app(make_app, tmp_path / 'empty.db')
+    with app.app_context():
+        assert {'user', 'bookmark'} <= set(sa.inspect(db.engine).get_table_names())
+
+@pytest.fixture(params=['shipped', 'empty'])
+def upgraded(request, make_app, tmp_path):
+    """An app on the shipped database or an empty one, upgraded to the latest migration."""
+    path = tmp_path / 'bookmarks.db'
+    if request.param == 'shipped':
+        shutil.copy(SHIPPED_DATABASE, path)
+    return upgraded_app(make_app, path)
+
+@pytest.mark.filterwarnings('ignore:.*expression-based index')
+def test_upgraded_schema_matches_the_models(upgraded):
+    with upgraded.app_context(), db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={
+            'compare_type': True,
+            'include_object': lambda object, name, type_, reflected, compare_to: not name.startswith('bookmark_fts'),
+        })
+        assert compare_metadata(context, db.metadata) == []
+
+        index = connection.execute(sa.text("SELECT sql FROM sqlite_master WHERE name = 'uq_user_email_lower'")).scalar()
+        assert index is not None and 'lower(email)' in index
+        # Expression indexes can't be reflected, so compare_metadata skips this one.
+
+def test_upgraded_database_serves_the_app(upgraded):
+    client = upgraded.test_client()
+    assert register(client).status_code == 201
+    tokens = login(client).json['user']
+    headers = {'Authorization': f"Bearer {tokens['access']}"}
+
+    bookmark = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://docs.python.org/3/', 'body': 'python docs', 'tags': ['python']})
+    assert bookmark.status_code == 201
+    assert client.get(f"/{bookmark.json['short_url']}").status_code == 302
+    assert [row['id'] for row in client.get('/api/v1/bookmarks/search?q=python', headers=headers).json['data']] == [bookmark.json['id']]
+    assert client.post('/api/v1/auth/token/refresh', headers={'Authorization': f"Bearer {tokens['refresh']}"}).status_code == 200
+    assert client.post('/api/v1/auth/logout', headers=headers).status_code == 200
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from src.database import User, db
+from src.passwords import HashPool, HashingUnavailable, hash_method, needs_rehash
+from tests.conftest import register, login
+
+def die():
+    os._exit(1)
+    # Like a hashing process killed by the OOM killer.
+
+def answer():
+    return 42
+
+def test_broken_pool_is_replaced():
+    pool = HashPool(workers=1, max_pending=4, timeout=10)
+    broken = pool.executor
+    try:
+        with pytest.raises(HashingUnavailable):
+            pool.run(die)
+        assert pool.executor is not broken
+        assert pool.run(answer) == 42
+        # Later hashes go to the new processes instead of failing forever.
+    finally:
+        pool.executor.shutdown()
+
+def test_full_pool_is_unavailable():
+    pool = HashPool(workers=1, max_pending=1, timeout=10)
+    try:
+        assert pool.slots.acquire(blocking=False)
+        with pytest.raises(HashingUnavailable):
+            pool.run(answer)
+    finally:
+        pool.executor.shutdown()
+
+def test_login_rehashes_a_hash_from_an_older_preset(app, client):
+    assert register(client).status_code == 201
+    with app.app_context():
+        user = User.query.filter_by(email='alice@example.com').one()
+        user.password = generate_password_hash('secret1', 'pbkdf2:sha256:500')
+        db.session.commit()
+        # As if stored while a cheaper policy was configured.
+
+    assert login(client, password='wrong-password').status_code == 401
+    with app.app_context():
+        assert User.query.one().password.startswith('pbkdf2:sha256:500$')
+        # Only a successful login knows the password to rehash.
+
+    assert login(client).status_code == 200
+    with app.app_context():
+        stored = User.query.one().password
+        assert stored.startswith(f'{hash_method()}$')
+        assert not needs_rehash(stored)
+
+    assert login(client).status_code == 200
+    with app.app_context():
+        assert User.query.one().password == stored
+        # An up-to-date hash is left alone.
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from tests.conftest import register
+
+@pytest.fixture
+def file_client(make_app, tmp_path):
+    """A client on a database file, so concurrent requests get their own connections."""
+    return make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'users.db'}").test_client()
+
+def register_concurrently(client, *accounts):
+    """Send every registration at once from its own thread; return the status codes in order."""
+    barrier = threading.Barrier(len(accounts))
+    statuses = [None] * len(accounts)
+
+    def send(index, username, email):
+        barrier.wait()
+        statuses[index] = register(client, username, email).status_code
+
+    threads = [threading.Thread(target=send, args=(index, *account)) for index, account in enumerate(accounts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+@pytest.mark.parametrize('round', range(5))
+def test_concurrent_registrations_differing_in_case(file_client, round):
+    statuses = register_concurrently(file_client, (f'alice{round}', f'Alice{round}@Example.com'), (f'bob{round}', f'alice{round}@example.com'))
+    assert sorted(statuses) == [201, 409]
+
+def test_conflicts_name_the_taken_field(client):
+    assert register(client, 'alice', 'alice@example.com').status_code == 201
+
+    response = register(client, 'alice2', 'ALICE@example.com')
+    assert (response.status_code, response.json['error']) == (409, 'Email is already taken')
+
+    response = register(client, 'alice2', 'alice@example.com')
+    assert (response.status_code, response.json['error']) == (409, 'Email is already taken')
+
+    response = register(client, 'alice', 'other@example.com')
+    assert (response.status_code, response.json['error']) == (409, 'Username is already taken')
@@ -0,0 +1,63 @@
+from email.utils import parsedate_to_datetime
+
+from tests.conftest import register, login
+
+def create(client, headers, url, body=''):
+    response = client.post('/api/v1/bookmarks/', headers=headers, json={'url': url, 'body': body})
+    assert response.status_code == 201
+    return response.json
+
+def search(client, headers, q, **params):
+    response = client.get('/api/v1/bookmarks/search', headers=headers, query_string={'q': q, **params})
+    assert response.status_code == 200
+    return response.json
+
+def test_search_only_matches_own_bookmarks(client, headers):
+    mine = create(client, headers, 'https://docs.python.org/3/', 'python docs')
+
+    assert register(client, 'bob', 'bob@example.com').status_code == 201
+    bob = {'Authorization': f"Bearer {login(client, 'bob@example.com').json['user']['access']}"}
+    create(client, bob, 'https://python.org/', 'python home')
+
+    assert [row['id'] for row in search(client, headers, 'python')['data']] == [mine['id']]
+    assert search(client, headers, 'u2')['data'] == []
+    # Another user's owner token is not searchable as a term.
+
+def test_search_serializes_dates_like_other_endpoints(client, headers):
+    created = create(client, headers, 'https://example.com/', 'example page')
+    row = search(client, headers, 'example')['data'][0]
+    assert row['created_at'] == created['created_at']
+    parsedate_to_datetime(row['created_at'])
+
+def test_search_pages_through_a_stable_ranking(client, headers):
+    assert register(client, 'bob', 'bob@example.com').status_code == 201
+    bob = {'Authorization': f"Bearer {login(client, 'bob@example.com').json['user']['access']}"}
+    ids = {create(client, headers, f'https://example.com/{n}', 'shared words ' * (n % 3 + 1))['id'] for n in range(7)}
+
+    seen, cursor = [], None
+    while True:
+        page = search(client, headers, 'shared', limit=3, **({'cursor': cursor} if cursor else {}))
+        seen += [row['id'] for row in page['data']]
+        cursor = page['meta']['next_cursor']
+        if not cursor:
+            break
+        for n in range(5):
+            create(client, bob, f'https://example.org/{len(seen)}/{n}', 'shared shared other')
+        # Other users' writes between pages change bm25's statistics, but not this search's pages.
+
+    assert sorted(seen) == sorted(ids)
+
+def test_search_sees_edits_and_deletes(client, headers):
+    bookmark = create(client, headers, 'https://example.com/', 'alpha')
+    assert len(search(client, headers, 'alpha')['data']) == 1
+
+    client.put(f"/api/v1/bookmarks/{bookmark['id']}", headers=headers, json={'url': 'https://example.com/', 'body': 'beta'})
+    assert search(client, headers, 'alpha')['data'] == []
+    assert len(search(client, headers, 'beta')['data']) == 1
+
+    client.delete(f"/api/v1/bookmarks/{bookmark['id']}", headers=headers)
+    assert search(client, headers, 'beta')['data'] == []
+
+def test_search_rejects_bad_cursor(client, headers):
+    response = client.get('/api/v1/bookmarks/search', headers=headers, query_string={'q': 'x', 'cursor': 'nope'})
+    assert response.status_code == 400
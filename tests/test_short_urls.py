@@ -0,0 +1,33 @@
+import sqlalchemy as sa
+
+from src.database import Bookmark, SHORT_CODE_LENGTH, db
+
+def test_short_url_index_is_unique(app):
+    with app.app_context():
+        indexes = {index['name']: index for index in sa.inspect(db.engine).get_indexes('bookmark')}
+        assert indexes['ix_bookmark_short_url']['unique']
+
+def test_import_allocates_distinct_long_codes(client, headers, app):
+    body = ''.join(f'{{"url": "https://example.com/{i}"}}\n' for i in range(2000))
+    response = client.post('/api/v1/bookmarks/import', headers=headers, data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert '"imported": 2000' in response.get_data(as_text=True)
+
+    with app.app_context():
+        codes = db.session.execute(sa.select(Bookmark.short_url)).scalars().all()
+        assert len(set(codes)) == 2000
+        assert {len(code) for code in codes} == {SHORT_CODE_LENGTH}
+
+def test_insert_retries_codes_taken_concurrently(client, headers, app, monkeypatch):
+    taken = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/a'}).json['short_url']
+
+    draws = iter([[taken, 'fresh1'], ['fresh2']])
+    monkeypatch.setattr(Bookmark, 'generate_short_codes', classmethod(lambda cls, count: next(draws)))
+    # The first draw hands out a code that is already in use, as a concurrent insert would have.
+
+    with app.app_context():
+        rows = [{'url': f'https://example.com/{i}', 'user_id': 1, 'visits': 0} for i in range(2)]
+        ids = Bookmark.insert_with_short_codes(rows)
+        db.session.commit()
+        codes = [db.session.get(Bookmark, bookmark_id).short_url for bookmark_id in ids]
+    assert codes == ['fresh2', 'fresh1']
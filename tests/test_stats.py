@@ -0,0 +1,54 @@
+import importlib
+from unittest import mock
+
+from src.bookmarks import compute_stats
+
+bookmarks_module = importlib.import_module('src.bookmarks')
+# `src.bookmarks` names the blueprint once the package is imported, so the module is fetched by name.
+
+def create(client, headers, url):
+    response = client.post('/api/v1/bookmarks/', headers=headers, json={'url': url})
+    assert response.status_code == 201
+    return response.json
+
+def test_stats_report_totals_top_bookmarks_and_domains(app, client, headers):
+    a = create(client, headers, 'https://example.com/a')
+    b = create(client, headers, 'https://example.com/b')
+    c = create(client, headers, 'https://other.org/c')
+    for short_url, times in ((a['short_url'], 1), (b['short_url'], 3), (c['short_url'], 2)):
+        for _ in range(times):
+            client.get(f'/{short_url}', environ_base={'REMOTE_ADDR': f'10.0.0.{times}'})
+    app.extensions['visits'].flush()
+
+    stats = client.get('/api/v1/bookmarks/stats?per_page=2', headers=headers).json
+    assert stats['totals'] == {'bookmarks': 3, 'visits': 6}
+    assert [(item['id'], item['visits'], item['unique_visitors']) for item in stats['data']] == [(b['id'], 3, 1), (c['id'], 2, 1)]
+    assert stats['meta'] == {'page': 1, 'per_page': 2, 'has_next': True}
+    assert stats['domains'] == [
+        {'domain': 'example.com', 'bookmarks': 2, 'visits': 4},
+        {'domain': 'other.org', 'bookmarks': 1, 'visits': 2},
+    ]
+
+    second = client.get('/api/v1/bookmarks/stats?per_page=2&page=2', headers=headers).json
+    assert [item['id'] for item in second['data']] == [a['id']]
+    assert second['meta']['has_next'] is False
+
+def test_stats_are_cached_until_the_user_version_changes(client, headers):
+    created = create(client, headers, 'https://example.com/a')
+
+    with mock.patch.object(bookmarks_module, 'compute_stats', wraps=compute_stats) as compute:
+        client.get('/api/v1/bookmarks/stats', headers=headers)
+        client.get('/api/v1/bookmarks/stats', headers=headers)
+        assert compute.call_count == 1
+        # The second request is served from the cache entry for this version.
+
+        client.get(f"/{created['short_url']}")
+        stats = client.get('/api/v1/bookmarks/stats', headers=headers).json
+        assert compute.call_count == 2
+        assert stats['totals']['visits'] == 1
+        # A visit bumps the data version, so the cached entry no longer matches.
+
+        create(client, headers, 'https://example.com/b')
+        stats = client.get('/api/v1/bookmarks/stats', headers=headers).json
+        assert compute.call_count == 3
+        assert stats['totals']['bookmarks'] == 2
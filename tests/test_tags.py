@@ -0,0 +1,24 @@
+import pytest
+
+from src.database import Bookmark
+from src.tags import all_tags_filter, any_tags_filter
+
+@pytest.mark.parametrize('name', ['tags', 'any_tags'])
+@pytest.mark.parametrize('value', [',', ' ', ' , ,'])
+def test_list_rejects_tag_filters_without_tags(client, headers, name, value):
+    response = client.get('/api/v1/bookmarks/', headers=headers, query_string={name: value})
+    assert response.status_code == 400
+    assert 'at least one tag' in response.json['error']
+
+def test_list_filters_by_tags(client, headers):
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/a', 'tags': ['python', 'docs']})
+    client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/b', 'tags': ['python']})
+
+    urls = lambda **params: [row['url'] for row in client.get('/api/v1/bookmarks/', headers=headers, query_string=params).json['data']]
+    assert urls(tags='python,docs') == ['https://example.com/a']
+    assert sorted(urls(any_tags='docs, python')) == ['https://example.com/a', 'https://example.com/b']
+
+@pytest.mark.parametrize('tags_filter', [all_tags_filter, any_tags_filter])
+def test_tag_filters_without_names_match_nothing(app, tokens, tags_filter):
+    with app.app_context():
+        assert Bookmark.query.filter(tags_filter(1, [])).all() == []
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from src.database import RefreshToken, RevokedToken, db
+from src.tokens import RevocationFilter, rebuild_revocations, sweep_revoked_tokens
+from tests.conftest import register, login
+from tests.test_visits import wait_for
+
+def test_revocation_filter_builds_right_after_boot(client, headers, monkeypatch):
+    monkeypatch.setattr('src.tokens.time.monotonic', lambda: 1.0)
+    # A freshly booted machine, whose monotonic clock is still below the refresh interval.
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+
+    assert client.post('/api/v1/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 401
+
+def test_rebuilding_the_filter_only_reads(app):
+    with app.app_context():
+        db.session.add(RevokedToken(jti='expired', expires_at=datetime.now() - timedelta(minutes=1)))
+        db.session.add(RevokedToken(jti='live', expires_at=datetime.now() + timedelta(minutes=1)))
+        db.session.commit()
+
+        revocations = RevocationFilter()
+        rebuild_revocations(revocations)
+        assert 'live' in revocations.bloom
+        assert db.session.execute(sa.select(sa.func.count()).select_from(RevokedToken)).scalar() == 2
+        # Pruning is left to the sweeper.
+
+        assert sweep_revoked_tokens(100) == 1
+        assert db.session.execute(sa.select(RevokedToken.jti)).scalars().all() == ['live']
+
+def test_sweep_command_prunes_the_blocklist(app):
+    with app.app_context():
+        db.session.add(RevokedToken(jti='expired', expires_at=datetime.now() - timedelta(minutes=1)))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['auth', 'sweep-refresh-tokens'])
+    assert 'Deleted 1 expired blocklist entries.' in result.output
+
+def refresh(client, token):
+    return client.post('/api/v1/auth/token/refresh', headers={'Authorization': f'Bearer {token}'})
+
+def test_logout_with_a_rotated_refresh_token_ends_the_family(app, client, tokens):
+    first = tokens['refresh']
+    second = refresh(client, first).json['refresh']
+    third = refresh(client, second).json['refresh']
+
+    assert client.post('/api/v1/auth/logout', headers={'Authorization': f'Bearer {third}'}).status_code == 200
+    with app.app_context():
+        assert db.session.execute(sa.select(sa.func.count()).select_from(RefreshToken)).scalar() == 0
+        # Every token of the family, including the first, whose hash keys the family.
+    assert refresh(client, third).status_code == 401
+
+def test_revoking_a_rotated_refresh_token_ends_the_family(app, client, tokens, headers):
+    second = refresh(client, tokens['refresh']).json['refresh']
+    response = client.post('/api/v1/auth/token/revoke', headers=headers, json={'token': second})
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.execute(sa.select(sa.func.count()).select_from(RefreshToken)).scalar() == 0
+
+@pytest.mark.parametrize('body', [{'token': 5}, {'token': ['a.b.c']}, {}, ['token']])
+def test_revoke_rejects_a_missing_or_non_string_token(client, headers, body):
+    response = client.post('/api/v1/auth/token/revoke', headers=headers, json=body)
+    assert response.status_code == 400
+
+def test_reusing_a_refresh_token_revokes_its_family(app, client, tokens):
+    first = refresh(client, tokens['refresh'])
+    assert first.status_code == 200
+
+    reused = refresh(client, tokens['refresh'])
+    assert reused.status_code == 401
+    # The token was already exchanged, so this is a copy; there's no telling which holder is legitimate.
+
+    with app.app_context():
+        assert db.session.execute(sa.select(sa.func.count()).select_from(RefreshToken)).scalar() == 0
+    assert refresh(client, first.json['refresh']).status_code == 401
+    # The successor issued by the first exchange is revoked with the rest of the family.
+
+def test_expired_tokens_are_swept_in_the_background(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'tokens.db'}", REFRESH_TOKEN_SWEEP_INTERVAL=0.05)
+    with app.app_context():
+        expired = datetime.now() - timedelta(minutes=1)
+        db.session.add(RevokedToken(jti='expired', expires_at=expired))
+        db.session.add(RefreshToken(token_hash=b'expired'.ljust(16, b'\0'), family=b'expired'.ljust(16, b'\0'), expires_at=expired))
+        db.session.commit()
+
+    client = app.test_client()
+    register(client)
+    assert login(client).status_code == 200
+    # Issuing the first refresh token starts the sweeper.
+
+    def swept():
+        with app.app_context():
+            return (
+                db.session.execute(sa.select(RevokedToken.jti)).scalars().all() == []
+                and db.session.execute(sa.select(sa.func.count()).select_from(RefreshToken)).scalar() == 1
+            )
+    wait_for(swept)
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from src.database import User, db
+from src.users import prepare, write_checkpoint
+
+@pytest.mark.parametrize('record, error', [
+    ({'username': 123, 'email': 'a@example.com', 'password': 'secret1'}, 'username must be a string'),
+    ({'username': 'alice', 'email': ['a@example.com'], 'password': 'secret1'}, 'email must be a string'),
+    ({'username': 'alice', 'email': 'a@example.com', 'password': 123456}, 'password must be a string'),
+    ({'username': 'alice', 'email': 'a@example.com', 'password_hash': {'x': 1}}, 'password_hash must be a string'),
+    (['alice'], 'Record is not a JSON object'),
+])
+def test_prepare_rejects_malformed_fields(record, error):
+    with pytest.raises(ValueError, match=error):
+        prepare(record)
+
+def test_import_skips_records_with_non_string_fields(app, tmp_path):
+    path = tmp_path / 'users.ndjson'
+    path.write_text('\n'.join(json.dumps(record) for record in [
+        {'username': 'alice', 'email': 'alice@example.com', 'password': 'secret1'},
+        {'username': 'bob', 'email': 42, 'password': 'secret1'},
+        {'username': 'carol', 'email': 'carol@example.com', 'password': 'secret1'},
+    ]))
+
+    result = app.test_cli_runner().invoke(args=['users', 'import', str(path), '--workers', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Record 2: email must be a string' in result.output
+    assert 'Imported 2 users; skipped 0 existing and 1 invalid records.' in result.output
+    with app.app_context():
+        assert sorted(db.session.execute(db.select(User.username)).scalars()) == ['alice', 'carol']
+
+def test_rerun_after_an_interruption_skips_committed_users(app, tmp_path, monkeypatch):
+    path = tmp_path / 'users.ndjson'
+    path.write_text('\n'.join(
+        json.dumps({'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'secret1'}) for i in range(6)
+    ))
+    command = ['users', 'import', str(path), '--workers', '1', '--batch-size', '2']
+
+    calls = []
+    def crash_on_second_checkpoint(checkpoint_path, done):
+        calls.append(done)
+        if len(calls) == 2:
+            raise RuntimeError('killed')
+        write_checkpoint(checkpoint_path, done)
+    monkeypatch.setattr('src.users.write_checkpoint', crash_on_second_checkpoint)
+    # Stopped right after the second batch committed but before its checkpoint was written: the
+    # worst moment, since the rerun replays a batch that is already in the database.
+
+    result = app.test_cli_runner().invoke(args=command)
+    assert isinstance(result.exception, RuntimeError)
+    assert (tmp_path / 'users.ndjson.checkpoint').read_text() == '2'
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(User)).scalar() == 4
+
+    monkeypatch.setattr('src.users.write_checkpoint', write_checkpoint)
+    result = app.test_cli_runner().invoke(args=command)
+    assert result.exit_code == 0, result.output
+    assert 'Resuming after 2 records.' in result.output
+    assert 'Imported 2 users; skipped 2 existing and 0 invalid records.' in result.output
+    assert not (tmp_path / 'users.ndjson.checkpoint').exists()
+    with app.app_context():
+        assert sorted(db.session.execute(db.select(User.username)).scalars()) == [f'user{i}' for i in range(6)]
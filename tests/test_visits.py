@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from src.analytics import flush_visitors, get_visit_buffer
+from tests.conftest import register, login
+
+@pytest.fixture
+def file_app(make_app, tmp_path):
+    """Return a factory for apps on a database file, which the background flush thread can see too."""
+    def make(**config):
+        return make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'visits.db'}", **config)
+    return make
+
+def visited_bookmark(app):
+    client = app.test_client()
+    assert register(client).status_code == 201
+    headers = {'Authorization': f"Bearer {login(client).json['user']['access']}"}
+    bookmark = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'}).json
+    client.get(f"/{bookmark['short_url']}", headers={'Referer': 'https://news.example.org/item'})
+    return client, headers, bookmark
+
+def unique_visitors(client, headers, bookmark):
+    return client.get(f"/api/v1/bookmarks/{bookmark['id']}/clicks", headers=headers).json['meta']['unique_visitors']
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+def test_visits_flush_in_the_background(file_app):
+    app = file_app(VISIT_FLUSH_INTERVAL=0.05)
+    client, headers, bookmark = visited_bookmark(app)
+    assert unique_visitors(client, headers, bookmark) == 0
+    # The redirect itself only buffers the visit.
+    wait_for(lambda: unique_visitors(client, headers, bookmark) == 1)
+
+def test_full_buffer_flushes_before_the_interval(file_app):
+    app = file_app(VISIT_FLUSH_INTERVAL=3600, VISIT_BUFFER_MAX_KEYS=1)
+    client, headers, bookmark = visited_bookmark(app)
+    wait_for(lambda: unique_visitors(client, headers, bookmark) == 1)
+
+def test_exit_flush_writes_pending_visits(file_app, monkeypatch):
+    registered = []
+    monkeypatch.setattr('src.analytics.atexit.register', registered.append)
+    app = file_app(VISIT_FLUSH_INTERVAL=3600)
+    client, headers, bookmark = visited_bookmark(app)
+
+    with app.app_context():
+        buffer = get_visit_buffer()
+    assert registered == [buffer.flush]
+    registered[0]()
+    assert unique_visitors(client, headers, bookmark) == 1
+
+def test_failed_flush_requeues_the_visits(file_app, monkeypatch):
+    app = file_app(VISIT_FLUSH_INTERVAL=3600)
+    client, headers, bookmark = visited_bookmark(app)
+    with app.app_context():
+        buffer = get_visit_buffer()
+
+    def fail(visitors, owners):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr('src.analytics.flush_visitors', fail)
+    buffer.flush()
+    assert list(buffer.owners) == [bookmark['id']]
+    assert unique_visitors(client, headers, bookmark) == 0
+
+    monkeypatch.setattr('src.analytics.flush_visitors', flush_visitors)
+    buffer.flush()
+    assert buffer.owners == {}
+    assert unique_visitors(client, headers, bookmark) == 1
+    breakdown = client.get(f"/api/v1/bookmarks/{bookmark['id']}/breakdown", headers=headers).json
+    assert breakdown['referrers'] == [{'value': 'news.example.org', 'count': 1}]
+    # The referrer counts were re-queued and written with the visitors.
+
+def test_breakdown_reports_the_day_aligned_start(client, headers):
+    bookmark = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'}).json
+    response = client.get(
+        f"/api/v1/bookmarks/{bookmark['id']}/breakdown", headers=headers,
+        query_string={'from': '2026-03-04T05:06:07', 'to': '2026-03-05T00:00:00'},
+    )
+    assert response.json['meta']['from'] == '2026-03-04T00:00:00'
+
+def test_breakdown_is_conditional_only_for_an_explicit_window(client, headers):
+    bookmark = client.post('/api/v1/bookmarks/', headers=headers, json={'url': 'https://example.com/'}).json
+    url = f"/api/v1/bookmarks/{bookmark['id']}/breakdown"
+    assert 'ETag' not in client.get(url, headers=headers).headers
+    # The default window ends now, so a tag for it could go stale without the version moving.
+
+    fixed = {'from': '2026-03-04T00:00:00', 'to': '2026-03-05T00:00:00'}
+    tagged = client.get(url, headers=headers, query_string=fixed)
+    again = client.get(url, headers={**headers, 'If-None-Match': tagged.headers['ETag']}, query_string=fixed)
+    assert again.status_code == 304